@@ -21,10 +21,11 @@ instance as a result.
 """
 
 from numpy import abs, array, errstate, ones, interp, mean, pi, polyfit, polyval, sum, sqrt, log10, exp, asarray, full,\
-    squeeze, zeros, append, flip, outer, ndarray
+    squeeze, zeros, append, flip, outer, ndarray, minimum, maximum, newaxis, where, around
 from scipy.constants import h, c
 from scipy.interpolate import interp1d
 from collections import namedtuple
+from functools import wraps
 from typing import Union
 from logging import getLogger
 
@@ -32,7 +33,7 @@ from gnpy.core.utils import lin2db, db2lin, arrange_frequencies, snr_sum, per_la
     watt2dbm, psd2powerdbm, calculate_absolute_min_or_zero
 from gnpy.core.parameters import RoadmParams, FusedParams, FiberParams, PumpParams, EdfaParams, EdfaOperational, \
     RoadmPath, RoadmImpairment
-from gnpy.core.science_utils import NliSolver, RamanSolver
+from gnpy.core.science_utils import NliSolver, RamanSolver, LruCache
 from gnpy.core.info import SpectralInformation
 from gnpy.core.exceptions import NetworkTopologyError, SpectrumError, ParametersError
 
@@ -40,6 +41,23 @@ from gnpy.core.exceptions import NetworkTopologyError, SpectrumError, Parameters
 _logger = getLogger(__name__)
 
 
+def _frequency_coefficient(method):
+    """Caches the coefficient returned by a Fiber method for each frequency grid, see :py:meth:`Fiber.compile`.
+    Scalar frequencies are not cached."""
+    @wraps(method)
+    def cached_method(fiber, frequency=None):
+        if frequency is None or asarray(frequency).ndim == 0:
+            return method(fiber, frequency)
+        frequency = asarray(frequency)
+        key = (method.__name__, frequency.tobytes())
+        coefficient = fiber.coefficients_cache.get(key)
+        if coefficient is None:
+            coefficient = asarray(method(fiber, frequency))
+            fiber.coefficients_cache.put(key, coefficient, fiber.COEFFICIENTS_CACHE_SIZE)
+        return coefficient
+    return cached_method
+
+
 class Location(namedtuple('Location', 'latitude longitude city region')):
     def __new__(cls, latitude=0, longitude=0, city=None, region=None):
         return super().__new__(cls, latitude, longitude, city, region)
@@ -51,6 +69,11 @@ class _Node:
     This class is just an internal implementation detail; do **not** assume that all network elements
     inherit from :class:`_Node`.
     """
+    # attributes set by the propagation of a spectral information through the element
+    PROPAGATION_RESULTS = ()
+    # attributes set by the design of the network (see gnpy.core.network.design_network)
+    DESIGN_RESULTS = ()
+
     def __init__(self, uid, name=None, params=None, metadata=None, operational=None, type_variety=None):
         if name is None:
             name = uid
@@ -80,6 +103,10 @@ class _Node:
 
 
 class Transceiver(_Node):
+    PROPAGATION_RESULTS = ('tx_power', 'propagated_labels', 'baud_rate', 'raw_osnr_ase', 'raw_osnr_ase_01nm',
+                           'raw_osnr_nli', 'raw_snr', 'raw_snr_01nm', 'osnr_ase', 'osnr_ase_01nm', 'osnr_nli', 'snr',
+                           'snr_01nm', 'chromatic_dispersion', 'pmd', 'pdl', 'latency', 'penalties', 'total_penalty')
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.osnr_ase_01nm = None
@@ -110,7 +137,7 @@ class Transceiver(_Node):
     def _calc_pdl(self, spectral_info):
         """Updates the Transceiver property with the PDL of the received channels. PDL in dB.
         """
-        self.pdl = spectral_info.pdl
+        self.pdl = spectral_info.pdl.copy()
 
     def _calc_latency(self, spectral_info):
         """Updates the Transceiver property with the latency of the received channels. Latency in ms.
@@ -225,7 +252,7 @@ class Transceiver(_Node):
         return result
 
     def __call__(self, spectral_info):
-        self.tx_power = spectral_info.tx_power
+        self.tx_power = spectral_info.tx_power.copy()
         self._calc_snr(spectral_info)
         self._calc_cd(spectral_info)
         self._calc_pmd(spectral_info)
@@ -235,6 +262,9 @@ class Transceiver(_Node):
 
 
 class Roadm(_Node):
+    PROPAGATION_RESULTS = ('ref_pch_out_dbm', 'ref_effective_loss', 'pch_out_dbm', 'loss_pch_db', 'propagated_labels')
+    DESIGN_RESULTS = ('ref_pch_in_dbm', 'per_degree_pch_out_dbm', 'per_degree_pch_psd', 'per_degree_pch_psw')
+
     def __init__(self, *args, params=None, **kwargs):
         if not params:
             params = {}
@@ -484,6 +514,9 @@ class Roadm(_Node):
                 msg = f'ROADM {self.uid}: impairment profile id {impairment_id} is not defined in library'
                 raise NetworkTopologyError(msg)
         # print(from_degree, to_degree, path_type)
+        # the path set first is the one returned by get_roadm_path: do not append it again at each new design
+        if any(p.from_degree == from_degree and p.to_degree == to_degree for p in self.roadm_paths):
+            return
         self.roadm_paths.append(RoadmPath(from_degree=from_degree, to_degree=to_degree, path_type=path_type,
                                           impairment_id=impairment_id, impairment=impairment))
 
@@ -548,9 +581,17 @@ class Fused(_Node):
 
 
 class Fiber(_Node):
+    COEFFICIENTS_CACHE_SIZE = 10e6  # bytes of frequency dependent coefficients cached per fiber
+    PROPAGATION_RESULTS = ('_psig_in', 'pch_out_dbm', 'propagated_labels', 'pch_out_db')
+    DESIGN_RESULTS = ('ref_pch_in_dbm',)
+
     def __init__(self, *args, params=None, **kwargs):
         if not params:
             params = {}
+        # Raman profiles already computed for this fiber, by input spectrum and solver parameters
+        self.srs_cache = LruCache()
+        # frequency dependent coefficients already computed for this fiber, by coefficient and frequency grid
+        self.coefficients_cache = LruCache()
         try:
             super().__init__(*args, params=FiberParams(**params), **kwargs)
         except ParametersError as e:
@@ -570,6 +611,16 @@ class Fiber(_Node):
         self.z_lumped_losses = array(z_lumped_losses) * 1e3  # [m]
         self.ref_pch_in_dbm = None
 
+    @property
+    def params(self):
+        return self._params
+
+    @params.setter
+    def params(self, params):
+        self._params = params
+        params.observe(self.invalidate_caches)
+        self.invalidate_caches()
+
     @property
     def to_json(self):
         return {'uid': self.uid,
@@ -643,6 +694,7 @@ class Fiber(_Node):
         return self.loss_coef_func(self.params.ref_frequency) * self.params.length + \
             self.params.con_in + self.params.con_out + self.params.att_in + sum(lin2db(1 / self.lumped_losses))
 
+    @_frequency_coefficient
     def alpha(self, frequency):
         """Returns the linear exponent attenuation coefficient such that
         :math: `lin_attenuation = e^{- alpha length}`
@@ -652,6 +704,7 @@ class Fiber(_Node):
         """
         return self.loss_coef_func(frequency) / (10 * log10(exp(1)))
 
+    @_frequency_coefficient
     def beta2(self, frequency=None):
         """Returns the beta2 chromatic dispersion coefficient as the second order term of the beta function
         expanded as a Taylor series evaluated at the given frequency
@@ -673,6 +726,7 @@ class Fiber(_Node):
         beta2 = -((c / frequency) ** 2 * dispersion) / (2 * pi * c)
         return beta2
 
+    @_frequency_coefficient
     def beta3(self, frequency=None):
         """Returns the beta3 chromatic dispersion coefficient as the third order term of the beta function
         expanded as a Taylor series evaluated at the given frequency
@@ -695,6 +749,7 @@ class Fiber(_Node):
                             2 * pi * frequency ** 2 / c) ** 2
         return beta3
 
+    @_frequency_coefficient
     def gamma(self, frequency=None):
         """Returns the nonlinear interference coefficient such that
         :math: `gamma(f) = 2 pi f n_2 c^{-1} A_{eff}^{-1}`
@@ -705,6 +760,7 @@ class Fiber(_Node):
         frequency = self.params.ref_frequency if frequency is None else frequency
         return self.params.gamma_scaling(frequency)
 
+    @_frequency_coefficient
     def cr(self, frequency):
         """Returns the raman gain coefficient matrix including the vibrational loss
 
@@ -718,6 +774,7 @@ class Fiber(_Node):
         vibrational_loss = outer(frequency, ones(frequency.shape)) / outer(ones(frequency.shape), frequency)
         return cr * (cr >= 0) + cr * (cr < 0) * vibrational_loss  # [1/(W m)]
 
+    @_frequency_coefficient
     def chromatic_dispersion(self, freq=None):
         """Returns accumulated chromatic dispersion (CD).
 
@@ -738,6 +795,24 @@ class Fiber(_Node):
         """differential group delay (PMD) [s]"""
         return self.params.pmd_coef * sqrt(self.params.length)
 
+    def invalidate_srs_cache(self):
+        """Discards the cached Raman profiles: to be called whenever the fiber parameters are modified"""
+        self.srs_cache.clear()
+
+    def invalidate_caches(self):
+        """Discards the cached coefficients and Raman profiles: called whenever the fiber parameters are set"""
+        self.coefficients_cache.clear()
+        self.invalidate_srs_cache()
+
+    def compile(self, frequency):
+        """Precomputes the frequency dependent coefficients of the fiber (alpha, beta2, beta3, gamma, cr and the
+        chromatic dispersion) on the frequency grid, so that the later propagations on this grid reuse them.
+
+        :param frequency: the channel frequencies of the propagation plan [Hz]
+        """
+        for coefficient in (self.alpha, self.beta2, self.beta3, self.gamma, self.cr, self.chromatic_dispersion):
+            coefficient(frequency)
+
     def propagate(self, spectral_info: SpectralInformation):
         """Modifies the spectral information computing the attenuation, the non-linear interference generation,
         the CD and PMD accumulation.
@@ -747,7 +822,7 @@ class Fiber(_Node):
         spectral_info.apply_attenuation_db(attenuation_in_db)
 
         # inter channels Raman effect
-        stimulated_raman_scattering = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, self)
+        stimulated_raman_scattering = RamanSolver.cached_stimulated_raman_scattering(spectral_info, self)
 
         # NLI noise evaluated at the fiber input
         spectral_info.nli += NliSolver.compute_nli(spectral_info, stimulated_raman_scattering, self)
@@ -760,7 +835,7 @@ class Fiber(_Node):
         spectral_info.latency += self.params.latency
 
         # apply the attenuation due to the fiber losses
-        attenuation_fiber = stimulated_raman_scattering.loss_profile[:, -1]
+        attenuation_fiber = stimulated_raman_scattering.loss_profile[..., -1]
         spectral_info.apply_attenuation_lin(attenuation_fiber)
 
         # apply the attenuation due to the output connector loss
@@ -771,18 +846,21 @@ class Fiber(_Node):
 
     def __call__(self, spectral_info):
         # _psig_in records the total signal power of the spectral information before propagation.
-        self._psig_in = sum(spectral_info.signal)
+        self._psig_in = sum(spectral_info.signal, axis=-1)
         self.propagate(spectral_info)
         # In case of Raman, the resulting loss of the fiber is not equivalent to self.loss
         # because of Raman gain. The resulting loss is:
         # power_out - power_in. We use the total signal power (sum on all channels) to compute
         # this loss.
-        loss = round(lin2db(self._psig_in / sum(spectral_info.signal)), 2)
+        loss = around(lin2db(self._psig_in / sum(spectral_info.signal, axis=-1)), 2)
         self.pch_out_db = self.ref_pch_in_dbm - loss
         return spectral_info
 
 
 class RamanFiber(Fiber):
+    PROPAGATION_RESULTS = Fiber.PROPAGATION_RESULTS + ('actual_raman_gain',)
+    DESIGN_RESULTS = Fiber.DESIGN_RESULTS + ('estimated_gain',)
+
     def __init__(self, *args, params=None, **kwargs):
         super().__init__(*args, params=params, **kwargs)
         if not self.operational:
@@ -815,12 +893,12 @@ class RamanFiber(Fiber):
         the CD and PMD accumulation.
         """
         # apply the attenuation due to the input connector loss
-        pin = watt2dbm(sum(spectral_info.signal))
+        pin = watt2dbm(sum(spectral_info.signal, axis=-1))
         attenuation_in_db = self.params.con_in + self.params.att_in
         spectral_info.apply_attenuation_db(attenuation_in_db)
 
         # Raman pumps and inter channel Raman effect
-        stimulated_raman_scattering = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, self)
+        stimulated_raman_scattering = RamanSolver.cached_stimulated_raman_scattering(spectral_info, self)
         spontaneous_raman_scattering = \
             RamanSolver.calculate_spontaneous_raman_scattering(spectral_info, stimulated_raman_scattering, self)
 
@@ -836,7 +914,7 @@ class RamanFiber(Fiber):
         spectral_info.latency += self.params.latency
 
         # apply the attenuation due to the fiber losses
-        attenuation_fiber = stimulated_raman_scattering.loss_profile[:spectral_info.number_of_channels, -1]
+        attenuation_fiber = stimulated_raman_scattering.loss_profile[..., :spectral_info.number_of_channels, -1]
 
         spectral_info.apply_attenuation_lin(attenuation_fiber)
 
@@ -845,17 +923,25 @@ class RamanFiber(Fiber):
         spectral_info.apply_attenuation_db(attenuation_out_db)
         self.pch_out_dbm = watt2dbm(spectral_info.signal + spectral_info.nli + spectral_info.ase)
         self.propagated_labels = spectral_info.label
-        pout = watt2dbm(sum(spectral_info.signal))
+        pout = watt2dbm(sum(spectral_info.signal, axis=-1))
         self.actual_raman_gain = self.loss + pout - pin
 
 
 class Edfa(_Node):
+    COEFFICIENTS_CACHE_SIZE = 1e6  # bytes of interpolated ripples cached per amplifier
+    PROPAGATION_RESULTS = ('channel_freq', 'interpol_dgt', 'interpol_gain_ripple', 'interpol_nf_ripple', 'nch',
+                           'pin_db', 'slot_width', 'effective_gain', 'att_in', 'nf', 'gprofile', 'pout_db',
+                           'pch_out_dbm', 'propagated_labels')
+    DESIGN_RESULTS = ('delta_p', '_delta_p', 'effective_gain', 'out_voa', 'target_pch_out_dbm')
+
     def __init__(self, *args, params=None, operational=None, **kwargs):
         if params is None:
             params = {}
         if operational is None:
             operational = {}
         self.variety_list = kwargs.pop('variety_list', None)
+        # dgt, gain_ripple and nf_ripple already interpolated, by frequency grid
+        self.coefficients_cache = LruCache()
         super().__init__(*args, params=EdfaParams(**params), operational=EdfaOperational(**operational), **kwargs)
         self.interpol_dgt = None  # interpolated dynamic gain tilt defined per frequency on amp band
         self.interpol_gain_ripple = None  # gain ripple
@@ -884,6 +970,16 @@ class Edfa(_Node):
         self.out_voa = self.operational.out_voa
         self.propagated_labels = [""]
 
+    @property
+    def params(self):
+        return self._params
+
+    @params.setter
+    def params(self, params):
+        self._params = params
+        params.observe(self.coefficients_cache.clear)
+        self.coefficients_cache.clear()
+
     @property
     def to_json(self):
         return {'uid': self.uid,
@@ -941,44 +1037,54 @@ class Edfa(_Node):
         # TODO|jla: read amplifier actual frequencies from additional params in json
 
         self.channel_freq = spectral_info.frequency
-        amplifier_freq = arrange_frequencies(len(self.params.dgt), self.params.f_min, self.params.f_max)  # Hz
-        self.interpol_dgt = interp(spectral_info.frequency, amplifier_freq, self.params.dgt)
-
-        amplifier_freq = arrange_frequencies(len(self.params.gain_ripple), self.params.f_min, self.params.f_max)  # Hz
-        self.interpol_gain_ripple = interp(spectral_info.frequency, amplifier_freq, self.params.gain_ripple)
-
-        amplifier_freq = arrange_frequencies(len(self.params.nf_ripple), self.params.f_min, self.params.f_max)  # Hz
-        self.interpol_nf_ripple = interp(spectral_info.frequency, amplifier_freq, self.params.nf_ripple)
+        self.interpol_dgt, self.interpol_gain_ripple, self.interpol_nf_ripple = self.compile(spectral_info.frequency)
 
         self.nch = spectral_info.number_of_channels
         pin = spectral_info.signal + spectral_info.ase + spectral_info.nli
-        self.pin_db = watt2dbm(sum(pin))
+        self.pin_db = watt2dbm(sum(pin, axis=-1))
         # The following should be changed when we have the new spectral information including slot widths.
         # For now, with homogeneous spectrum, we can calculate it as the difference between neighbouring channels.
         self.slot_width = self.channel_freq[1] - self.channel_freq[0]
 
         """check power saturation and correct effective gain & power accordingly:"""
         # Compute the saturation accounting for actual power at the input of the amp
-        self.effective_gain = min(
-            self.effective_gain,
-            self.params.p_max - self.pin_db
-        )
+        gain = minimum(self.effective_gain, self.params.p_max - self.pin_db)
+        if spectral_info.batch_size is None:
+            self.effective_gain = gain
+        # else the design gain is kept and each scenario of the batch is amplified with its own saturated gain
 
         """check power saturation and correct target_gain accordingly:"""
-        self.nf = self._calc_nf()
-        self.gprofile = self._gain_profile(pin)
+        self.nf = self._calc_nf(gain=gain)
+        self.gprofile = self._gain_profile(pin, gain=gain)
 
         pout = (pin + self.noise_profile(spectral_info)) * db2lin(self.gprofile)
-        self.pout_db = lin2db(sum(pout * 1e3))
+        self.pout_db = lin2db(sum(pout * 1e3, axis=-1))
         # ase & nli are only calculated in signal bandwidth
         #    pout_db is not the absolute full output power (negligible if sufficient channels)
 
+    def compile(self, frequency):
+        """Interpolates the dynamic gain tilt, gain ripple and nf ripple of the amplifier on the frequency grid, or
+        returns them if already interpolated on this grid. The cache is emptied when the amplifier parameters are set.
+
+        :param frequency: the channel frequencies of the propagation plan [Hz]
+        :return: the interpolated dgt, gain_ripple and nf_ripple, one row each
+        """
+        params = (self.params.dgt, self.params.gain_ripple, self.params.nf_ripple)
+        frequency = asarray(frequency)
+        key = frequency.tobytes()
+        ripples = self.coefficients_cache.get(key)
+        if ripples is None:
+            ripples = array([interp(frequency, arrange_frequencies(len(param), self.params.f_min, self.params.f_max),
+                                    param) for param in params])
+            self.coefficients_cache.put(key, ripples, self.COEFFICIENTS_CACHE_SIZE)
+        return ripples
+
     def _nf(self, type_def, nf_model, nf_fit_coeff, gain_min, gain_flatmax, gain_target):
         # if hybrid raman, use edfa_gain_flatmax attribute, else use gain_flatmax
         #gain_flatmax = getattr(params, 'edfa_gain_flatmax', params.gain_flatmax)
-        pad = max(gain_min - gain_target, 0)
-        gain_target += pad
-        dg = max(gain_flatmax - gain_target, 0)
+        pad = maximum(gain_min - gain_target, 0)
+        gain_target = gain_target + pad
+        dg = maximum(gain_flatmax - gain_target, 0)
         if type_def == 'variable_gain':
             g1a = gain_target - nf_model.delta_p - dg
             nf_avg = lin2db(db2lin(nf_model.nf1) + db2lin(nf_model.nf2) / db2lin(g1a))
@@ -995,7 +1101,7 @@ class Edfa(_Node):
             # scale it to 50 GHz based on actual slot width.
             pin_ch_50GHz = self.pin_db - lin2db(self.nch) + lin2db(50e9 / self.slot_width)
             # model OSNR = f(Pin per 50 GHz channel)
-            nf_avg = pin_ch_50GHz - min((4 * pin_ch_50GHz + 275) / 7, 33) + 58
+            nf_avg = pin_ch_50GHz - minimum((4 * pin_ch_50GHz + 275) / 7, 33) + 58
         elif type_def == 'openroadm_booster':
             # model a zero-noise amp with "infinitely negative" (in dB) NF
             nf_avg = float('-inf')
@@ -1003,14 +1109,16 @@ class Edfa(_Node):
             nf_avg = polyval(nf_fit_coeff, -dg)
         return nf_avg + pad, pad
 
-    def _calc_nf(self, avg=False):
+    def _calc_nf(self, avg=False, gain=None):
         """nf calculation based on 2 models: self.params.nf_model.enabled from json import:
         True => 2 stages amp modelling based on precalculated nf1, nf2 and delta_p in build_OA_json
-        False => polynomial fit based on self.params.nf_fit_coeff"""
+        False => polynomial fit based on self.params.nf_fit_coeff
+        The gain is the effective gain, or an array with the gain of each scenario of a batch"""
+        gain = self.effective_gain if gain is None else gain
         # gain_min > gain_target TBD:
         if self.params.type_def == 'dual_stage':
             g1 = self.params.preamp_gain_flatmax
-            g2 = self.effective_gain - g1
+            g2 = gain - g1
             nf1_avg, pad = self._nf(self.params.preamp_type_def,
                                     self.params.preamp_nf_model,
                                     self.params.preamp_nf_fit_coeff,
@@ -1033,13 +1141,14 @@ class Edfa(_Node):
                                    self.params.nf_fit_coeff,
                                    self.params.gain_min,
                                    self.params.gain_flatmax,
-                                   self.effective_gain)
+                                   gain)
 
         self.att_in = pad  # not used to attenuate carriers, only used in _repr_ and _str_
         if avg:
             return nf_avg
         else:
-            return self.interpol_nf_ripple + nf_avg  # input VOA = 1 for 1 NF degradation
+            # input VOA = 1 for 1 NF degradation, one row per scenario of a batch
+            return self.interpol_nf_ripple + asarray(nf_avg)[..., newaxis]
 
     def noise_profile(self, spectral_info: SpectralInformation):
         """Computes amplifier ASE noise integrated over the signal bandwidth. This is calculated at amplifier input.
@@ -1081,15 +1190,16 @@ class Edfa(_Node):
         ase = h * spectral_info.baud_rate * spectral_info.frequency * db2lin(self.nf)  # W
         return ase  # in W at amplifier input
 
-    def _gain_profile(self, pin, err_tolerance=1.0e-11, simple_opt=True):
+    def _gain_profile(self, pin, err_tolerance=1.0e-11, simple_opt=True, gain=None):
         """
-        Pin : input power / channel in W
+        Pin : input power / channel in W, one row per scenario of a batch
 
         :param gain_ripple: design flat gain
         :param dgt: design gain tilt
         :param Pin: total input power in W
         :param gp: Average gain setpoint in dB units (provisioned gain)
         :param gtp: gain tilt setting (provisioned tilt)
+        :param gain: effective gain, or array with the effective gain of each scenario of a batch
         :type gain_ripple: numpy.ndarray
         :type dgt: numpy.ndarray
         :type Pin: numpy.ndarray
@@ -1110,13 +1220,14 @@ class Edfa(_Node):
             Ported from Matlab version written by David Boerges at Ciena.
         """
 
+        gain = asarray(self.effective_gain if gain is None else gain)[..., newaxis]
         # TODO|jla: check what param should be used (currently length(dgt))
         if len(self.interpol_dgt) == 1:
-            return array([self.effective_gain])
+            return gain
 
         # TODO|jla: find a way to use these or lose them. Primarily we should have
         # a way to determine if exceeding the gain or output power of the amp
-        tot_in_power_db = self.pin_db  # Pin in W
+        tot_in_power_db = asarray(self.pin_db)[..., newaxis]  # Pin in W
 
         # linear fit to get the
         p = polyfit(self.channel_freq, self.interpol_dgt, 1)
@@ -1139,18 +1250,18 @@ class Edfa(_Node):
         # first estimate of Er gain & VOA loss
         g1st = array(self.interpol_gain_ripple) + self.params.gain_flatmax \
             + array(self.interpol_dgt) * dgts1
-        voa = lin2db(mean(db2lin(g1st))) - self.effective_gain
+        voa = lin2db(mean(db2lin(g1st))) - gain
 
         # second estimate of amp ch gain using the channel input profile
         g2nd = g1st - voa
 
-        pout_db = lin2db(sum(pin * 1e3 * db2lin(g2nd)))
-        dgts2 = self.effective_gain - (pout_db - tot_in_power_db)
+        pout_db = lin2db(sum(pin * 1e3 * db2lin(g2nd), axis=-1, keepdims=True))
+        dgts2 = gain - (pout_db - tot_in_power_db)
 
         # center estimate of amp ch gain
         xcent = dgts2
         gcent = g1st - voa + array(self.interpol_dgt) * xcent
-        pout_db = lin2db(sum(pin * 1e3 * db2lin(gcent)))
+        pout_db = lin2db(sum(pin * 1e3 * db2lin(gcent), axis=-1, keepdims=True))
         gavg_cent = pout_db - tot_in_power_db
 
         # Lower estimate of amp ch gain
@@ -1162,25 +1273,22 @@ class Edfa(_Node):
 
         xlow = dgts2 - deltax
         glow = g1st - voa + array(self.interpol_dgt) * xlow
-        pout_db = lin2db(sum(pin * 1e3 * db2lin(glow)))
+        pout_db = lin2db(sum(pin * 1e3 * db2lin(glow), axis=-1, keepdims=True))
         gavg_low = pout_db - tot_in_power_db
 
         # upper gain estimate
         xhigh = dgts2 + deltax
         ghigh = g1st - voa + array(self.interpol_dgt) * xhigh
-        pout_db = lin2db(sum(pin * 1e3 * db2lin(ghigh)))
+        pout_db = lin2db(sum(pin * 1e3 * db2lin(ghigh), axis=-1, keepdims=True))
         gavg_high = pout_db - tot_in_power_db
 
         # compute slope
         slope1 = (gavg_low - gavg_cent) / (xlow - xcent)
         slope2 = (gavg_cent - gavg_high) / (xcent - xhigh)
 
-        if abs(self.effective_gain - gavg_cent) <= err_tolerance:
-            dgts3 = xcent
-        elif self.effective_gain < gavg_cent:
-            dgts3 = xcent - (gavg_cent - self.effective_gain) / slope1
-        else:
-            dgts3 = xcent + (-gavg_cent + self.effective_gain) / slope2
+        dgts3 = where(abs(gain - gavg_cent) <= err_tolerance, xcent,
+                      where(gain < gavg_cent, xcent - (gavg_cent - gain) / slope1,
+                            xcent + (-gavg_cent + gain) / slope2))
 
         return g1st - voa + array(self.interpol_dgt) * dgts3
 
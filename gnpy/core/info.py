@@ -13,7 +13,8 @@ from collections import namedtuple
 from collections.abc import Iterable
 from typing import Union
 from dataclasses import dataclass
-from numpy import argsort, mean, array, append, ones, ceil, any, zeros, outer, full, ndarray, asarray
+from numpy import argsort, mean, array, append, ones, ceil, any, zeros, full, ndarray, asarray, empty, arange, \
+    concatenate, newaxis
 
 from gnpy.core.utils import automatic_nch, db2lin, watt2dbm
 from gnpy.core.exceptions import SpectrumError
@@ -48,18 +49,55 @@ class Channel(
 class SpectralInformation(object):
     """Class containing the parameters of the entire WDM comb.
 
-    delta_pdb_per_channel: (per frequency) per channel delta power in dbm for the actual mix of channels"""
+    delta_pdb_per_channel: (per frequency) per channel delta power in dbm for the actual mix of channels
+
+    The signal, nli, ase and tx_power arrays may have a leading batch axis, one row per scenario (e.g. launch
+    power or channel loading) propagated at once through the same elements; all the other fields are shared by
+    the scenarios.
+
+    All the numerical per channel fields are stored as rows of a single contiguous buffer, sorted by frequency once at
+    creation, and exposed as named views: setting a field writes into its rows of the buffer."""
+
+    _CHANNEL_FIELDS = ('frequency', 'slot_width', 'baud_rate', 'roll_off', 'chromatic_dispersion', 'pmd', 'pdl',
+                       'latency', 'delta_pdb_per_channel', 'tx_osnr')
+    _POWER_FIELDS = ('signal', 'nli', 'ase', 'tx_power')
+
+    __slots__ = ('_buffer', '_batch_size', '_label', '_df', '_number_of_channels', '_channel_number',
+                 *(f'_{field}' for field in _CHANNEL_FIELDS + _POWER_FIELDS))
 
     def __init__(self, frequency: array, baud_rate: array, slot_width: array, signal: array, nli: array, ase: array,
                  roll_off: array, chromatic_dispersion: array, pmd: array, pdl: array, latency: array,
                  delta_pdb_per_channel: array, tx_osnr: array, tx_power: array, label: array):
-        indices = argsort(frequency)
-        self._frequency = frequency[indices]
-        self._df = outer(ones(frequency.shape), frequency) - outer(frequency, ones(frequency.shape))
-        self._number_of_channels = len(self._frequency)
+        signal = asarray(signal)
+        batch_size = signal.shape[0] if signal.ndim > 1 else None
+        rows = 1 if batch_size is None else batch_size
+        nb_fields = len(self._CHANNEL_FIELDS)
+        buffer = empty((nb_fields + len(self._POWER_FIELDS) * rows, signal.shape[-1]))
+        for row, values in enumerate((frequency, slot_width, baud_rate, roll_off, chromatic_dispersion, pmd, pdl,
+                                      latency, delta_pdb_per_channel, tx_osnr)):
+            buffer[row] = values
+        for i, values in enumerate((signal, nli, ase, tx_power)):
+            buffer[nb_fields + i * rows:nb_fields + (i + 1) * rows] = values
+        self._bind(buffer, batch_size, asarray(label))
+
+    @classmethod
+    def _from_buffer(cls, buffer: ndarray, batch_size: int, label: ndarray) -> SpectralInformation:
+        spectral_info = cls.__new__(cls)
+        spectral_info._bind(buffer, batch_size, label)
+        return spectral_info
+
+    def _bind(self, buffer, batch_size, label):
+        """Sorts the buffer by frequency if needed, checks the channel grid and binds the named views"""
+        indices = argsort(buffer[0])
+        if any(indices != arange(len(indices))):
+            buffer = buffer[:, indices]
+            label = label[indices]
+        self._batch_size = batch_size
+        self._label = label
+        self._df = None
+        self._bind_views(buffer)
+        self._number_of_channels = buffer.shape[1]
         self._channel_number = [*range(1, self._number_of_channels + 1)]
-        self._slot_width = slot_width[indices]
-        self._baud_rate = baud_rate[indices]
         overlap = self._frequency[:-1] + self._slot_width[:-1] / 2 > self._frequency[1:] - self._slot_width[1:] / 2
         if any(overlap):
             overlap = [pair for pair in zip(overlap * self._channel_number[:-1], overlap * self._channel_number[1:])
@@ -70,18 +108,43 @@ class SpectralInformation(object):
         if any(exceed):
             raise SpectrumError(f'Spectrum baud rate, including the roll off, larger than the slot width for channels: '
                                 f'{[ch for ch in exceed * self._channel_number if ch]}.')
-        self._signal = signal[indices]
-        self._nli = nli[indices]
-        self._ase = ase[indices]
-        self._roll_off = roll_off[indices]
-        self._chromatic_dispersion = chromatic_dispersion[indices]
-        self._pmd = pmd[indices]
-        self._pdl = pdl[indices]
-        self._latency = latency[indices]
-        self._delta_pdb_per_channel = delta_pdb_per_channel[indices]
-        self._tx_osnr = tx_osnr[indices]
-        self._tx_power = tx_power[indices]
-        self._label = label[indices]
+
+    def _bind_views(self, buffer):
+        """Binds the named views of the fields on the buffer"""
+        self._buffer = buffer
+        for row, field in enumerate(self._CHANNEL_FIELDS):
+            setattr(self, f'_{field}', buffer[row])
+        rows = 1 if self._batch_size is None else self._batch_size
+        for i, field in enumerate(self._POWER_FIELDS):
+            start = len(self._CHANNEL_FIELDS) + i * rows
+            setattr(self, f'_{field}', buffer[start] if self._batch_size is None else buffer[start:start + rows])
+
+    def _set_field(self, field, values):
+        """Writes the field into its rows of the buffer"""
+        if field in self._CHANNEL_FIELDS:
+            self._buffer[self._CHANNEL_FIELDS.index(field)] = values
+        else:
+            rows = 1 if self._batch_size is None else self._batch_size
+            start = len(self._CHANNEL_FIELDS) + self._POWER_FIELDS.index(field) * rows
+            self._buffer[start:start + rows] = values
+
+    def __reduce__(self):
+        return self._from_buffer, (self._buffer, self._batch_size, self._label)
+
+    def copy(self) -> SpectralInformation:
+        """Returns an independent copy of the spectral information"""
+        return self._from_buffer(self._buffer.copy(), self._batch_size, self._label.copy())
+
+    __copy__ = copy
+
+    @property
+    def nbytes(self):
+        """Memory of the numerical fields [bytes]"""
+        return self._buffer.nbytes
+
+    def signature(self):
+        """Returns a hashable value identifying the content of the spectral information"""
+        return self._buffer.shape, self._buffer.tobytes(), tuple(self._label.tolist())
 
     @property
     def frequency(self):
@@ -89,7 +152,10 @@ class SpectralInformation(object):
 
     @property
     def df(self):
-        """Matrix of relative frequency distances between all channels. Positive elements in the upper right side."""
+        """Matrix of relative frequency distances between all channels. Positive elements in the upper right side.
+        It is only computed on first access, by the NLI models that need it."""
+        if self._df is None:
+            self._df = self._frequency[newaxis, :] - self._frequency[:, newaxis]
         return self._df
 
     @property
@@ -104,6 +170,11 @@ class SpectralInformation(object):
     def number_of_channels(self):
         return self._number_of_channels
 
+    @property
+    def batch_size(self):
+        """Number of scenarios of a batched spectral information, None if not batched"""
+        return self._batch_size
+
     @property
     def powers(self):
         powers = zip(self.signal, self.nli, self.ase)
@@ -115,7 +186,7 @@ class SpectralInformation(object):
 
     @signal.setter
     def signal(self, signal):
-        self._signal = signal
+        self._set_field('signal', signal)
 
     @property
     def nli(self):
@@ -123,7 +194,7 @@ class SpectralInformation(object):
 
     @nli.setter
     def nli(self, nli):
-        self._nli = nli
+        self._set_field('nli', nli)
 
     @property
     def ase(self):
@@ -131,7 +202,7 @@ class SpectralInformation(object):
 
     @ase.setter
     def ase(self, ase):
-        self._ase = ase
+        self._set_field('ase', ase)
 
     @property
     def roll_off(self):
@@ -143,7 +214,7 @@ class SpectralInformation(object):
 
     @chromatic_dispersion.setter
     def chromatic_dispersion(self, chromatic_dispersion):
-        self._chromatic_dispersion = chromatic_dispersion
+        self._set_field('chromatic_dispersion', chromatic_dispersion)
 
     @property
     def pmd(self):
@@ -155,7 +226,7 @@ class SpectralInformation(object):
 
     @pmd.setter
     def pmd(self, pmd):
-        self._pmd = pmd
+        self._set_field('pmd', pmd)
 
     @property
     def pdl(self):
@@ -163,7 +234,7 @@ class SpectralInformation(object):
 
     @pdl.setter
     def pdl(self, pdl):
-        self._pdl = pdl
+        self._set_field('pdl', pdl)
 
     @property
     def latency(self):
@@ -171,7 +242,7 @@ class SpectralInformation(object):
 
     @latency.setter
     def latency(self, latency):
-        self._latency = latency
+        self._set_field('latency', latency)
 
     @property
     def delta_pdb_per_channel(self):
@@ -179,7 +250,7 @@ class SpectralInformation(object):
 
     @delta_pdb_per_channel.setter
     def delta_pdb_per_channel(self, delta_pdb_per_channel):
-        self._delta_pdb_per_channel = delta_pdb_per_channel
+        self._set_field('delta_pdb_per_channel', delta_pdb_per_channel)
 
     @property
     def tx_osnr(self):
@@ -187,7 +258,7 @@ class SpectralInformation(object):
 
     @tx_osnr.setter
     def tx_osnr(self, tx_osnr):
-        self._tx_osnr = tx_osnr
+        self._set_field('tx_osnr', tx_osnr)
 
     @property
     def tx_power(self):
@@ -195,7 +266,7 @@ class SpectralInformation(object):
 
     @tx_power.setter
     def tx_power(self, tx_power):
-        self._tx_power = tx_power
+        self._set_field('tx_power', tx_power)
 
     @property
     def channel_number(self):
@@ -226,26 +297,22 @@ class SpectralInformation(object):
         self.apply_gain_lin(gain_lin)
 
     def __add__(self, other: SpectralInformation):
+        if self.batch_size != other.batch_size:
+            raise SpectrumError('Spectra cannot be summed: batch sizes differ.')
         try:
-            return SpectralInformation(frequency=append(self.frequency, other.frequency),
-                                       slot_width=append(self.slot_width, other.slot_width),
-                                       signal=append(self.signal, other.signal), nli=append(self.nli, other.nli),
-                                       ase=append(self.ase, other.ase),
-                                       baud_rate=append(self.baud_rate, other.baud_rate),
-                                       roll_off=append(self.roll_off, other.roll_off),
-                                       chromatic_dispersion=append(self.chromatic_dispersion,
-                                                                   other.chromatic_dispersion),
-                                       pmd=append(self.pmd, other.pmd),
-                                       pdl=append(self.pdl, other.pdl),
-                                       latency=append(self.latency, other.latency),
-                                       delta_pdb_per_channel=append(self.delta_pdb_per_channel,
-                                                                    other.delta_pdb_per_channel),
-                                       tx_osnr=append(self.tx_osnr, other.tx_osnr),
-                                       tx_power=append(self.tx_power, other.tx_power),
-                                       label=append(self.label, other.label))
+            return self._from_buffer(concatenate((self._buffer, other._buffer), axis=1), self.batch_size,
+                                     append(self.label, other.label))
         except SpectrumError:
             raise SpectrumError('Spectra cannot be summed: channels overlapping.')
 
+    def scenario(self, index):
+        """Returns a copy of the spectral information of one scenario of the batch"""
+        nb_fields = len(self._CHANNEL_FIELDS)
+        index = range(self.batch_size)[index]
+        return self._from_buffer(concatenate((self._buffer[:nb_fields],
+                                              self._buffer[nb_fields + index::self.batch_size])),
+                                 None, self.label)
+
     def _replace(self, carriers):
         self.chromatic_dispersion = array([c.chromatic_dispersion for c in carriers])
         self.pmd = array([c.pmd for c in carriers])
@@ -317,6 +384,23 @@ def create_input_spectral_information(f_min, f_max, roll_off, baud_rate, spacing
                                                  tx_osnr=tx_osnr, tx_power=tx_power, label=label)
 
 
+def stack_spectral_information(spectral_infos: list[SpectralInformation]) -> SpectralInformation:
+    """Stacks the spectral information of several scenarios sharing the same channels into a batched spectral
+    information, whose signal, nli, ase and tx_power have one row per scenario. The other fields are taken from
+    the first scenario."""
+    first = spectral_infos[0]
+    for other in spectral_infos:
+        if other.batch_size is not None or other.number_of_channels != first.number_of_channels \
+                or (other.frequency != first.frequency).any() or (other.baud_rate != first.baud_rate).any() \
+                or (other.slot_width != first.slot_width).any():
+            raise SpectrumError('Spectra cannot be stacked: channels differ.')
+    nb_fields = len(SpectralInformation._CHANNEL_FIELDS)
+    power_rows = range(nb_fields, nb_fields + len(SpectralInformation._POWER_FIELDS))
+    buffer = concatenate([first._buffer[:nb_fields]]
+                         + [array([si._buffer[row] for si in spectral_infos]) for row in power_rows])
+    return SpectralInformation._from_buffer(buffer, len(spectral_infos), first.label)
+
+
 def carriers_to_spectral_information(initial_spectrum: dict[float, Carrier],
                                      power: float) -> SpectralInformation:
     """Initial spectrum is a dict with key = carrier frequency, and value a Carrier object.
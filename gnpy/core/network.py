@@ -12,6 +12,8 @@ from copy import deepcopy
 from operator import attrgetter
 from collections import namedtuple
 from logging import getLogger
+from weakref import WeakKeyDictionary
+from numpy import arange, broadcast_to, concatenate, interp, isfinite, unique
 
 from gnpy.core import elements
 from gnpy.core.exceptions import ConfigurationError, NetworkTopologyError
@@ -22,9 +24,99 @@ from gnpy.core.science_utils import RamanSolver
 
 
 logger = getLogger(__name__)
+NF_TABLE_GAIN_STEP = 0.01  # [dB] gain step of the NfTable of the amplifier varieties
+NF_TABLE_GAIN_MARGIN = 10  # [dB] gain range of the NfTable above the max flat gain of the variety
+_nf_tables = WeakKeyDictionary()  # NfTable of the amplifiers of the equipment libraries
 
 
-def edfa_nf(gain_target, variety_type, equipment):
+class NetworkIndex:
+    """Index of the elements of a network by uid, with one bucket per element type
+
+    The index is built once per network by :func:`network_index` and updated by the functions
+    which add or remove elements (eg :func:`split_fiber` and the amplifier insertion).
+    Buckets keep the order of the network nodes.
+    """
+    BUCKETS = {
+        'transceivers': elements.Transceiver,
+        'roadms': elements.Roadm,
+        'fibers': elements.Fiber,
+        'edfas': elements.Edfa,
+    }
+
+    def __init__(self, network):
+        self.network = network
+        self._build()
+
+    def _build(self):
+        self.nodes = {}
+        for name in self.BUCKETS:
+            setattr(self, name, {})
+        for node in self.network.nodes():
+            self.add(node)
+
+    def _buckets(self, node):
+        return [getattr(self, name) for name, cls in self.BUCKETS.items() if isinstance(node, cls)]
+
+    def add(self, node):
+        self.nodes[node.uid] = node
+        for bucket in self._buckets(node):
+            bucket[node.uid] = node
+
+    def remove(self, node):
+        self.nodes.pop(node.uid, None)
+        for bucket in self._buckets(node):
+            bucket.pop(node.uid, None)
+
+    def _lookup(self, uid):
+        """node of the uid, the index is rebuilt if the node was renamed or removed from the network"""
+        node = self.nodes.get(uid)
+        if node is not None and (node.uid != uid or node not in self.network):
+            self._build()
+            node = self.nodes.get(uid)
+        return node
+
+    def get(self, uid, default=None):
+        node = self._lookup(uid)
+        return default if node is None else node
+
+    def __getitem__(self, uid):
+        node = self._lookup(uid)
+        if node is None:
+            raise KeyError(uid)
+        return node
+
+    def __contains__(self, uid):
+        return self._lookup(uid) is not None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def matches(self, network):
+        """True if the index holds exactly the nodes of the network, under their current uid"""
+        return len(self.nodes) == network.number_of_nodes() \
+            and all(self.nodes.get(node.uid) is node for node in network.nodes())
+
+
+def network_index(network, check=False):
+    """Return the uid index of the network, building it on first use
+
+    The index is stored in the graph attributes. It is rebuilt if it does not hold as many nodes as the network,
+    ie if elements were added or removed without updating it, and a node found under a uid that it no longer has
+    rebuilds it. With check, the index is also rebuilt if its nodes are not exactly the nodes of the network
+    under their current uid, which takes a pass over the network.
+    """
+    index = network.graph.get('index')
+    if index is not None and index.network is not network:
+        # graph views share the attributes of the original graph: leave its index untouched
+        return NetworkIndex(network)
+    if index is None or len(index) != network.number_of_nodes() or (check and not index.matches(network)):
+        index = NetworkIndex(network)
+        network.graph['index'] = index
+    return index
+
+
+def _nf_amplifier(gain_target, variety_type, equipment):
+    """Edfa of the variety in the conditions in which select_edfa compares the NF of the varieties"""
     amp_params = equipment['Edfa'][variety_type]
     amp = elements.Edfa(
         uid='calc_NF',
@@ -37,15 +129,70 @@ def edfa_nf(gain_target, variety_type, equipment):
     amp.pin_db = 0
     amp.nch = 88
     amp.slot_width = 50e9
-    return amp._calc_nf(True)
+    return amp
+
+
+def edfa_nf(gain_target, variety_type, equipment):
+    return _nf_amplifier(gain_target, variety_type, equipment)._calc_nf(True)
+
+
+class NfTable:
+    """NF of an amplifier variety versus its gain target, as computed by :func:`edfa_nf`, tabulated every
+    gain_step dB from 0 dB to the max flat gain of the variety + NF_TABLE_GAIN_MARGIN.
+
+    The gain limits of the NF models (min and max flat gains, and those of the booster of a dual stage amplifier)
+    are added to the grid, so that the NF is smooth between consecutive gains of the table and the error of the
+    linear interpolation is negligible. Out of the table, the NF is computed exactly.
+    """
+
+    def __init__(self, variety_type, equipment, gain_step=NF_TABLE_GAIN_STEP):
+        self.variety_type = variety_type
+        amp = equipment['Edfa'][variety_type]
+        self.gain = self.nf = None
+        if amp.gain_flatmax is None:
+            return
+        gain_max = amp.gain_flatmax + NF_TABLE_GAIN_MARGIN
+        limits = [amp.gain_min, amp.gain_flatmax, gain_max]
+        if amp.type_def == 'dual_stage':
+            limits += [amp.preamp_gain_flatmax + amp.booster_gain_min,
+                       amp.preamp_gain_flatmax + amp.booster_gain_flatmax]
+        gain = unique(concatenate([arange(0, gain_max, gain_step),
+                                   [g for g in limits if g is not None and 0 <= g <= gain_max]]))
+        nf = broadcast_to(_nf_amplifier(gain[0], variety_type, equipment)._calc_nf(True, gain=gain), gain.shape)
+        # an infinite NF (noiseless amplifier model) can not be interpolated
+        if isfinite(nf).all():
+            self.gain, self.nf = gain, nf
+
+    def __call__(self, gain_target, equipment):
+        if self.gain is None or not self.gain[0] <= gain_target <= self.gain[-1]:
+            return edfa_nf(gain_target, self.variety_type, equipment)
+        return interp(gain_target, self.gain, self.nf)
+
+
+def nf_table(variety_type, equipment):
+    """NfTable of the amplifier variety, computed on the first lookup of each amplifier of the equipment library"""
+    amp = equipment['Edfa'][variety_type]
+    table = _nf_tables.get(amp)
+    if table is None:
+        table = NfTable(variety_type, equipment)
+        _nf_tables[amp] = table
+    return table
+
+
+Edfa_list = namedtuple('Edfa_list', 'variety power gain_min nf')
 
 
 def select_edfa(raman_allowed, gain_target, power_target, equipment, uid, restrictions=None, verbose=True):
     """amplifer selection algorithm
     @Orange Jean-Luc Augé
     """
-    Edfa_list = namedtuple('Edfa_list', 'variety power gain_min nf')
     TARGET_EXTENDED_GAIN = equipment['Span']['default'].target_extended_gain
+    # NF interpolated from the tables of the varieties, unless the exact computation is required
+    if equipment['Span']['default'].exact_nf:
+        amp_nf = edfa_nf
+    else:
+        def amp_nf(gain_target, variety_type, equipment):
+            return nf_table(variety_type, equipment)(gain_target, equipment)
 
     # for roadm restriction only: create a dict including not allowed for design amps
     # because main use case is to have specific radm amp which are not allowed for ILA
@@ -65,7 +212,7 @@ def select_edfa(raman_allowed, gain_target, power_target, equipment, uid, restri
         variety=edfa_variety,
         power=min(pin + edfa.gain_flatmax + TARGET_EXTENDED_GAIN, edfa.p_max) - power_target,
         gain_min=gain_target + 3 - edfa.gain_min,
-        nf=edfa_nf(gain_target, edfa_variety, equipment))
+        nf=amp_nf(gain_target, edfa_variety, equipment))
         for edfa_variety, edfa in edfa_dict.items()
         if ((edfa.allowed_for_design or restrictions is not None) and not edfa.raman)]
 
@@ -75,7 +222,7 @@ def select_edfa(raman_allowed, gain_target, power_target, equipment, uid, restri
         variety=edfa_variety,
         power=min(pin + edfa.gain_flatmax + TARGET_EXTENDED_GAIN, edfa.p_max) - power_target,
         gain_min=gain_target - edfa.gain_min,
-        nf=edfa_nf(gain_target, edfa_variety, equipment))
+        nf=amp_nf(gain_target, edfa_variety, equipment))
         for edfa_variety, edfa in edfa_dict.items()
         if (edfa.allowed_for_design and edfa.raman)] \
         if raman_allowed else []
@@ -589,6 +736,7 @@ def set_roadm_internal_paths(roadm, network):
 
 
 def add_roadm_booster(network, roadm):
+    index = network_index(network)
     next_nodes = [n for n in network.successors(roadm)
                   if not (isinstance(n, elements.Transceiver) or isinstance(n, elements.Fused)
                   or isinstance(n, elements.Edfa))]
@@ -611,11 +759,13 @@ def add_roadm_booster(network, roadm):
                 'tilt_target': 0,
             })
         network.add_node(amp)
+        index.add(amp)
         network.add_edge(roadm, amp, weight=0.01)
         network.add_edge(amp, next_node, weight=0.01)
 
 
 def add_roadm_preamp(network, roadm):
+    index = network_index(network)
     prev_nodes = [n for n in network.predecessors(roadm)
                   if not (isinstance(n, elements.Transceiver) or isinstance(n, elements.Fused) or isinstance(n, elements.Edfa))]
     # no amplification for fused spans or TRX
@@ -637,6 +787,7 @@ def add_roadm_preamp(network, roadm):
                 'tilt_target': 0,
             })
         network.add_node(amp)
+        index.add(amp)
         if isinstance(prev_node, elements.Fiber):
             edgeweight = prev_node.params.length
         else:
@@ -649,6 +800,7 @@ def add_inline_amplifier(network, fiber):
     next_node = get_next_node(fiber, network)
     if isinstance(next_node, elements.Fiber) or isinstance(next_node, elements.RamanFiber):
         # no amplification for fused spans or TRX
+        index = network_index(network)
         network.remove_edge(fiber, next_node)
         amp = elements.Edfa(
             uid=f'Edfa_{fiber.uid}',
@@ -666,6 +818,7 @@ def add_inline_amplifier(network, fiber):
                 'tilt_target': 0,
             })
         network.add_node(amp)
+        index.add(amp)
         network.add_edge(fiber, amp, weight=fiber.params.length)
         network.add_edge(amp, next_node, weight=0.01)
 
@@ -718,7 +871,9 @@ def split_fiber(network, fiber, bounds, target_length):
     except StopIteration:
         raise NetworkTopologyError(f'Fiber {fiber.uid} is not properly connected, please check network topology')
 
+    index = network_index(network)
     network.remove_node(fiber)
+    index.remove(fiber)
 
     fiber.params.length = new_length
 
@@ -741,6 +896,7 @@ def split_fiber(network, fiber, bounds, target_length):
         else:
             edgeweight = 0.01
         network.add_edge(prev_node, new_span, weight=edgeweight)
+        index.add(new_span)
         prev_node = new_span
     if isinstance(prev_node, elements.Fiber):
         edgeweight = prev_node.params.length
@@ -794,14 +950,15 @@ def add_missing_elements_in_network(network, equipment):
     min_length = max(int(default_span_data.padding / 0.2 * 1e3), 50_000)
     bounds = range(min_length, max_length)
     target_length = max(min_length, min(max_length, 90_000))
-    fibers = [f for f in network.nodes() if isinstance(f, elements.Fiber)]
+    index = network_index(network)
+    fibers = list(index.fibers.values())
     for fiber in fibers:
         split_fiber(network, fiber, bounds, target_length)
-    roadms = [r for r in network.nodes() if isinstance(r, elements.Roadm)]
+    roadms = list(index.roadms.values())
     for roadm in roadms:
         add_roadm_preamp(network, roadm)
         add_roadm_booster(network, roadm)
-    fibers = [f for f in network.nodes() if isinstance(f, elements.Fiber)]
+    fibers = list(index.fibers.values())
     for fiber in fibers:
         add_inline_amplifier(network, fiber)
 
@@ -811,7 +968,7 @@ def add_missing_fiber_attributes(network, equipment):
     EOL is added as a connector loss
     """
     default_span_data = equipment['Span']['default']
-    fibers = [f for f in network.nodes() if isinstance(f, elements.Fiber)]
+    fibers = list(network_index(network).fibers.values())
     add_connector_loss(network, fibers, default_span_data.con_in, default_span_data.con_out, default_span_data.EOL)
     # don't group split fiber and add amp in the same loop
     # =>for code clarity (at the expense of speed):
@@ -821,8 +978,9 @@ def add_missing_fiber_attributes(network, equipment):
 def build_network(network, equipment, pref_ch_db, pref_total_db, set_connector_losses=True, verbose=True):
     """Set roadm equalization target and amplifier gain and power
     """
-    roadms = [r for r in network.nodes() if isinstance(r, elements.Roadm)]
-    transceivers = [t for t in network.nodes() if isinstance(t, elements.Transceiver)]
+    index = network_index(network)
+    roadms = list(index.roadms.values())
+    transceivers = list(index.transceivers.values())
 
     if set_connector_losses:
         add_missing_fiber_attributes(network, equipment)
@@ -836,7 +994,10 @@ def build_network(network, equipment, pref_ch_db, pref_total_db, set_connector_l
     for roadm in roadms:
         set_roadm_input_powers(network, roadm, equipment, pref_ch_db)
         set_roadm_internal_paths(roadm, network)
-    for fiber in [f for f in network.nodes() if isinstance(f, (elements.Fiber, elements.RamanFiber))]:
+    # reference powers of a previous design must not be used as a starting point
+    for fiber in index.fibers.values():
+        fiber.ref_pch_in_dbm = None
+    for fiber in index.fibers.values():
         set_fiber_input_power(network, fiber, equipment, pref_ch_db)
 
 
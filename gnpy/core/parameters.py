@@ -26,6 +26,14 @@ class Parameters:
                 new_dict[key] = instance_dict['_' + key]
         return new_dict
 
+    def observe(self, callback):
+        """Registers a callback called whenever a parameter is set, eg to discard the values computed from them"""
+        vars(self).setdefault('_observers', []).append(callback)
+
+    def _notify(self):
+        for callback in vars(self).get('_observers', []):
+            callback()
+
 
 class PumpParams(Parameters):
     def __init__(self, power, frequency, propagation_direction):
@@ -35,26 +43,40 @@ class PumpParams(Parameters):
 
 
 class RamanParams(Parameters):
-    def __init__(self, flag=False, result_spatial_resolution=10e3, solver_spatial_resolution=50):
+    def __init__(self, flag=False, result_spatial_resolution=10e3, solver_spatial_resolution=50, solver='euler',
+                 slice_width=None, srs_cache_size=10):
         """Simulation parameters used within the Raman Solver
 
         :params flag: boolean for enabling/disable the evaluation of the Raman power profile in frequency and position
         :params result_spatial_resolution: spatial resolution of the evaluated Raman power profile
         :params solver_spatial_resolution: spatial step for the iterative solution of the first order ode
+        :params solver: integration scheme of the first order ode: 'euler' for the explicit Euler method on the
+        power, 'rk4' for the fourth order Runge-Kutta method on the logarithm of the power, 'rk45' for the adaptive
+        Dormand-Prince method on the logarithm of the power
+        :params slice_width: if set, the channels are aggregated in spectral slices of this width for the solution of
+        the first order ode and their loss profile is interpolated from the ones of the slices
+        :params srs_cache_size: memory cap in MB of the cache of the Raman profiles of each fiber (0 disables the cache)
         """
         self.flag = flag
         self.result_spatial_resolution = result_spatial_resolution  # [m]
         self.solver_spatial_resolution = solver_spatial_resolution  # [m]
+        self.solver = solver.lower()
+        self.slice_width = slice_width  # [Hz]
+        self.srs_cache_size = srs_cache_size  # [MB]
 
     def to_json(self):
         return {"flag": self.flag,
                 "result_spatial_resolution": self.result_spatial_resolution,
-                "solver_spatial_resolution": self.solver_spatial_resolution}
+                "solver_spatial_resolution": self.solver_spatial_resolution,
+                "solver": self.solver,
+                "slice_width": self.slice_width,
+                "srs_cache_size": self.srs_cache_size}
 
 
 class NLIParams(Parameters):
     def __init__(self, method='gn_model_analytic', dispersion_tolerance=1, phase_shift_tolerance=0.1,
-                 computed_channels=None, computed_number_of_channels=None):
+                 computed_channels=None, computed_number_of_channels=None, batched=False, workers=1,
+                 eta_cache_size=100, xpm_cutoff=None, adaptive_tolerance=None, psi_table_dir=None):
         """Simulation parameters used within the Nli Solver
 
         :params method: formula for NLI calculation
@@ -63,19 +85,38 @@ class NLIParams(Parameters):
         :params computed_channels: the NLI is evaluated for these channels and extrapolated for the others
         :params computed_number_of_channels: the NLI is evaluated for this number of channels equally distributed
         in the spectrum and extrapolated for the others
+        :params batched: if True, the ggn model integrates all the pumps of a CUT at once on padded frequency grids
+        :params workers: number of processes used to compute the CUTs of the ggn model
+        :params eta_cache_size: memory cap in MB of the cache of gn model eta matrices (0 disables the cache)
+        :params xpm_cutoff: frequency offset beyond which the gn model uses the asymptotic XPM expression
+        :params adaptive_tolerance: the ggn model refines the computed channels until the NLI interpolation error
+        is below this tolerance in dB
+        :params psi_table_dir: directory of the psi tables used by the ggn_spectrally_separated_table method
         """
         self.method = method.lower()
         self.dispersion_tolerance = dispersion_tolerance
         self.phase_shift_tolerance = phase_shift_tolerance
         self.computed_channels = computed_channels
         self.computed_number_of_channels = computed_number_of_channels
+        self.batched = batched
+        self.workers = workers
+        self.eta_cache_size = eta_cache_size  # [MB]
+        self.xpm_cutoff = xpm_cutoff  # [Hz]
+        self.adaptive_tolerance = adaptive_tolerance  # [dB]
+        self.psi_table_dir = psi_table_dir
 
     def to_json(self):
         return {"method": self.method,
                 "dispersion_tolerance": self.dispersion_tolerance,
                 "phase_shift_tolerance": self.phase_shift_tolerance,
                 "computed_channels": self.computed_channels,
-                "computed_number_of_channels": self.computed_number_of_channels}
+                "computed_number_of_channels": self.computed_number_of_channels,
+                "batched": self.batched,
+                "workers": self.workers,
+                "eta_cache_size": self.eta_cache_size,
+                "xpm_cutoff": self.xpm_cutoff,
+                "adaptive_tolerance": self.adaptive_tolerance,
+                "psi_table_dir": self.psi_table_dir}
 
 
 class SimParams(Parameters):
@@ -357,6 +398,7 @@ class FiberParams(Parameters):
     def length(self, length):
         """length must be in m"""
         self._length = length
+        self._notify()
 
     @property
     def att_in(self):
@@ -365,6 +407,7 @@ class FiberParams(Parameters):
     @att_in.setter
     def att_in(self, att_in):
         self._att_in = att_in
+        self._notify()
 
     @property
     def con_in(self):
@@ -373,6 +416,7 @@ class FiberParams(Parameters):
     @con_in.setter
     def con_in(self, con_in):
         self._con_in = con_in
+        self._notify()
 
     @property
     def con_out(self):
@@ -385,6 +429,7 @@ class FiberParams(Parameters):
     @con_out.setter
     def con_out(self, con_out):
         self._con_out = con_out
+        self._notify()
 
     @property
     def dispersion(self):
@@ -461,7 +506,7 @@ class FiberParams(Parameters):
         return dictionary
 
 
-class EdfaParams:
+class EdfaParams(Parameters):
     default_values = {
         'f_min': 191.3e12,
         'f_max': 196.1e12,
@@ -592,6 +637,7 @@ class EdfaParams:
     def update_params(self, kwargs):
         for k, v in kwargs.items():
             setattr(self, k, self.update_params(**v) if isinstance(v, dict) else v)
+        self._notify()
 
 
 class EdfaOperational:
@@ -12,10 +12,18 @@ The solvers take as input instances of the spectral information, the fiber and t
 
 from numpy import interp, pi, zeros, cos, array, append, ones, exp, arange, sqrt, trapz, arcsinh, clip, abs, sum, \
     concatenate, flip, outer, inner, transpose, max, format_float_scientific, diag, sort, unique, argsort, cumprod, \
-    polyfit
+    polyfit, pad, newaxis, diff, swapaxes, matmul, ndarray, array_split, searchsorted, where, bincount, inf, \
+    asarray, ndindex, load, savez, linspace, einsum, stack, log, errstate, maximum, finfo
+from numpy.linalg import lstsq
+import atexit
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from logging import getLogger
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
 from scipy.constants import k, h
 from scipy.interpolate import interp1d
+from scipy.integrate import solve_ivp
 from math import isclose
 
 from gnpy.core.utils import db2lin, lin2db
@@ -25,6 +33,34 @@ from gnpy.core.info import SpectralInformation
 
 logger = getLogger(__name__)
 sim_params = SimParams()
+_worker_pools = {}  # process pool used for the parallel NLI computation, by number of workers
+_psi_tables = {}  # ggn psi tables, by directory and fiber type variety
+_missing_psi_tables = set()  # directory and fiber type variety of the missing tables, already reported
+
+
+def _worker_pool(workers):
+    """Returns the process pool of the parallel NLI computation with this number of workers.
+
+    The pool is kept for the next computations; a pool with another number of workers is shut down.
+    """
+    for other_workers in [n for n in _worker_pools if n != workers]:
+        _worker_pools.pop(other_workers).shutdown()
+    if workers not in _worker_pools:
+        _worker_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _worker_pools[workers]
+
+
+@atexit.register
+def shutdown_worker_pools():
+    """Shuts down the worker processes of the parallel NLI computation, if any"""
+    while _worker_pools:
+        _worker_pools.popitem()[1].shutdown()
+
+
+def _log_power(power):
+    """Logarithm of the power, floored to the smallest positive float so that a zero power (e.g. a switched off
+    pump or an empty slot) does not give -inf in the log domain solvers"""
+    return log(maximum(power, finfo(float).tiny))
 
 
 def raised_cosine(frequency, channel_frequency, channel_baud_rate, channel_roll_off):
@@ -35,7 +71,7 @@ def raised_cosine(frequency, channel_frequency, channel_baud_rate, channel_roll_
     :param channel_baud_rate: channel baud rate in Hz
     :param channel_roll_off: channel roll off
     """
-    raised_cosine_mask = zeros(frequency.size)
+    raised_cosine_mask = zeros(frequency.shape)
     base_frequency = frequency - channel_frequency
     ts = 1 / channel_baud_rate
     pass_band = (1 - channel_roll_off) * channel_baud_rate / 2
@@ -50,6 +86,59 @@ def raised_cosine(frequency, channel_frequency, channel_baud_rate, channel_roll_
     return raised_cosine_mask
 
 
+class LruCache:
+    """Least recently used cache of numpy arrays, bounded by the total memory of the stored arrays.
+
+    The memory cap is given at each insertion, so that it follows the current simulation parameters;
+    a cap of 0 disables the caching. Stored arrays are made read only since they are shared between callers.
+    Objects made of numpy arrays can be stored as well if they expose the nbytes and setflags of numpy arrays.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self.size = 0  # [bytes]
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the array stored for key, or None if missing"""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, max_size):
+        """Stores value for key, evicting the least recently used arrays to keep the total size below max_size"""
+        if value.nbytes > max_size:
+            return
+        value.setflags(write=False)
+        if key in self._entries:
+            self.size -= self._entries.pop(key).nbytes
+        self._entries[key] = value
+        self.size += value.nbytes
+        while self.size > max_size:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.nbytes
+
+    def clear(self):
+        """Removes all the stored arrays and resets the hit and miss counters"""
+        self._entries.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self):
+        """Number of hits, misses and stored entries, and total size in bytes of the cache"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'size': self.size}
+
+
 class StimulatedRamanScattering:
     def __init__(self, power_profile, loss_profile, frequency, z):
         """
@@ -62,13 +151,33 @@ class StimulatedRamanScattering:
         self.loss_profile = loss_profile
         # Field loss profile matrix along frequency and z
         self.rho = sqrt(loss_profile)
-        self.frequency = frequency
+        self.frequency = array(frequency)
         self.z = z
 
+    @property
+    def nbytes(self):
+        """Total memory of the profiles [bytes]"""
+        return sum([self.power_profile.nbytes, self.loss_profile.nbytes, self.rho.nbytes, self.frequency.nbytes,
+                    self.z.nbytes])
+
+    def setflags(self, write):
+        """Sets the write flag of all the profiles"""
+        for profile in (self.power_profile, self.loss_profile, self.rho, self.frequency, self.z):
+            profile.setflags(write=write)
+
+    def scenario(self, index):
+        """Returns the profiles of one scenario of a batched spectral information"""
+        loss_profile = self.loss_profile[index] if self.loss_profile.ndim > 2 else self.loss_profile
+        return StimulatedRamanScattering(self.power_profile[index], loss_profile, self.frequency, self.z)
+
 
 class RamanSolver:
     """This class contains the methods to calculate the Raman scattering effect."""
 
+    ANDERSON_DEPTH = 3  # number of previous sweeps mixed by the Anderson acceleration of the iterative algorithm
+    WARM_START_STEP = 2e3  # [m] step of the initial guess of the iterative algorithm
+    RK45_TOLERANCE = 1e-10  # relative and absolute tolerances of the log-power in the adaptive Raman solver
+
     @staticmethod
     def _create_lumped_losses(z, lumped_losses, z_lumped_losses):
         lumped_losses = concatenate((lumped_losses, ones(z.size)))
@@ -93,9 +202,27 @@ class RamanSolver:
         frequency = spectral_info.frequency
         alpha = fiber.alpha(frequency)
         loss_profile = exp(- outer(alpha, z)) * lumped_loss_acc
-        power_profile = outer(spectral_info.signal, ones(z.size)) * loss_profile
+        power_profile = spectral_info.signal[..., newaxis] * loss_profile
         return StimulatedRamanScattering(power_profile, loss_profile, spectral_info.frequency, z)
 
+    @staticmethod
+    def cached_stimulated_raman_scattering(spectral_info: SpectralInformation, fiber):
+        """Returns the Raman profile of calculate_stimulated_raman_scattering from the cache of the fiber, computing
+        and storing it if the input signal, the Raman pumps or the solver parameters are new to the fiber.
+        The returned profile is shared and read only.
+        """
+        pumps = getattr(fiber, 'raman_pumps', None)
+        key = (spectral_info.signal.tobytes(), spectral_info.frequency.tobytes(), pumps,
+               sim_params.raman_params.flag, sim_params.raman_params.result_spatial_resolution,
+               sim_params.raman_params.solver_spatial_resolution, sim_params.raman_params.solver,
+               sim_params.raman_params.slice_width,
+               RamanSolver.ANDERSON_DEPTH, RamanSolver.WARM_START_STEP, RamanSolver.RK45_TOLERANCE)
+        stimulated_raman_scattering = fiber.srs_cache.get(key)
+        if stimulated_raman_scattering is None:
+            stimulated_raman_scattering = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber)
+            fiber.srs_cache.put(key, stimulated_raman_scattering, sim_params.raman_params.srs_cache_size * 1e6)
+        return stimulated_raman_scattering
+
     @staticmethod
     def calculate_stimulated_raman_scattering(spectral_info: SpectralInformation, fiber):
         """Evaluates the Raman profile along the z axis for all the frequency propagated in the fiber
@@ -103,7 +230,14 @@ class RamanSolver:
         """
         logger.debug('Start computing fiber Stimulated Raman Scattering')
 
-        if sim_params.raman_params.flag:
+        if sim_params.raman_params.flag and spectral_info.batch_size is not None:
+            # The Raman profile depends on the power of each scenario of the batch
+            scenarios = [RamanSolver.calculate_stimulated_raman_scattering(spectral_info.scenario(i), fiber)
+                         for i in range(spectral_info.batch_size)]
+            stimulated_raman_scattering = StimulatedRamanScattering(
+                array([srs.power_profile for srs in scenarios]), array([srs.loss_profile for srs in scenarios]),
+                scenarios[0].frequency, scenarios[0].z)
+        elif sim_params.raman_params.flag:
             # Raman parameters
             z_resolution = sim_params.raman_params.result_spatial_resolution
             z_step = sim_params.raman_params.solver_spatial_resolution
@@ -114,6 +248,12 @@ class RamanSolver:
             # Lumped losses array definition
             z, lumped_losses = RamanSolver._create_lumped_losses(z, fiber.lumped_losses, fiber.z_lumped_losses)
 
+            # Signal spectrum, possibly aggregated in spectral slices
+            signal, signal_frequency = spectral_info.signal, spectral_info.frequency
+            if sim_params.raman_params.slice_width:
+                signal_frequency, signal = \
+                    RamanSolver._spectral_slices(signal_frequency, signal, sim_params.raman_params.slice_width)
+
             if hasattr(fiber, 'raman_pumps'):
                 # TODO: verify co-propagating pumps computation and in general unsorted frequency
                 # Co-propagating spectrum definition
@@ -122,34 +262,36 @@ class RamanSolver:
                 co_raman_pump_frequency = array([pump.frequency for pump in fiber.raman_pumps
                                                  if pump.propagation_direction == 'coprop'])
 
-                co_power = concatenate((spectral_info.signal, co_raman_pump_power))
-                co_frequency = concatenate((spectral_info.frequency, co_raman_pump_frequency))
+                co_power = concatenate((signal, co_raman_pump_power))
+                co_frequency = concatenate((signal_frequency, co_raman_pump_frequency))
 
                 # Counter-propagating spectrum definition
                 cnt_power = array([pump.power for pump in fiber.raman_pumps
                                    if pump.propagation_direction == 'counterprop'])
                 cnt_frequency = array([pump.frequency for pump in fiber.raman_pumps
                                        if pump.propagation_direction == 'counterprop'])
-                # Co-propagating profile initialization
-                co_power_profile = zeros([co_frequency.size, z.size])
-                if co_frequency.size:
-                    co_cr = fiber.cr(co_frequency)
-                    co_alpha = fiber.alpha(co_frequency)
-                    co_power_profile = \
-                        RamanSolver.first_order_derivative_solution(co_power, co_alpha, co_cr, z, lumped_losses)
-                # Counter-propagating profile initialization
-                cnt_power_profile = zeros([cnt_frequency.size, z.size])
-                if cnt_frequency.size:
-                    cnt_cr = fiber.cr(cnt_frequency)
-                    cnt_alpha = fiber.alpha(cnt_frequency)
-                    cnt_power_profile = \
-                        flip(RamanSolver.first_order_derivative_solution(cnt_power, cnt_alpha, cnt_cr,
-                                                                         z[-1] - flip(z), flip(lumped_losses)), axis=1)
-                # Co-propagating and Counter-propagating Profile Computation
                 if co_frequency.size and cnt_frequency.size:
+                    # Co-propagating and Counter-propagating Profile Computation
+                    cnt_power_profile = RamanSolver._counter_propagating_initial_guess(
+                        co_power, cnt_power, co_frequency, cnt_frequency, z, fiber, lumped_losses)
                     co_power_profile, cnt_power_profile = \
-                        RamanSolver.iterative_algorithm(co_power_profile, cnt_power_profile,
+                        RamanSolver.iterative_algorithm(outer(co_power, ones(z.size)), cnt_power_profile,
                                                         co_frequency, cnt_frequency, z, fiber, lumped_losses)
+                else:
+                    # Co-propagating profile
+                    co_power_profile = zeros([co_frequency.size, z.size])
+                    if co_frequency.size:
+                        co_cr = fiber.cr(co_frequency)
+                        co_alpha = fiber.alpha(co_frequency)
+                        co_power_profile = \
+                            RamanSolver.first_order_derivative_solution(co_power, co_alpha, co_cr, z, lumped_losses)
+                    # Counter-propagating profile
+                    cnt_power_profile = zeros([cnt_frequency.size, z.size])
+                    if cnt_frequency.size:
+                        cnt_cr = fiber.cr(cnt_frequency)
+                        cnt_alpha = fiber.alpha(cnt_frequency)
+                        cnt_power_profile = flip(RamanSolver.first_order_derivative_solution(
+                            cnt_power, cnt_alpha, cnt_cr, z[-1] - flip(z), flip(lumped_losses)), axis=1)
                 # Complete Power Profile
                 power_profile = concatenate((co_power_profile, cnt_power_profile), axis=0)
                 # Complete Loss Profile
@@ -160,14 +302,22 @@ class RamanSolver:
                 frequency = concatenate((co_frequency, cnt_frequency))
             else:
                 # Without Raman pumps
-                alpha = fiber.alpha(spectral_info.frequency)
-                cr = fiber.cr(spectral_info.frequency)
+                alpha = fiber.alpha(signal_frequency)
+                cr = fiber.cr(signal_frequency)
                 # Power profile
                 power_profile = \
-                    RamanSolver.first_order_derivative_solution(spectral_info.signal, alpha, cr, z, lumped_losses)
+                    RamanSolver.first_order_derivative_solution(signal, alpha, cr, z, lumped_losses)
                 # Loss profile
-                loss_profile = power_profile / outer(spectral_info.signal, ones(z.size))
-                frequency = spectral_info.frequency
+                loss_profile = power_profile / outer(signal, ones(z.size))
+                frequency = signal_frequency
+            if signal_frequency.size != spectral_info.frequency.size:
+                # Loss profile of the channels interpolated from the one of the slices
+                channel_loss_profile = RamanSolver._interpolate_slices(
+                    signal_frequency, loss_profile[:signal_frequency.size], spectral_info.frequency)
+                loss_profile = concatenate((channel_loss_profile, loss_profile[signal_frequency.size:]), axis=0)
+                power_profile = concatenate((outer(spectral_info.signal, ones(z.size)) * channel_loss_profile,
+                                             power_profile[signal_frequency.size:]), axis=0)
+                frequency = concatenate((spectral_info.frequency, frequency[signal_frequency.size:]))
             power_profile = interp1d(z, power_profile, axis=1)(z_final)
             loss_profile = interp1d(z, loss_profile, axis=1)(z_final)
             stimulated_raman_scattering = StimulatedRamanScattering(power_profile, loss_profile, frequency, z_final)
@@ -176,6 +326,65 @@ class RamanSolver:
                 RamanSolver.calculate_attenuation_profile(spectral_info, fiber)
         return stimulated_raman_scattering
 
+    @staticmethod
+    def _spectral_slices(frequency, power, slice_width):
+        """Aggregates the channels in spectral slices of width slice_width: the power of each slice is the total
+        power of its channels, and its frequency is their power-weighted centre frequency
+
+        :param frequency: numpy array of the channel frequencies
+        :param power: numpy array of the channel powers
+        :param slice_width: width of the spectral slices
+        :return: numpy arrays of the frequencies and powers of the non-empty slices, sorted by frequency
+        """
+        _, index = unique(((frequency - frequency.min()) // slice_width).astype(int), return_inverse=True)
+        slice_power = bincount(index, weights=power)
+        weighted_frequency = bincount(index, weights=power * frequency)
+        mean_frequency = bincount(index, weights=frequency) / bincount(index)
+        with errstate(divide='ignore', invalid='ignore'):
+            slice_frequency = where(slice_power > 0, weighted_frequency / slice_power, mean_frequency)
+        return slice_frequency, slice_power
+
+    @staticmethod
+    def _interpolate_slices(slice_frequency, slice_loss_profile, frequency):
+        """Interpolates linearly in dB the loss profiles of the spectral slices at the channel frequencies
+
+        :param slice_frequency: numpy array of the slice frequencies
+        :param slice_loss_profile: numpy matrix of the slice loss profiles, one row per slice
+        :param frequency: numpy array of the channel frequencies
+        :return: numpy matrix of the channel loss profiles, one row per channel
+        """
+        if slice_frequency.size == 1:
+            return outer(ones(frequency.size), slice_loss_profile[0])
+        log_loss_profile = interp1d(slice_frequency, log(slice_loss_profile), axis=0,
+                                    fill_value='extrapolate')(frequency)
+        return exp(log_loss_profile)
+
+    @staticmethod
+    def _counter_propagating_initial_guess(co_power, cnt_power, co_frequency, cnt_frequency, z, fiber, lumped_losses):
+        """Returns the initial guess of the counter-propagating power profile for the iterative algorithm on z.
+
+        If z is finer than WARM_START_STEP, the co- and counter-propagating frequencies are first solved together
+        with the solver of the simulation parameters on a grid of WARM_START_STEP and the counter-propagating
+        profile is exponentially interpolated on z, so that the iterative algorithm on z only corrects the
+        discretization error.
+        Otherwise, the counter-propagating frequencies are solved alone.
+        """
+        cnt_alpha = fiber.alpha(cnt_frequency)
+        cnt_cr = fiber.cr(cnt_frequency)
+        z_coarse = append(arange(0, fiber.params.length, RamanSolver.WARM_START_STEP), fiber.params.length)
+        z_coarse, coarse_lumped_losses = RamanSolver._create_lumped_losses(z_coarse, fiber.lumped_losses,
+                                                                           fiber.z_lumped_losses)
+        if z.size <= z_coarse.size:
+            return flip(RamanSolver.first_order_derivative_solution(cnt_power, cnt_alpha, cnt_cr, z[-1] - flip(z),
+                                                                    flip(lumped_losses)), axis=1)
+        co_power_profile = RamanSolver.first_order_derivative_solution(
+            co_power, fiber.alpha(co_frequency), fiber.cr(co_frequency), z_coarse, coarse_lumped_losses)
+        cnt_power_profile = flip(RamanSolver.first_order_derivative_solution(
+            cnt_power, cnt_alpha, cnt_cr, z_coarse[-1] - flip(z_coarse), flip(coarse_lumped_losses)), axis=1)
+        _, cnt_power_profile = RamanSolver.iterative_algorithm(co_power_profile, cnt_power_profile, co_frequency,
+                                                               cnt_frequency, z_coarse, fiber, coarse_lumped_losses)
+        return exp(interp1d(z_coarse, _log_power(cnt_power_profile), axis=1)(z))
+
     @staticmethod
     def calculate_spontaneous_raman_scattering(spectral_info: SpectralInformation, srs: StimulatedRamanScattering,
                                                fiber):
@@ -186,40 +395,108 @@ class RamanSolver:
         z = srs.z
         baud_rate = spectral_info.baud_rate
         frequency = spectral_info.frequency
-        channels_loss = srs.loss_profile[:spectral_info.number_of_channels, :]
+        channels_loss = srs.loss_profile[..., :spectral_info.number_of_channels, :]
 
-        # calculate ase power
-        ase = zeros(spectral_info.number_of_channels)
+        # calculate ase power, one row per scenario of a batch
+        ase = zeros(channels_loss.shape[:-1])
         cr = fiber.cr(srs.frequency)[:spectral_info.number_of_channels, spectral_info.number_of_channels:]
         for i, pump in enumerate(fiber.raman_pumps):
-            pump_power = srs.power_profile[spectral_info.number_of_channels + i, :]
+            pump_power = srs.power_profile[..., spectral_info.number_of_channels + i, newaxis, :]
             df = pump.frequency - frequency
             eta = - 1 / (1 - exp(h * df / (k * fiber.temperature)))
-            integral = trapz(pump_power / channels_loss, z, axis=1)
+            integral = trapz(pump_power / channels_loss, z, axis=-1)
             ase += 2 * h * baud_rate * frequency * (1 + eta) * cr[:, i] * (df > 0) * integral  # 2 factor for double pol
         return ase
 
     @staticmethod
-    def first_order_derivative_solution(power_in, alpha, cr, z, lumped_losses):
-        """Solves the Raman first order derivative equation
+    def first_order_derivative_solution(power_in, alpha, cr, z, lumped_losses, external_power=None,
+                                        external_cr=None, solver=None):
+        """Solves the Raman first order derivative equation with the solver of sim_params.raman_params.solver
 
         :param power_in: launch power array
         :param alpha: loss coefficient array
         :param cr: Raman efficiency coefficients matrix
         :param z: z position array
         :param lumped_losses: concentrated losses array along the fiber span
+        :param external_power: power profile matrix of the frequencies that are not solved, such as the ones
+            propagating in the opposite direction, exponentially interpolated between the z positions
+        :param external_cr: Raman efficiency coefficients matrix between the solved and the external frequencies
+        :param solver: solver used instead of the one of the simulation parameters
         :return: power profile matrix
         """
+        if external_power is None:
+            external_power = zeros([0, z.size])
+            external_cr = zeros([power_in.size, 0])
+        solver = sim_params.raman_params.solver if solver is None else solver
+        if solver == 'euler':
+            return RamanSolver._euler_solution(power_in, alpha, cr, z, lumped_losses, external_power, external_cr)
+        elif solver == 'rk4':
+            return RamanSolver._log_rk4_solution(power_in, alpha, cr, z, lumped_losses, external_power, external_cr)
+        elif solver == 'rk45':
+            return RamanSolver._log_rk45_solution(power_in, alpha, cr, z, lumped_losses, external_power, external_cr)
+        raise ValueError(f'Raman solver {solver} not implemented.')
+
+    @staticmethod
+    def _euler_solution(power_in, alpha, cr, z, lumped_losses, external_power, external_cr):
+        """Solves the Raman first order derivative equation with the explicit Euler method"""
         dz = z[1:] - z[:-1]
-        power = outer(power_in, ones(z.size))
+        gain = transpose(matmul(external_cr, external_power)) - alpha
+        power = outer(ones(z.size), power_in)  # z along the rows, for contiguous steps
         for i in range(1, z.size):
-            power[:, i] = \
-                power[:, i - 1] * (1 + (- alpha + sum(cr * power[:, i - 1], 1)) * dz[i - 1]) * lumped_losses[i - 1]
-        return power
+            power[i] = power[i - 1] * (1 + (gain[i - 1] + matmul(cr, power[i - 1])) * dz[i - 1]) * lumped_losses[i - 1]
+        return transpose(power)
+
+    @staticmethod
+    def _log_rk4_solution(power_in, alpha, cr, z, lumped_losses, external_power, external_cr):
+        """Solves the Raman first order derivative equation written for the logarithm of the power,
+        d log(P) / dz = - alpha + cr P, with the fourth order Runge-Kutta method.
+        The lumped loss of a position is applied at the beginning of the following step.
+        """
+        dz = z[1:] - z[:-1]
+        external_gain = matmul(external_cr, external_power)
+        external_gain_middle = matmul(external_cr, sqrt(external_power[:, :-1] * external_power[:, 1:]))
+        log_power = zeros([power_in.size, z.size])
+        log_power[:, 0] = _log_power(power_in)
+        with errstate(divide='ignore'):
+            log_lumped_losses = log(lumped_losses)
+        for i in range(1, z.size):
+            log_power_start = log_power[:, i - 1] + log_lumped_losses[i - 1]
+            k1 = external_gain[:, i - 1] - alpha + matmul(cr, exp(log_power_start))
+            k2 = external_gain_middle[:, i - 1] - alpha + matmul(cr, exp(log_power_start + k1 * dz[i - 1] / 2))
+            k3 = external_gain_middle[:, i - 1] - alpha + matmul(cr, exp(log_power_start + k2 * dz[i - 1] / 2))
+            k4 = external_gain[:, i] - alpha + matmul(cr, exp(log_power_start + k3 * dz[i - 1]))
+            log_power[:, i] = log_power_start + (k1 + 2 * k2 + 2 * k3 + k4) * dz[i - 1] / 6
+        return exp(log_power)
+
+    @staticmethod
+    def _log_rk45_solution(power_in, alpha, cr, z, lumped_losses, external_power, external_cr):
+        """Solves the Raman first order derivative equation written for the logarithm of the power,
+        d log(P) / dz = - alpha + cr P, with the adaptive Dormand-Prince method of scipy.
+        The fiber is integrated between consecutive lumped losses, the z positions being only the output positions.
+        """
+        log_external_power = interp1d(z, _log_power(external_power), axis=1)
+        log_power = zeros([power_in.size, z.size])
+        log_power[:, 0] = _log_power(power_in)
+        with errstate(divide='ignore'):
+            log_lumped_losses = log(lumped_losses)
+
+        def derivative(position, log_power_position):
+            return - alpha + matmul(cr, exp(log_power_position)) + \
+                matmul(external_cr, exp(log_external_power(position)))
+
+        segment_ends = append(where(lumped_losses[1:-1] != 1)[0] + 1, z.size - 1)
+        start = 0
+        for end in segment_ends:
+            solution = solve_ivp(derivative, (z[start], z[end]), log_power[:, start] + log_lumped_losses[start],
+                                 method='RK45', t_eval=z[start:end + 1], rtol=RamanSolver.RK45_TOLERANCE,
+                                 atol=RamanSolver.RK45_TOLERANCE)
+            log_power[:, start + 1:end + 1] = solution.y[:, 1:]
+            start = end
+        return exp(log_power)
 
     @staticmethod
     def iterative_algorithm(co_initial_guess_power, cnt_initial_guess_power, co_frequency, cnt_frequency, z, fiber,
-                            lumped_losses):
+                            lumped_losses, solver=None):
         """Solves the Raman first order derivative equation in case of both co- and counter-propagating
         frequencies
 
@@ -230,6 +507,7 @@ class RamanSolver:
         :param z: z position array
         :param fiber: instance of gnpy.core.elements.Fiber or gnpy.core.elements.RamanFiber
         :param lumped_losses: concentrated losses array along the fiber span
+        :param solver: solver used instead of the one of the simulation parameters
         :return: co- and counter-propagatng power profile matrix
         """
         logger.debug('  Start iterative algorithm')
@@ -244,19 +522,29 @@ class RamanSolver:
         dz = z[1:] - z[:-1]
         cr = fiber.cr(frequency)
         alpha = fiber.alpha(frequency)
+        co = slice(0, co_frequency.size)
+        cnt = slice(co_frequency.size, frequency.size)
         next_power = array(prev_power)
+        # Anderson acceleration of the sweeps, on the logarithm of the counter-propagating power profile
+        cnt_log_power = _log_power(next_power[cnt, :]).ravel()
+        sweeps, residuals = [], []
         while residue > residue_tol and accuracy > accuracy_tol and iteration < num_max_iter:
             iteration += 1
-            for i in range(1, z.size):
-                dpdz = - alpha + sum(cr * next_power[:, i - 1], 1)
-                next_power[:co_frequency.size, i] = \
-                    next_power[:co_frequency.size, i - 1] * (1 + dpdz[:co_frequency.size] * dz[i - 1]) * \
-                    lumped_losses[i - 1]
-            for i in range(1, z.size):
-                dpdz = - alpha + sum(cr * next_power[:, -i], 1)
-                next_power[co_frequency.size:, -i - 1] = \
-                    next_power[co_frequency.size:, -i] * (1 + dpdz[co_frequency.size:] * dz[-i]) * \
-                    lumped_losses[-i]
+            next_power[co, :] = RamanSolver.first_order_derivative_solution(
+                next_power[co, 0], alpha[co], cr[co, co], z, lumped_losses,
+                exp(cnt_log_power).reshape(-1, z.size), cr[co, cnt], solver)
+            next_power[cnt, :] = flip(RamanSolver.first_order_derivative_solution(
+                next_power[cnt, -1], alpha[cnt], cr[cnt, cnt], z[-1] - flip(z), flip(lumped_losses),
+                flip(next_power[co, :], axis=1), cr[cnt, co], solver), axis=1)
+
+            sweeps.append(_log_power(next_power[cnt, :]).ravel())
+            residuals.append(sweeps[-1] - cnt_log_power)
+            sweeps, residuals = sweeps[-RamanSolver.ANDERSON_DEPTH - 1:], residuals[-RamanSolver.ANDERSON_DEPTH - 1:]
+            cnt_log_power = sweeps[-1]
+            if len(sweeps) > 1:
+                delta_residuals = transpose(diff(residuals, axis=0))
+                weights = lstsq(delta_residuals, residuals[-1], rcond=None)[0]
+                cnt_log_power = cnt_log_power - matmul(transpose(diff(sweeps, axis=0)), weights)
 
             dpdz_num = (next_power[:co_frequency.size, 1:] - next_power[:co_frequency.size, :-1]) / dz
             dpdz_exp = next_power[:co_frequency.size, :-1] * \
@@ -266,7 +554,11 @@ class RamanSolver:
             residue = max(abs((next_power - prev_power) / next_power))
             accuracy = max(abs((dpdz_exp - dpdz_num) / dpdz_exp))
             prev_power = array(next_power)
-            logger.debug(f'     Iteration: {iteration}  Accuracy: {format_float_scientific(accuracy, precision=3)}')
+            logger.debug(f'     Iteration: {iteration}  Accuracy: {format_float_scientific(accuracy, precision=3)}  '
+                         f'Residue: {format_float_scientific(residue, precision=3)}')
+        logger.info(f'Raman co- and counter-propagating solution: {iteration} iterations, residue '
+                    f'{format_float_scientific(residue, precision=3)}, accuracy '
+                    f'{format_float_scientific(accuracy, precision=3)}')
         return next_power[:co_frequency.size, :], next_power[co_frequency.size:, :]
 
 
@@ -275,11 +567,16 @@ class NliSolver:
     Model and method can be specified in `sim_params.nli_params.method`.
     List of implemented methods:
     'gn_model_analytic': eq. 120 from arXiv:1209.0394
+    'isrs_gn_model_analytic': closed-form ISRS GN model, D. Semrau et al., J. Lightw. Technol. 37(9), 2019
     'ggn_spectrally_separated': eq. 21 from arXiv: 1710.02225
+    'ggn_spectrally_separated_table': eq. 21 from arXiv: 1710.02225 with the psi function interpolated from PsiTable
     """
 
     SPM_WEIGHT = (16.0 / 27.0)
     XPM_WEIGHT = 2 * (16.0 / 27.0)
+    eta_cache = LruCache()  # GN-model eta matrices, by fiber and spectrum signature
+    ISRS_PROFILE_NODES = 41  # samples of the pump power profiles fitted by the closed-form ISRS GN model
+    BATCH_MAX_SIZE = 2 ** 19  # maximum number of f1 x f2 x z samples integrated in one pass by the batched ggn
 
     @staticmethod
     def effective_length(alpha, length):
@@ -295,8 +592,21 @@ class NliSolver:
         """
         logger.debug('Start computing fiber NLI noise')
 
-        if 'gn_model_analytic' == sim_params.nli_params.method:
-            eta = NliSolver._gn_analytic(spectral_info, fiber)
+        if spectral_info.batch_size is not None:
+            if 'gn_model_analytic' == sim_params.nli_params.method and sim_params.nli_params.xpm_cutoff is None:
+                # the eta matrix does not depend on the power: all the scenarios of the batch at once
+                eta = NliSolver._gn_analytic(spectral_info, fiber)
+                nli = spectral_info.signal * matmul(spectral_info.signal ** 2, transpose(eta))
+            else:
+                nli = array([NliSolver.compute_nli(spectral_info.scenario(i), srs.scenario(i), fiber)
+                             for i in range(spectral_info.batch_size)])
+        elif 'gn_model_analytic' == sim_params.nli_params.method and sim_params.nli_params.xpm_cutoff is not None:
+            nli = NliSolver._gn_analytic_banded(spectral_info, fiber, sim_params.nli_params.xpm_cutoff)
+        elif sim_params.nli_params.method in ('gn_model_analytic', 'isrs_gn_model_analytic'):
+            if 'gn_model_analytic' == sim_params.nli_params.method:
+                eta = NliSolver._gn_analytic(spectral_info, fiber)
+            else:
+                eta = NliSolver._isrs_gn_analytic(spectral_info, fiber, srs)
 
             cut_power = outer(spectral_info.signal, ones(spectral_info.number_of_channels))
             pump_power = outer(ones(spectral_info.number_of_channels), spectral_info.signal)
@@ -305,23 +615,19 @@ class NliSolver:
         elif 'ggn_spectrally_separated' in sim_params.nli_params.method:
             if sim_params.nli_params.computed_channels is not None:
                 cut_indices = array(sim_params.nli_params.computed_channels) - 1
-            elif sim_params.nli_params.computed_number_of_channels is not None:
-                nb_ch_computed = sim_params.nli_params.computed_number_of_channels
-                nb_ch = len(spectral_info.channel_number)
-                cut_indices = array([round(i * (nb_ch - 1) / (nb_ch_computed - 1)) for i in range(0, nb_ch_computed)])
+                g_nli = NliSolver._ggn_g_nli(cut_indices, spectral_info, fiber, srs)
+            elif sim_params.nli_params.adaptive_tolerance is not None:
+                cut_indices, g_nli = NliSolver._adaptive_ggn_g_nli(spectral_info, fiber, srs)
             else:
-                cut_indices = array(spectral_info.channel_number) - 1
-
-            eta = NliSolver._ggn_spectrally_separated(cut_indices, spectral_info, fiber, srs)
+                if sim_params.nli_params.computed_number_of_channels is not None:
+                    cut_indices = NliSolver._evenly_spaced_cuts(spectral_info.number_of_channels,
+                                                                sim_params.nli_params.computed_number_of_channels)
+                else:
+                    cut_indices = array(spectral_info.channel_number) - 1
+                g_nli = NliSolver._ggn_g_nli(cut_indices, spectral_info, fiber, srs)
 
             # Interpolation over the channels not indicated as compted channels in simulation parameters
-            cut_power = outer(spectral_info.signal[cut_indices], ones(spectral_info.number_of_channels))
             cut_frequency = spectral_info.frequency[cut_indices]
-            pump_power = outer(ones(cut_indices.size), spectral_info.signal)
-            cut_baud_rate = outer(spectral_info.baud_rate[cut_indices], ones(spectral_info.number_of_channels))
-
-            g_nli = eta * cut_power * pump_power**2 / cut_baud_rate
-            g_nli = sum(g_nli, 1)
             g_nli = interp(spectral_info.frequency, cut_frequency, g_nli)
             nli = spectral_info.baud_rate * g_nli  # Local white noise
         else:
@@ -329,6 +635,57 @@ class NliSolver:
 
         return nli
 
+    @staticmethod
+    def _evenly_spaced_cuts(nb_ch, nb_ch_computed):
+        """Returns the indices of nb_ch_computed CUTs evenly selected between the first and the last channel"""
+        return array([round(i * (nb_ch - 1) / (nb_ch_computed - 1)) for i in range(0, nb_ch_computed)])
+
+    @staticmethod
+    def _ggn_g_nli(cut_indices, spectral_info, fiber, srs):
+        """Computes the NLI power spectral density of the CUTs with the ggn model"""
+        eta = NliSolver._ggn_spectrally_separated(cut_indices, spectral_info, fiber, srs)
+
+        cut_power = outer(spectral_info.signal[cut_indices], ones(spectral_info.number_of_channels))
+        pump_power = outer(ones(cut_indices.size), spectral_info.signal)
+        cut_baud_rate = outer(spectral_info.baud_rate[cut_indices], ones(spectral_info.number_of_channels))
+
+        g_nli = eta * cut_power * pump_power**2 / cut_baud_rate
+        return sum(g_nli, 1)
+
+    @staticmethod
+    def _adaptive_ggn_g_nli(spectral_info, fiber, srs):
+        """Selects the CUTs of the ggn model refining the spectrum where the interpolation of the NLI power
+        spectral density is inaccurate.
+
+        The NLI is first computed on computed_number_of_channels evenly spaced CUTs (the first and the last
+        channel by default). At each iteration, the NLI of the channel in the middle of each interval between
+        consecutive CUTs is computed and compared with the linear interpolation of the interval edges: the
+        interval is split in two intervals to be refined if the difference exceeds adaptive_tolerance [dB].
+        The refinement stops when all the intervals are accurate or have no channel left in the middle.
+
+        :return: the sorted CUT indices and the corresponding NLI power spectral density
+        """
+        tolerance = sim_params.nli_params.adaptive_tolerance
+        nb_ch = spectral_info.number_of_channels
+        frequency = spectral_info.frequency
+        nb_ch_computed = sim_params.nli_params.computed_number_of_channels or 2
+        cut_indices = unique(NliSolver._evenly_spaced_cuts(nb_ch, max((min(nb_ch_computed, nb_ch), 2))))
+        g_nli = dict(zip(cut_indices, NliSolver._ggn_g_nli(cut_indices, spectral_info, fiber, srs)))
+        intervals = [(left, right) for left, right in zip(cut_indices[:-1], cut_indices[1:]) if right - left > 1]
+        while intervals:
+            middles = array([(left + right) // 2 for left, right in intervals])
+            g_nli.update(zip(middles, NliSolver._ggn_g_nli(middles, spectral_info, fiber, srs)))
+            refined_intervals = []
+            for (left, right), middle in zip(intervals, middles):
+                interpolated = interp(frequency[middle], frequency[[left, right]], [g_nli[left], g_nli[right]])
+                if abs(lin2db(g_nli[middle] / interpolated)) > tolerance:
+                    refined_intervals.extend(interval for interval in ((left, middle), (middle, right))
+                                             if interval[1] - interval[0] > 1)
+            intervals = refined_intervals
+        logger.debug(f'NLI computed on {len(g_nli)} channels out of {nb_ch}')
+        cut_indices = array(sorted(g_nli))
+        return cut_indices, array([g_nli[cut_index] for cut_index in cut_indices])
+
     # Methods for computing GN-model eta matrix
     @staticmethod
     def _gn_analytic(spectral_info, fiber, spm_weight=SPM_WEIGHT, xpm_weight=XPM_WEIGHT):
@@ -344,9 +701,16 @@ class NliSolver:
         # Physical fiber parameters
         alpha = fiber.alpha(frequency)
         beta2 = fiber.beta2(frequency)
-        gamma = outer(fiber.gamma(frequency), ones(nch))
+        gamma = fiber.gamma(frequency)
         length = fiber.params.length
 
+        key = (alpha.tobytes(), beta2.tobytes(), gamma.tobytes(), length, frequency.tobytes(), baud_rate.tobytes(),
+               spm_weight, xpm_weight)
+        eta = NliSolver.eta_cache.get(key)
+        if eta is not None:
+            return eta
+        gamma = outer(gamma, ones(nch))
+
         identity = diag(ones(nch))
         weight = spm_weight * identity + xpm_weight * (ones([nch, nch]) - identity)
 
@@ -359,8 +723,141 @@ class NliSolver:
         psi = NliSolver._psi(delta_frequency, baud_rate, beta2, effective_length, asymptotic_length)
         eta_cut_central_frequency = gamma ** 2 * weight * psi / (cut_baud_rate * pump_baud_rate ** 2)
         eta = cut_baud_rate * eta_cut_central_frequency  # Local white noise
+        NliSolver.eta_cache.put(key, eta, sim_params.nli_params.eta_cache_size * 1e6)
+        return eta
+
+    @staticmethod
+    def _isrs_gn_analytic(spectral_info, fiber, srs, spm_weight=SPM_WEIGHT, xpm_weight=XPM_WEIGHT):
+        """Computes the nonlinear interference power evaluated at the fiber input with the closed-form
+        approximation of the ISRS GN model (D. Semrau et al., J. Lightw. Technol. 37(9), 2019).
+
+        The power profile of each pump computed by the RamanSolver is fitted with a forward term
+        c0 exp(-alpha z) + c1 exp(-2 alpha z), which is the ISRS profile of the paper when c0 + c1 = 1, and a
+        backward term c2 exp(-alpha (length - z)) + c3 exp(-2 alpha (length - z)) accounting for counter-propagating
+        Raman pumps. Using
+        Re[1 / ((a - jx)(b + jx))] = (a / (a² + x²) + b / (b² + x²)) / (a + b),
+        the link function of each term is a combination of the ones of a lossy fiber with losses alpha and
+        2 alpha, so that psi is the same combination of eq. 123 from arXiv:1209.0394. The interference between the
+        forward and the backward terms is neglected.
+        """
+        nch = spectral_info.number_of_channels
+        frequency = spectral_info.frequency
+        baud_rate = spectral_info.baud_rate
+        delta_frequency = spectral_info.df
+
+        # Physical fiber parameters
+        alpha = fiber.alpha(frequency)
+        beta2 = fiber.beta2(frequency)
+        gamma = outer(fiber.gamma(frequency), ones(nch))
+        length = fiber.params.length
+
+        identity = diag(ones(nch))
+        weight = spm_weight * identity + xpm_weight * (ones([nch, nch]) - identity)
+
+        # Power profile of the pumps fitted as c0 exp(-alpha z) + c1 exp(-2 alpha z) + c2 exp(-alpha (length - z))
+        # + c3 exp(-2 alpha (length - z)), the profile normalized to the fiber loss being linearly interpolated
+        z = linspace(0, length, NliSolver.ISRS_PROFILE_NODES)
+        rho_norm_square = interp1d(srs.frequency, srs.rho, axis=0)(frequency) ** 2 * exp(outer(alpha, srs.z))
+        rho_square = interp1d(srs.z, rho_norm_square, axis=1)(z) * exp(outer(-alpha, z))
+        basis = stack((exp(outer(-alpha, z)), exp(outer(-2 * alpha, z)), exp(outer(-alpha, length - z)),
+                       exp(outer(-2 * alpha, length - z))), axis=-1)
+        quadrature = sqrt(PsiTable._trapz_weights(z))
+        c = array([lstsq(quadrature[:, newaxis] * basis[i], quadrature * rho_square[i], rcond=None)[0]
+                   for i in range(nch)])
+        c = c.T[:, newaxis, :]
+
+        cut_baud_rate = outer(baud_rate, ones(nch))
+        pump_baud_rate = outer(ones(nch), baud_rate)
+
+        psi_1 = NliSolver._psi(delta_frequency, baud_rate, beta2, NliSolver.effective_length(alpha, length), 1 / alpha)
+        psi_2 = NliSolver._psi(delta_frequency, baud_rate, beta2, NliSolver.effective_length(2 * alpha, length),
+                               1 / (2 * alpha))
+        psi = (c[0] ** 2 + c[2] ** 2) * psi_1 + (c[1] ** 2 + c[3] ** 2) * psi_2 + \
+            2 * (c[0] * c[1] + c[2] * c[3]) * (psi_1 + 2 * psi_2) / 3
+        eta_cut_central_frequency = gamma ** 2 * weight * psi / (cut_baud_rate * pump_baud_rate ** 2)
+        eta = cut_baud_rate * eta_cut_central_frequency  # Local white noise
         return eta
 
+    @staticmethod
+    def _gn_analytic_banded(spectral_info, fiber, xpm_cutoff, spm_weight=SPM_WEIGHT, xpm_weight=XPM_WEIGHT):
+        """Computes the NLI power with the GN model, evaluating exactly only the pumps within xpm_cutoff [Hz]
+        from each CUT.
+
+        For each CUT the exact eta of the near pumps is stored in a band matrix whose row i holds the
+        contiguous pumps lower[i], ..., upper[i] - 1. The XPM of the far pumps is computed with the asymptotic
+        expression of eq. 123 from arXiv:1209.0394 for a frequency offset much larger than the baud rate,
+        psi = effective_length ** 2 * baud_rate / (4 * pi * abs(beta2) * asymptotic_length * abs(df)).
+        The far pumps are aggregated in frequency bins of width xpm_cutoff / 4 placed in their power weighted
+        centroid, except the pumps sharing a bin with a near pump which are evaluated one by one.
+        Memory and runtime scale with the number of channels times the number of near pumps and of bins.
+        """
+        frequency = spectral_info.frequency
+        baud_rate = spectral_info.baud_rate
+        signal = spectral_info.signal
+        nch = spectral_info.number_of_channels
+        cut_indices = arange(nch)
+
+        # Physical fiber parameters
+        alpha = fiber.alpha(frequency)
+        beta2 = fiber.beta2(frequency)
+        gamma = fiber.gamma(frequency)
+        length = fiber.params.length
+        effective_length = NliSolver.effective_length(alpha, length)
+        asymptotic_length = 1 / alpha
+
+        # Near pumps
+        lower = searchsorted(frequency, frequency - xpm_cutoff, side='left')
+        upper = searchsorted(frequency, frequency + xpm_cutoff, side='right')
+        band = lower[:, newaxis] + arange(max(upper - lower))
+        in_band = band < upper[:, newaxis]
+        band = where(in_band, band, cut_indices[:, newaxis])
+        key = ('banded', xpm_cutoff, alpha.tobytes(), beta2.tobytes(), gamma.tobytes(), length, frequency.tobytes(),
+               baud_rate.tobytes(), spm_weight, xpm_weight)
+        eta = NliSolver.eta_cache.get(key)
+        if eta is None:
+            weight = where(band == cut_indices[:, newaxis], spm_weight, xpm_weight) * in_band
+            psi = NliSolver._psi_pairs(frequency[band] - frequency[:, newaxis], baud_rate[:, newaxis],
+                                       baud_rate[band], (beta2[:, newaxis] + beta2[band]) / 2,
+                                       effective_length[band], asymptotic_length[band])
+            eta = gamma[:, newaxis] ** 2 * weight * psi / baud_rate[band] ** 2
+            NliSolver.eta_cache.put(key, eta, sim_params.nli_params.eta_cache_size * 1e6)
+        nli = signal * sum(eta * signal[band] ** 2, 1)
+
+        # Far pumps
+        pump_factor = signal ** 2 * effective_length ** 2 / (4 * pi * asymptotic_length * baud_rate)
+        bins = ((frequency - frequency[0]) // (xpm_cutoff / 4)).astype(int)
+        _, bins = unique(bins, return_inverse=True)
+        bin_factor = bincount(bins, weights=pump_factor)
+        bin_frequency = bincount(bins, weights=pump_factor * frequency) / bin_factor
+        bin_beta2 = bincount(bins, weights=pump_factor * beta2) / bin_factor
+        bin_indices = arange(bin_factor.size)
+        far_bins = (bin_indices < bins[lower][:, newaxis]) | (bin_indices > bins[upper - 1][:, newaxis])
+        bin_offset = where(far_bins, abs(bin_frequency - frequency[:, newaxis]), inf)
+        far_xpm = sum(bin_factor / (abs(beta2[:, newaxis] + bin_beta2) / 2 * bin_offset), 1)
+        # pumps of the bins shared with near pumps
+        bin_start = searchsorted(bins, bins)
+        bin_stop = searchsorted(bins, bins, side='right')
+        for first, last in ((bin_start[lower], lower), (upper, bin_stop[upper - 1])):
+            pumps = first[:, newaxis] + arange(max(last - first))
+            is_far = pumps < last[:, newaxis]
+            pumps[~is_far] = 0
+            pump_offset = where(is_far, abs(frequency[pumps] - frequency[:, newaxis]), inf)
+            far_xpm += sum(pump_factor[pumps] / (abs(beta2[:, newaxis] + beta2[pumps]) / 2 * pump_offset), 1)
+        nli += signal * gamma ** 2 * xpm_weight * far_xpm
+        return nli
+
+    @staticmethod
+    def _psi_pairs(df, cut_baud_rate, pump_baud_rate, beta2, effective_length, asymptotic_length):
+        """Calculates eq. 123 from `arXiv:1209.0394 <https://arxiv.org/abs/1209.0394>`__ for arrays of CUT and
+        pump pairs, the effective and asymptotic lengths being the ones of the pumps
+        """
+        right_extreme = df + pump_baud_rate / 2
+        left_extreme = df - pump_baud_rate / 2
+        psi = (arcsinh(pi ** 2 * asymptotic_length * abs(beta2) * cut_baud_rate * right_extreme)
+               - arcsinh(pi ** 2 * asymptotic_length * abs(beta2) * cut_baud_rate * left_extreme)) / 2
+        psi *= effective_length ** 2 / (2 * pi * abs(beta2) * asymptotic_length)
+        return psi
+
     @staticmethod
     def _psi(df, baud_rate, beta2, effective_length, asymptotic_length):
         """Calculates eq. 123 from `arXiv:1209.0394 <https://arxiv.org/abs/1209.0394>`__"""
@@ -369,12 +866,7 @@ class NliSolver:
         pump_baud_rate = baud_rate
         pump_beta = outer(ones(baud_rate.size), beta2)
         beta2 = (cut_beta + pump_beta) / 2
-        right_extreme = df + pump_baud_rate / 2
-        left_extreme = df - pump_baud_rate / 2
-        psi = (arcsinh(pi ** 2 * asymptotic_length * abs(beta2) * cut_baud_rate * right_extreme) -
-               arcsinh(pi ** 2 * asymptotic_length * abs(beta2) * cut_baud_rate * left_extreme)) / 2
-        psi *= effective_length ** 2 / (2 * pi * abs(beta2) * asymptotic_length)
-        return psi
+        return NliSolver._psi_pairs(df, cut_baud_rate, pump_baud_rate, beta2, effective_length, asymptotic_length)
 
     # Methods for computing the GGN-model eta matrix
     @staticmethod
@@ -398,6 +890,67 @@ class NliSolver:
         weight = spm_weight * identity + xpm_weight * (ones([nch, nch]) - identity)
         weight = weight[cut_indices, :]
 
+        psi_cut_central_frequency = None
+        if sim_params.nli_params.method == 'ggn_spectrally_separated_table':
+            psi_cut_central_frequency = NliSolver._tabulated_ggn_psi(cut_indices, spectral_info, fiber, srs, alpha,
+                                                                     beta2)
+        if psi_cut_central_frequency is None and sim_params.nli_params.workers > 1 and cut_indices.size > 1:
+            psi_cut_central_frequency = NliSolver._parallel_ggn_psi(cut_indices, frequency, baud_rate, slot_width,
+                                                                    roll_off, alpha, beta2, srs)
+        elif psi_cut_central_frequency is None:
+            psi_cut_central_frequency = NliSolver._ggn_psi(cut_indices, frequency, baud_rate, slot_width, roll_off,
+                                                           alpha, beta2, srs)
+
+        cut_baud_rate = outer(baud_rate[cut_indices], ones(nch))
+        pump_baud_rate = outer(ones(cut_indices.size), baud_rate)
+
+        eta_cut_central_frequency = \
+            gamma ** 2 * weight * psi_cut_central_frequency / (cut_baud_rate * pump_baud_rate ** 2)
+        eta = cut_baud_rate * eta_cut_central_frequency  # Local white noise
+        return eta
+
+    @staticmethod
+    def _tabulated_ggn_psi(cut_indices, spectral_info, fiber, srs, alpha, beta2):
+        """Interpolates the generalized psi matrix from the PsiTable of the fiber type variety.
+
+        The power profile of each pump is normalized with the loss of the table and sampled on the table profile
+        nodes, so that the actual pump loss is accounted for exactly; the dispersion of the CUT is accounted for by
+        scaling the frequency offsets, which is exact for the pumps far from the CUT.
+        Returns None if no table is available for the fiber type variety or if the fiber length, the channel
+        modes or the frequency offsets are out of the table.
+        """
+        type_variety = getattr(fiber, 'type_variety', None)
+        table = PsiTable.from_directory(sim_params.nli_params.psi_table_dir, type_variety)
+        if table is None:
+            key = (str(sim_params.nli_params.psi_table_dir), type_variety)
+            if key not in _missing_psi_tables:
+                _missing_psi_tables.add(key)
+                logger.warning(f'No psi table for fiber type {type_variety} in '
+                               f'{sim_params.nli_params.psi_table_dir}: the NLI is computed numerically')
+            return None
+        frequency = spectral_info.frequency
+        baud_rate = spectral_info.baud_rate
+        mode = table.mode_index(baud_rate, spectral_info.roll_off)
+        if (mode < 0).any():
+            logger.warning(f'Channel baud rates or roll offs missing in the psi table of fiber type '
+                           f'{type_variety}: the NLI is computed numerically')
+            return None
+        length = fiber.params.length
+        delta_f = (frequency - frequency[cut_indices, newaxis]) * beta2[cut_indices, newaxis] / table.beta2
+        if not table.length[0] <= length <= table.length[-1] or \
+                delta_f.min() < table.delta_f[0] or delta_f.max() > table.delta_f[-1]:
+            logger.warning(f'Fiber length or frequency offsets out of the psi table range of fiber type '
+                           f'{type_variety}: the NLI is computed numerically')
+            return None
+        z = linspace(0, length, table.profile_nodes)
+        rho_norm_square = interp1d(srs.frequency, srs.rho, axis=0)(frequency) ** 2 * exp(table.alpha * srs.z)
+        profile = interp1d(srs.z, rho_norm_square, axis=1)(z)
+        return table.psi(length, mode[cut_indices], mode, delta_f, profile)
+
+    @staticmethod
+    def _ggn_psi(cut_indices, frequency, baud_rate, slot_width, roll_off, alpha, beta2, srs):
+        """Computes the generalized psi matrix of the CUTs with respect to all the pumps."""
+        nch = frequency.size
         dispersion_tolerance = sim_params.nli_params.dispersion_tolerance
         phase_shift_tolerance = sim_params.nli_params.phase_shift_tolerance
         max_slot_width = max(slot_width)
@@ -415,6 +968,18 @@ class NliSolver:
             cut_beta_coefficients = polyfit(cut_base_frequency, beta2, 2)
             cut_beta3 = cut_beta_coefficients[1] / (2 * pi)
 
+            if sim_params.nli_params.batched:
+                dn = abs(arange(1, nch + 1) - cut_number)
+                k_tol = dispersion_tolerance * abs(alpha)
+                phi_tol = phase_shift_tolerance / delta_z
+                tolerance = clip(k_tol, None, phi_tol)
+                f_cut_resolution = tolerance / abs(cut_beta2) / (4 * pi ** 2 * (1 + dn) * max_slot_width)
+                f_pump_resolution = tolerance / abs(cut_beta2) / (4 * pi ** 2 * max_slot_width)
+                psi_cut_central_frequency[i, :] = \
+                    NliSolver._batched_generalized_psi(cut_index, frequency, baud_rate, roll_off, f_cut_resolution,
+                                                       f_pump_resolution, srs, alpha, cut_beta2, cut_beta3)
+                continue
+
             for pump_index in range(nch):
                 pump_frequency = frequency[pump_index]
                 pump_baud_rate = baud_rate[pump_index]
@@ -447,14 +1012,147 @@ class NliSolver:
                                                             pump_frequency, pump_baud_rate, pump_roll_off,
                                                             f_cut_resolution, srs, pump_alpha, cut_beta2, cut_beta3,
                                                             cut_frequency)
+        return psi_cut_central_frequency
 
-        cut_baud_rate = outer(baud_rate[cut_indices], ones(nch))
-        pump_baud_rate = outer(ones(cut_indices.size), baud_rate)
+    @staticmethod
+    def _parallel_ggn_psi(cut_indices, frequency, baud_rate, slot_width, roll_off, alpha, beta2, srs):
+        """Computes the generalized psi matrix splitting the CUTs across a pool of worker processes.
 
-        eta_cut_central_frequency = \
-            gamma ** 2 * weight * psi_cut_central_frequency / (cut_baud_rate * pump_baud_rate ** 2)
-        eta = cut_baud_rate * eta_cut_central_frequency  # Local white noise
-        return eta
+        The loss profile of the SRS is shared once with all the workers through a shared memory block, while each
+        worker computes the rows of its CUTs with NliSolver._ggn_psi, so that the result is identical to the
+        serial computation.
+        """
+        workers = sim_params.nli_params.workers
+        pool = _worker_pool(workers)
+        spectrum = (frequency, baud_rate, slot_width, roll_off, alpha, beta2)
+        params = {'nli_params': sim_params.nli_params.to_json(), 'raman_params': sim_params.raman_params.to_json()}
+        shared_loss_profile = SharedMemory(create=True, size=srs.loss_profile.nbytes)
+        loss_profile = ndarray(srs.loss_profile.shape, dtype=srs.loss_profile.dtype, buffer=shared_loss_profile.buf)
+        try:
+            loss_profile[:] = srs.loss_profile
+            srs_buffer = (shared_loss_profile.name, srs.loss_profile.shape, srs.loss_profile.dtype, srs.frequency,
+                          srs.z)
+            tasks = [pool.submit(_ggn_psi_worker, cut_chunk, spectrum, srs_buffer, params)
+                     for cut_chunk in array_split(cut_indices, min(workers, cut_indices.size))]
+            psi_cut_central_frequency = concatenate([task.result() for task in tasks], axis=0)
+        finally:
+            del loss_profile
+            shared_loss_profile.close()
+            shared_loss_profile.unlink()
+        return psi_cut_central_frequency
+
+    @staticmethod
+    def _batched_generalized_psi(cut_index, frequency, baud_rate, roll_off, f_cut_resolution, f_pump_resolution, srs,
+                                 alpha, beta2, beta3):
+        """Computes the generalized psi of the CUT for all the pumps at once.
+
+        The pumps are split in the same SPM/XPM and fast XPM sets used by the loop implementation; the f1 and f2
+        integration grids of each set are built with the same resolutions, padded with their last value and
+        integrated in one pass. The zero-width padding intervals do not contribute to the trapezoidal integrals,
+        hence the result matches the loop implementation within floating point rounding (relative difference
+        below 1e-9).
+        """
+        nch = frequency.size
+        cut_frequency = frequency[cut_index]
+        cut_baud_rate = baud_rate[cut_index]
+        cut_roll_off = roll_off[cut_index]
+        z = srs.z
+        rho_pump = interp1d(srs.frequency, srs.rho, axis=0)(frequency) * exp(outer(alpha / 2, z))
+
+        delta_f = abs(cut_frequency - frequency)
+        near = delta_f <= NliSolver._frequency_offset_threshold(beta2, baud_rate)
+        near[cut_index] = True
+        pump_indices = arange(nch)
+
+        psi = zeros(nch)
+        for chunk in NliSolver._batch_chunks(pump_indices[near], f_pump_resolution, f_cut_resolution, baud_rate,
+                                             roll_off, cut_baud_rate, cut_roll_off, z.size):
+            f1_grids, f2_grids, rc1, rc2, rc3 = [], [], [], [], []
+            for pump_index in chunk:
+                pump_frequency = frequency[pump_index]
+                pump_baud_rate = baud_rate[pump_index]
+                pump_roll_off = roll_off[pump_index]
+                f1_array = arange(pump_frequency - (pump_baud_rate * (1 + pump_roll_off) / 2),
+                                  pump_frequency + (pump_baud_rate * (1 + pump_roll_off) / 2),
+                                  f_pump_resolution[pump_index])
+                f2_array = arange(cut_frequency - (cut_baud_rate * (1 + cut_roll_off) / 2),
+                                  cut_frequency + (cut_baud_rate * (1 + cut_roll_off) / 2),
+                                  f_cut_resolution[pump_index])
+                f1_grids.append(f1_array)
+                f2_grids.append(f2_array)
+                rc1.append(raised_cosine(f1_array, pump_frequency, pump_baud_rate, pump_roll_off))
+                rc2.append(raised_cosine(f2_array, cut_frequency, cut_baud_rate, cut_roll_off))
+            f1_array = NliSolver._pad_grids(f1_grids)
+            f2_array = NliSolver._pad_grids(f2_grids)
+            for pump_index, f1, f2 in zip(chunk, f1_array, f2_array):
+                rc3.append(raised_cosine(f1[:, newaxis] + f2[newaxis, :] - cut_frequency, frequency[pump_index],
+                                         baud_rate[pump_index], roll_off[pump_index]))
+            f1_array = f1_array[:, :, newaxis]
+            f2_array = f2_array[:, newaxis, :]
+            delta_beta = 4 * pi ** 2 * (f1_array - cut_frequency) * (f2_array - cut_frequency) * (
+                beta2 + pi * beta3 * (f1_array + f2_array - 2 * cut_frequency))
+            rho_nli = NliSolver._generalized_rho_nli(delta_beta, rho_pump[chunk][:, newaxis, newaxis, :], z,
+                                                     alpha[chunk][:, newaxis, newaxis])
+            integrand_f2 = NliSolver._pad_grids(rc1)[:, :, newaxis] * NliSolver._pad_grids(rc2)[:, newaxis, :] * \
+                array(rc3) * rho_nli
+            integrand_f1 = trapz(integrand_f2, f2_array, axis=-1)
+            psi[chunk] = trapz(integrand_f1, f1_array[:, :, 0], axis=-1)
+
+        for chunk in NliSolver._batch_chunks(pump_indices[~near], None, f_cut_resolution, baud_rate, roll_off,
+                                             cut_baud_rate, cut_roll_off, z.size):
+            pump_frequency = frequency[chunk]
+            pump_baud_rate = baud_rate[chunk]
+            pump_roll_off = roll_off[chunk]
+            f1_array = array([pump_frequency - (pump_baud_rate * (1 + pump_roll_off) / 2),
+                              pump_frequency + (pump_baud_rate * (1 + pump_roll_off) / 2)]).T[:, :, newaxis]
+            # Only positive f2 is used since integrand_f2 is symmetric
+            f2_stop = cut_frequency + (cut_baud_rate * (1 + cut_roll_off) / 2)
+            f2_array = NliSolver._pad_grids([arange(cut_frequency, f2_stop, f_cut_resolution[pump_index])
+                                             for pump_index in chunk])
+            f2_array = f2_array[:, newaxis, :]
+            delta_beta = 4 * pi ** 2 * (f1_array - cut_frequency) * (f2_array - cut_frequency) * (
+                beta2 + pi * beta3 * (f1_array + f2_array - 2 * cut_frequency))
+            integrand_f2 = NliSolver._generalized_rho_nli(delta_beta, rho_pump[chunk][:, newaxis, newaxis, :], z,
+                                                          alpha[chunk][:, newaxis, newaxis])
+            integrand_f1 = 2 * trapz(integrand_f2, f2_array, axis=-1)  # 2x since integrand_f2 is symmetric in f2
+            psi[chunk] = 0.5 * sum(integrand_f1, -1) * pump_baud_rate
+        return psi
+
+    @staticmethod
+    def _batch_chunks(pump_indices, f_pump_resolution, f_cut_resolution, baud_rate, roll_off, cut_baud_rate,
+                      cut_roll_off, z_size):
+        """Groups the pumps so that each padded integration grid, times the z_size samples of the SRS profile,
+        holds at most BATCH_MAX_SIZE samples.
+
+        When f_pump_resolution is None, the f1 grid is made of the two pump edges (fast generalized psi) and
+        the f2 grid only covers the positive half of the CUT band.
+        """
+        if f_pump_resolution is None:
+            f1_size = 2 * ones(pump_indices.size)
+            f2_size = cut_baud_rate * (1 + cut_roll_off) / 2 / f_cut_resolution[pump_indices] + 1
+        else:
+            f1_size = baud_rate[pump_indices] * (1 + roll_off[pump_indices]) / f_pump_resolution[pump_indices] + 1
+            f2_size = cut_baud_rate * (1 + cut_roll_off) / f_cut_resolution[pump_indices] + 1
+        order = argsort(f1_size * f2_size)
+        chunk = []
+        max_f1_size = max_f2_size = 0
+        for index in order:
+            new_f1_size = max((max_f1_size, f1_size[index]))
+            new_f2_size = max((max_f2_size, f2_size[index]))
+            if chunk and (len(chunk) + 1) * new_f1_size * new_f2_size * z_size > NliSolver.BATCH_MAX_SIZE:
+                yield array(chunk)
+                chunk = []
+                new_f1_size, new_f2_size = f1_size[index], f2_size[index]
+            chunk.append(pump_indices[index])
+            max_f1_size, max_f2_size = new_f1_size, new_f2_size
+        if chunk:
+            yield array(chunk)
+
+    @staticmethod
+    def _pad_grids(grids):
+        """Stacks 1D arrays of different sizes, padding each of them with its last value."""
+        size = max([grid.size for grid in grids])
+        return array([pad(grid, (0, size - grid.size), mode='edge') for grid in grids])
 
     @staticmethod
     def _fast_generalized_psi(f_eval, cut_frequency, cut_baud_rate, cut_roll_off, pump_frequency, pump_baud_rate,
@@ -508,13 +1206,39 @@ class NliSolver:
 
     @staticmethod
     def _generalized_rho_nli(delta_beta, rho_pump, z, alpha):
+        """Computes the squared modulus of the integral of rho_pump² exp(1j delta_beta z - alpha z) over z,
+        rho_pump² being linearly interpolated between the z samples.
+
+        :param delta_beta: phase mismatch, numpy array of any shape
+        :param rho_pump: pump field profile along z; either a 1D array or an array of shape (..., 1, z.size)
+            whose leading dimensions broadcast against the ones of delta_beta
+        :param z: positions array [m]
+        :param alpha: pump loss coefficient, scalar or array broadcasting against delta_beta
+        """
+        return abs(NliSolver._generalized_rho_integral(delta_beta, rho_pump ** 2, z, alpha))**2
+
+    @staticmethod
+    def _generalized_rho_integral(delta_beta, rho_square, z, alpha):
+        """Computes the integral of rho_square exp(1j delta_beta z - alpha z) over z, rho_square being linearly
+        interpolated between the z samples.
+
+        The integral is written as a combination of exp(w z) evaluated at all the z samples, so that the whole
+        z axis is reduced with a matrix product. The shapes of the arguments are the ones of _generalized_rho_nli.
+        """
         w = 1j * delta_beta - alpha
-        generalized_rho_nli = (rho_pump[-1]**2 * exp(w * z[-1]) - rho_pump[0]**2 * exp(w * z[0])) / w
-        for z_ind in range(0, len(z) - 1):
-            derivative_rho = (rho_pump[z_ind + 1]**2 - rho_pump[z_ind]**2) / (z[z_ind + 1] - z[z_ind])
-            generalized_rho_nli -= derivative_rho * (exp(w * z[z_ind + 1]) - exp(w * z[z_ind])) / (w**2)
-        generalized_rho_nli = abs(generalized_rho_nli)**2
-        return generalized_rho_nli
+        derivative_rho = diff(rho_square, axis=-1) / diff(z)
+        derivative_coefficients = zeros(rho_square.shape)
+        derivative_coefficients[..., :-1] += derivative_rho
+        derivative_coefficients[..., 1:] -= derivative_rho
+        if derivative_coefficients.ndim > 1:
+            derivative_coefficients = swapaxes(derivative_coefficients, -1, -2)
+        exp_wz = exp(w[..., newaxis] * z)
+        derivative_term = matmul(exp_wz, derivative_coefficients)
+        if derivative_coefficients.ndim > 1:
+            derivative_term = derivative_term[..., 0]
+        generalized_rho_integral = (rho_square[..., -1] * exp_wz[..., -1] - rho_square[..., 0] * exp_wz[..., 0]) / w
+        generalized_rho_integral += derivative_term / w**2
+        return generalized_rho_integral
 
     @staticmethod
     def _frequency_offset_threshold(beta2, symbol_rate):
@@ -527,6 +1251,173 @@ class NliSolver:
         return freq_offset_th
 
 
+class PsiTable:
+    """Generalized psi function of the ggn model tabulated for a fiber type.
+
+    The normalized pump power profile rho² = rho_pump² exp(alpha z) is sampled on profile_nodes evenly spaced
+    positions along the fiber and linearly interpolated between them, so that the generalized psi is the quadratic
+    form rho²^T M rho² of the samples. The symmetric M matrices are tabulated versus the fiber length, the CUT and
+    pump channel modes (baud rate and roll off) and the frequency offset between pump and CUT, using the loss
+    and dispersion of the fiber at its reference frequency.
+    """
+
+    def __init__(self, type_variety, alpha, beta2, beta3, length, baud_rate, roll_off, delta_f, coefficients):
+        """
+        :params type_variety: fiber type variety
+        :params alpha: power attenuation coefficient of the table [Neper/m]
+        :params beta2: beta2 chromatic dispersion coefficient of the table [1/(m Hz^2)]
+        :params beta3: beta3 chromatic dispersion coefficient of the table [1/(m Hz^3)]
+        :params length: sorted fiber lengths array [m]
+        :params baud_rate: channel modes baud rate array [Hz]
+        :params roll_off: channel modes roll off array
+        :params delta_f: sorted pump to CUT frequency offsets array [Hz]
+        :params coefficients: M matrices array of shape
+            (length.size, baud_rate.size (CUT), baud_rate.size (pump), delta_f.size, profile_nodes, profile_nodes)
+        """
+        self.type_variety = type_variety
+        self.alpha = alpha
+        self.beta2 = beta2
+        self.beta3 = beta3
+        self.length = asarray(length)
+        self.baud_rate = asarray(baud_rate)
+        self.roll_off = asarray(roll_off)
+        self.delta_f = asarray(delta_f)
+        self.coefficients = asarray(coefficients)
+
+    @property
+    def profile_nodes(self):
+        return self.coefficients.shape[-1]
+
+    @classmethod
+    def compute(cls, fiber, length, baud_rate, roll_off, delta_f, slot_width, profile_nodes=11):
+        """Tabulates the generalized psi using the type variety, loss and dispersion of the fiber at its reference
+        frequency, with the integration tolerances of the current simulation parameters.
+
+        :params fiber: Fiber element
+        :params slot_width: slot width used to set the integration resolution as in the ggn model [Hz]
+        :params profile_nodes: number of samples of the normalized pump power profile
+        """
+        ref_frequency = fiber.params.ref_frequency
+        alpha, beta2, beta3 = (asarray(value).item() for value in
+                               (fiber.alpha(ref_frequency), fiber.beta2(), fiber.beta3()))
+        coefficients = zeros([len(length), len(baud_rate), len(baud_rate), len(delta_f), profile_nodes,
+                              profile_nodes])
+        for i, j, m, n in ndindex(coefficients.shape[:4]):
+            coefficients[i, j, m, n] = cls._psi_coefficients(
+                baud_rate[j], roll_off[j], delta_f[n], baud_rate[m], roll_off[m], length[i], slot_width, alpha, beta2,
+                beta3, profile_nodes)
+        return cls(fiber.type_variety, alpha, beta2, beta3, length, baud_rate, roll_off, delta_f, coefficients)
+
+    @staticmethod
+    def _psi_coefficients(cut_baud_rate, cut_roll_off, pump_frequency, pump_baud_rate, pump_roll_off, length,
+                          slot_width, alpha, beta2, beta3, profile_nodes):
+        """Computes the M matrix of the generalized psi for a CUT centered in 0 Hz, with the integration grids of
+        NliSolver._generalized_psi and NliSolver._fast_generalized_psi.
+        """
+        k_tol = sim_params.nli_params.dispersion_tolerance * alpha
+        phi_tol = sim_params.nli_params.phase_shift_tolerance / sim_params.raman_params.result_spatial_resolution
+        dn = round(abs(pump_frequency) / slot_width)
+        f_cut_resolution = min(k_tol, phi_tol) / abs(beta2) / (4 * pi ** 2 * (1 + dn) * slot_width)
+        f_pump_resolution = min(k_tol, phi_tol) / abs(beta2) / (4 * pi ** 2 * slot_width)
+        cut_band = cut_baud_rate * (1 + cut_roll_off) / 2
+        pump_band = pump_baud_rate * (1 + pump_roll_off) / 2
+        if dn != 0 and abs(pump_frequency) > NliSolver._frequency_offset_threshold(beta2, pump_baud_rate):
+            f1_array = array([pump_frequency - pump_band, pump_frequency + pump_band])
+            f2_array = arange(0, cut_band, f_cut_resolution)  # Only positive f2 is used since it is symmetric
+            weight = outer(0.5 * pump_baud_rate * ones(2), 2 * PsiTable._trapz_weights(f2_array))
+        else:
+            f1_array = arange(pump_frequency - pump_band, pump_frequency + pump_band, f_pump_resolution)
+            f2_array = arange(-cut_band, cut_band, f_cut_resolution)
+            rc1 = raised_cosine(f1_array, pump_frequency, pump_baud_rate, pump_roll_off)
+            rc2 = raised_cosine(f2_array, 0, cut_baud_rate, cut_roll_off)
+            rc3 = raised_cosine(f1_array[:, newaxis] + f2_array, pump_frequency, pump_baud_rate, pump_roll_off)
+            weight = outer(rc1 * PsiTable._trapz_weights(f1_array), rc2 * PsiTable._trapz_weights(f2_array)) * rc3
+        f1_array = f1_array[:, newaxis]
+        delta_beta = 4 * pi ** 2 * f1_array * f2_array * (beta2 + pi * beta3 * (f1_array + f2_array))
+        z = linspace(0, length, profile_nodes)
+        unit_profiles = diag(ones(profile_nodes))[:, newaxis, newaxis, :]
+        integrals = NliSolver._generalized_rho_integral(delta_beta, unit_profiles, z, alpha)
+        integrals = integrals.reshape(profile_nodes, -1)
+        return (matmul(integrals * weight.ravel(), integrals.conj().T)).real
+
+    @staticmethod
+    def _trapz_weights(x):
+        """Returns the weights w such that sum(w * y) = trapz(y, x)"""
+        weights = zeros(x.size)
+        weights[:-1] += diff(x) / 2
+        weights[1:] += diff(x) / 2
+        return weights
+
+    @classmethod
+    def from_directory(cls, directory, type_variety):
+        """Returns the table of the type variety saved in directory as <type_variety>.npz, None if missing.
+        Tables are loaded once and kept in memory.
+        """
+        if directory is None or type_variety is None:
+            return None
+        key = (str(directory), type_variety)
+        if key not in _psi_tables:
+            filename = Path(directory) / f'{type_variety}.npz'
+            _psi_tables[key] = cls.load(filename) if filename.is_file() else None
+        return _psi_tables[key]
+
+    @classmethod
+    def load(cls, filename):
+        """Loads a table saved with PsiTable.save"""
+        with load(filename) as data:
+            return cls(str(data['type_variety']), float(data['alpha']), float(data['beta2']), float(data['beta3']),
+                       data['length'], data['baud_rate'], data['roll_off'], data['delta_f'], data['coefficients'])
+
+    def save(self, filename):
+        """Saves the table as a numpy .npz file"""
+        savez(filename, type_variety=self.type_variety, alpha=self.alpha, beta2=self.beta2, beta3=self.beta3,
+              length=self.length, baud_rate=self.baud_rate, roll_off=self.roll_off, delta_f=self.delta_f,
+              coefficients=self.coefficients)
+
+    def mode_index(self, baud_rate, roll_off):
+        """Returns the index of the tabulated mode of each channel, -1 if the channel mode is not tabulated"""
+        index = -ones(len(baud_rate), dtype=int)
+        for i, (mode_baud_rate, mode_roll_off) in enumerate(zip(self.baud_rate, self.roll_off)):
+            index[(abs(baud_rate - mode_baud_rate) < 1) & (abs(roll_off - mode_roll_off) < 1e-9)] = i
+        return index
+
+    def psi(self, length, cut_mode, pump_mode, delta_f, profile):
+        """Interpolates the generalized psi linearly versus length and frequency offset.
+
+        :params length: fiber length [m]
+        :params cut_mode: tabulated mode index of the CUTs, array of shape (cuts,)
+        :params pump_mode: tabulated mode index of the pumps, array of shape (pumps,)
+        :params delta_f: pump to CUT frequency offset array of shape (cuts, pumps) [Hz]
+        :params profile: normalized power profile of the pumps sampled on linspace(0, length, profile_nodes),
+            array of shape (pumps, profile_nodes)
+        """
+        if self.length.size == 1:
+            coefficients = self.coefficients[0]
+        else:
+            i = clip(searchsorted(self.length, length) - 1, 0, self.length.size - 2)
+            weight = (length - self.length[i]) / (self.length[i + 1] - self.length[i])
+            coefficients = (1 - weight) * self.coefficients[i] + weight * self.coefficients[i + 1]
+        i = clip(searchsorted(self.delta_f, delta_f) - 1, 0, self.delta_f.size - 2)
+        weight = (delta_f - self.delta_f[i]) / (self.delta_f[i + 1] - self.delta_f[i])
+        cut_mode = cut_mode[:, newaxis]
+        matrices = (1 - weight)[..., newaxis, newaxis] * coefficients[cut_mode, pump_mode, i] + \
+            weight[..., newaxis, newaxis] * coefficients[cut_mode, pump_mode, i + 1]
+        return einsum('ja,ijab,jb->ij', profile, matrices, profile)
+
+
+def _ggn_psi_worker(cut_indices, spectrum, srs_buffer, params):
+    """Computes in a worker process the generalized psi rows of a subset of the CUTs."""
+    SimParams.set_params(params)
+    name, shape, dtype, frequency, z = srs_buffer
+    shared_loss_profile = SharedMemory(name=name)
+    try:
+        loss_profile = ndarray(shape, dtype=dtype, buffer=shared_loss_profile.buf).copy()
+    finally:
+        shared_loss_profile.close()
+    srs = StimulatedRamanScattering(None, loss_profile, frequency, z)
+    return NliSolver._ggn_psi(cut_indices, *spectrum, srs)
+
+
 def estimate_nf_model(type_variety, gain_min, gain_max, nf_min, nf_max):
     if nf_min < -10:
         raise EquipmentConfigError(f'Invalid nf_min value {nf_min!r} for amplifier {type_variety}')
@@ -12,15 +12,16 @@ import argparse
 import logging
 import sys
 from math import ceil
-from numpy import linspace, mean
+from numpy import linspace, mean, arange, geomspace, concatenate, flip, unique
 from pathlib import Path
 
 import gnpy.core.ansi_escapes as ansi_escapes
-from gnpy.core.elements import Transceiver, Fiber, RamanFiber
+from gnpy.core.elements import Fiber, RamanFiber
 from gnpy.core.equipment import trx_mode_params
 import gnpy.core.exceptions as exceptions
-from gnpy.core.network import add_missing_elements_in_network, design_network
+from gnpy.core.network import add_missing_elements_in_network, design_network, network_index
 from gnpy.core.parameters import SimParams
+from gnpy.core.science_utils import PsiTable
 from gnpy.core.utils import db2lin, lin2db, automatic_nch, watt2dbm, dbm2watt
 from gnpy.topology.request import (ResultElement, jsontocsv, compute_path_dsjctn, requests_aggregation,
                                    BLOCKING_NOPATH, correct_json_route_list,
@@ -131,7 +132,7 @@ def transmission_main_example(args=None):
     if args.plot:
         plot_baseline(network)
 
-    transceivers = {n.uid: n for n in network.nodes() if isinstance(n, Transceiver)}
+    transceivers = dict(network_index(network).transceivers)
 
     if not transceivers:
         sys.exit('Network has no transceivers!')
@@ -339,6 +340,8 @@ def path_requests_run(args=None):
                         help='considers that all demands are bidir')
     parser.add_argument('-o', '--output', type=Path, metavar=_help_fname_json_csv,
                         help='Store satisifed requests into a JSON or CSV file')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='Propagate the requests in N parallel processes')
 
     args = parser.parse_args(args if args is not None else sys.argv[1:])
     _setup_logging(args)
@@ -438,8 +441,9 @@ def path_requests_run(args=None):
         sys.exit(1)
 
     print(f'{ansi_escapes.blue}Propagating on selected path{ansi_escapes.reset}')
-    propagatedpths, reversed_pths, reversed_propagatedpths = compute_path_with_disjunction(network, equipment, rqs, pths)
-    # Note that deepcopy used in compute_path_with_disjunction returns
+    propagatedpths, reversed_pths, reversed_propagatedpths = \
+        compute_path_with_disjunction(network, equipment, rqs, pths, jobs=args.jobs)
+    # Note that the shallow copies used in compute_path_with_disjunction return
     # a list of nodes which are not belonging to network (they are copies of the node objects).
     # so there can not be propagation on these nodes.
 
@@ -503,3 +507,64 @@ def path_requests_run(args=None):
         else:
             print(f'{ansi_escapes.red}Cannot save output: neither JSON nor CSV file{ansi_escapes.reset}')
             sys.exit(1)
+
+
+def psi_tables_main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Tabulate the generalized psi of the ggn model for the fiber types of the equipment library',
+        epilog=_help_footer,
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument('output', type=Path, help='Directory where the <type_variety>.npz tables are saved')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='Increase verbosity (can be specified several times)')
+    parser.add_argument('-e', '--equipment', type=Path, metavar=_help_fname_json,
+                        default=_examples_dir / 'eqpt_config.json', help='Equipment library')
+    parser.add_argument('--sim-params', type=Path, metavar=_help_fname_json,
+                        default=None, help='Path to the JSON containing simulation parameters (integration tolerances)')
+    parser.add_argument('--type-variety', nargs='+', help='Fiber type varieties to tabulate (default: all)')
+    parser.add_argument('--lengths', nargs='+', type=float, default=[50, 60, 70, 80, 90, 100, 110, 120],
+                        help='Tabulated fiber lengths [km]')
+    parser.add_argument('--loss-coef', type=float, default=0.2, help='Fiber loss coefficient [dB/km]')
+    parser.add_argument('--profile-nodes', type=int, default=11,
+                        help='Number of samples of the pump power profile along the fiber')
+
+    args = parser.parse_args(args if args is not None else sys.argv[1:])
+    _setup_logging(args)
+
+    try:
+        equipment = load_equipment(args.equipment)
+        SimParams.set_params(load_json(args.sim_params) if args.sim_params else {})
+    except exceptions.EquipmentConfigError as e:
+        print(f'{ansi_escapes.red}Configuration error in the equipment library:{ansi_escapes.reset} {e}')
+        sys.exit(1)
+    except exceptions.ParametersError as e:
+        print(f'{ansi_escapes.red}Simulation parameters error:{ansi_escapes.reset} {e}')
+        sys.exit(1)
+
+    si = equipment['SI']['default']
+    modes = [(si.baud_rate, si.roll_off)] + [(mode['baud_rate'], mode['roll_off'])
+                                             for trx in equipment['Transceiver'].values() for mode in trx.mode]
+    modes = list(dict.fromkeys((baud_rate, roll_off) for baud_rate, roll_off in modes
+                               if baud_rate is not None and roll_off is not None))
+    baud_rate = [baud_rate for baud_rate, _ in modes]
+    roll_off = [roll_off for _, roll_off in modes]
+    # the offsets are scaled with the dispersion of the CUT when the table is used: keep a margin on the band
+    max_delta_f = 1.1 * (si.f_max - si.f_min + si.spacing)
+    near_delta_f = arange(0, 300e9, 12.5e9)
+    far_delta_f = geomspace(300e9, max(max_delta_f, 600e9), 40)
+    delta_f = unique(concatenate((-flip(far_delta_f), -flip(near_delta_f), near_delta_f, far_delta_f)))
+    length = [length * 1e3 for length in sorted(args.lengths)]
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    for type_variety in args.type_variety or equipment['Fiber']:
+        if type_variety not in equipment['Fiber']:
+            print(f'{ansi_escapes.red}Unknown fiber type variety:{ansi_escapes.reset} {type_variety}')
+            sys.exit(1)
+        params = {**equipment['Fiber'][type_variety].__dict__, 'length': length[0], 'length_units': 'm',
+                  'loss_coef': args.loss_coef}
+        fiber = Fiber(uid=type_variety, type_variety=type_variety, params=params)
+        table = PsiTable.compute(fiber, length, baud_rate, roll_off, delta_f, si.spacing, args.profile_nodes)
+        filename = args.output / f'{type_variety}.npz'
+        table.save(filename)
+        print(f'{ansi_escapes.blue}Saved {type_variety} psi table to {filename}{ansi_escapes.reset}')
@@ -17,6 +17,7 @@ from numpy import arange
 
 from gnpy.core import elements
 from gnpy.core.equipment import trx_mode_params
+from gnpy.core.network import network_index
 from gnpy.core.exceptions import ConfigurationError, EquipmentConfigError, NetworkTopologyError, ServiceError
 from gnpy.core.science_utils import estimate_nf_model
 from gnpy.core.info import Carrier
@@ -88,7 +89,8 @@ class Span(_JsonThing):
         'padding': 10,
         'EOL': 0,
         'con_in': 0,
-        'con_out': 0
+        'con_out': 0,
+        'exact_nf': None  # optional value in Span, the NF of amplifiers is interpolated during design if not set
     }
 
     def __init__(self, **kwargs):
@@ -506,7 +508,7 @@ def network_from_json(json_data, equipment):
         el = cls(**el_config)
         g.add_node(el)
 
-    nodes = {k.uid: k for k in g.nodes()}
+    nodes = network_index(g)
 
     for cx in json_data['connections']:
         from_node, to_node = cx['from_node'], cx['to_node']
@@ -17,7 +17,7 @@ from logging import getLogger
 from copy import deepcopy
 from gnpy.core.utils import db2lin
 from gnpy.core.exceptions import ServiceError
-from gnpy.core.elements import Transceiver, Roadm, Edfa, Fiber
+from gnpy.core.network import network_index
 from gnpy.tools.convert import corresp_names, corresp_next_node
 
 SERVICES_COLUMN = 12
@@ -259,12 +259,12 @@ def correct_xls_route_list(network_filename, network, pathreqlist):
     # according to xls naming
     corresp_ila, next_node = corresp_next_node(network, corresp_ila, corresp_roadm)
     # finally correct constraints based on these dict
-    trxfibertype = [n.uid for n in network.nodes() if isinstance(n, (Transceiver, Fiber))]
-    roadmtype = [n.uid for n in network.nodes() if isinstance(n, Roadm)]
-    edfatype = [n.uid for n in network.nodes() if isinstance(n, Edfa)]
+    index = network_index(network)
+    trxfibertype = {**index.transceivers, **index.fibers}
+    roadmedfatype = {**index.roadms, **index.edfas}
     # TODO there is a problem of identification of fibers in case of parallel
     # fibers between two adjacent roadms so fiber constraint is not supported
-    transponders = [n.uid for n in network.nodes() if isinstance(n, Transceiver)]
+    transponders = index.transceivers
     for pathreq in pathreqlist:
         # first check that source and dest are transceivers
         if pathreq.source not in transponders:
@@ -294,7 +294,7 @@ def correct_xls_route_list(network_filename, network, pathreqlist):
             # can not enter fiber names in excel)
             if n_id not in trxfibertype:
                 # check that n_id is in the node list, if not find a correspondance name
-                if n_id in roadmtype + edfatype:
+                if n_id in roadmedfatype:
                     nodes_suggestion = [n_id]
                 else:
                     # checks first roadm, fused, and ila in this order, because ila automatic name
@@ -16,22 +16,31 @@ See: draft-ietf-teas-yang-path-computation-01.txt
 """
 
 from collections import namedtuple, OrderedDict
-from logging import getLogger
-from networkx import (dijkstra_path, NetworkXNoPath,
-                      all_simple_paths, shortest_simple_paths)
+from logging import getLogger, Handler, makeLogRecord
+from contextlib import contextmanager
+from multiprocessing import get_context, get_all_start_methods
+from networkx import (DiGraph, dijkstra_path, bidirectional_dijkstra, NetworkXNoPath,
+                      all_simple_paths, shortest_simple_paths, single_source_dijkstra_path_length)
 from networkx.utils import pairwise
+from itertools import islice
 from numpy import mean, argmin
 from gnpy.core.elements import Transceiver, Roadm
 from gnpy.core.utils import lin2db
-from gnpy.core.info import create_input_spectral_information, carriers_to_spectral_information
+from gnpy.core.info import create_input_spectral_information, carriers_to_spectral_information, \
+    stack_spectral_information
 from gnpy.core import network as network_module
 from gnpy.core.exceptions import ServiceError, DisjunctionError
-from copy import deepcopy
+from copy import copy, deepcopy
 from csv import writer
 from math import ceil
 
 LOGGER = getLogger(__name__)
 
+# maximum number of k-shortest paths explored when the segments of an include constrained path cross each other
+MAX_CONSTRAINED_CANDIDATES = 10
+# maximum number of disjoint path combinations listed for each disjunction by compute_path_dsjctn
+MAX_DISJOINT_SOLUTIONS = 1000
+
 RequestParams = namedtuple('RequestParams', 'request_id source destination bidir trx_type'
                            ' trx_mode nodes_list loose_list spacing power nb_channel f_min'
                            ' f_max format baud_rate OSNR penalties bit_rate'
@@ -282,6 +291,195 @@ class ResultElement:
         return self.pathresult
 
 
+class RoadmGraph:
+    """Roadm level graph of a network, for routing
+
+    Roadms and transceivers are the nodes and each OMS is an edge, weighted with the weights of its elements,
+    ie mainly its fiber length. Paths on this graph are expanded back to element paths with expand.
+    The graph is built by build_oms_list and retrieved with roadm_graph. It can only be used if all the
+    elements of the network belong to an OMS, transceivers are connected to roadms and there are no
+    parallel OMS.
+    """
+    def __init__(self, network, oms_list):
+        self.network = network
+        self.nb_nodes = network.number_of_nodes()
+        self.graph = DiGraph()
+        self.oms = {}
+        self.valid = True
+        index = network_module.network_index(network)
+        self.graph.add_nodes_from(index.roadms.values())
+        for oms in oms_list:
+            start, end = oms.el_list[0], oms.el_list[-1]
+            if self.graph.has_edge(start, end):
+                self.valid = False
+            self.graph.add_edge(start, end, weight=_path_weight(network, oms.el_list), oms=oms)
+            self.oms.update((el, oms) for el in oms.el_list[1:-1])
+        for trx in index.transceivers.values():
+            self.graph.add_node(trx)
+            for u, v in list(network.out_edges(trx)) + list(network.in_edges(trx)):
+                if not isinstance(u, Roadm) and not isinstance(v, Roadm):
+                    self.valid = False
+                self.graph.add_edge(u, v, weight=network[u][v]['weight'], oms=None)
+        if self.graph.number_of_nodes() + len(self.oms) != self.nb_nodes:
+            self.valid = False
+
+    def expand(self, path):
+        """element path corresponding to the path of roadms and transceivers"""
+        elements = [path[0]]
+        for u, v in pairwise(path):
+            oms = self.graph[u][v]['oms']
+            elements.extend(oms.el_list[1:] if oms is not None else [v])
+        return elements
+
+    @staticmethod
+    def _nb_edges(u, v, data):
+        """number of element edges of the edge of this graph"""
+        return 1 if data['oms'] is None else len(data['oms'].el_list) - 1
+
+    def simple_paths(self, source, target, cutoff):
+        """generates the element paths of the simple paths from source to target with at most cutoff element edges,
+        as all_simple_paths on the network
+
+        The depth first search is pruned with the number of element edges of the paths: a branch stops as soon as
+        its elements, and the elements of the shortest remaining path to target, exceed cutoff.
+        """
+        remaining = single_source_dijkstra_path_length(self.graph.reverse(copy=False), target, cutoff=cutoff,
+                                                       weight=self._nb_edges)
+        if source not in remaining:
+            return
+        path = [source]
+        lengths = [0]
+        children = [iter(self.graph[source].items())]
+        while children:
+            child, data = next(children[-1], (None, None))
+            if child is None:
+                children.pop()
+                path.pop()
+                lengths.pop()
+                continue
+            length = lengths[-1] + self._nb_edges(path[-1], child, data)
+            if child in path or child not in remaining or length + remaining[child] > cutoff:
+                continue
+            if child == target:
+                yield self.expand(path + [child])
+                continue
+            path.append(child)
+            lengths.append(length)
+            children.append(iter(self.graph[child].items()))
+
+    def waypoints(self, nodes_list):
+        """nodes of this graph that a path crossing the elements of nodes_list must cross
+
+        An element of an OMS is replaced by the roadms at both ends of the OMS. Returns None if an element
+        is not part of the graph.
+        """
+        waypoints = []
+        for node in nodes_list:
+            if node in self.oms:
+                waypoints.extend([self.oms[node].el_list[0], self.oms[node].el_list[-1]])
+            elif node in self.graph:
+                waypoints.append(node)
+            else:
+                return None
+        return [n for i, n in enumerate(waypoints) if i == 0 or n != waypoints[i - 1]]
+
+
+def roadm_graph(network):
+    """returns the RoadmGraph built by build_oms_list, or None if it can not be used for this network"""
+    graph = network.graph.get('roadm_graph')
+    if graph is None or not graph.valid or graph.network is not network \
+            or graph.nb_nodes != network.number_of_nodes():
+        return None
+    return graph
+
+
+def _path_weight(network, path):
+    return sum(network[u][v]['weight'] for u, v in pairwise(path))
+
+
+def _shortest_segment(network, source, target, forbidden=()):
+    """shortest path from source to target that does not cross any of the forbidden nodes"""
+    if not forbidden:
+        return bidirectional_dijkstra(network, source, target, weight='weight')[1]
+
+    def weight(u, v, data):
+        return None if u in forbidden or v in forbidden else data['weight']
+    return bidirectional_dijkstra(network, source, target, weight=weight)[1]
+
+
+def _chain_segments(network, waypoints, avoid_loops=False, backward=False):
+    """concatenates the shortest paths between consecutive waypoints
+
+    With avoid_loops, each segment avoids the other waypoints and the nodes used by the segments already
+    computed, so that the result is a loopless path crossing the waypoints in order. Segments are computed
+    from the source, or from the destination if backward is set.
+    """
+    segments = [None] * (len(waypoints) - 1)
+    used = set(waypoints)
+    order = range(len(segments))
+    for i in (reversed(order) if backward else order):
+        start, end = waypoints[i], waypoints[i + 1]
+        forbidden = used - {start, end} if avoid_loops else ()
+        segments[i] = _shortest_segment(network, start, end, forbidden)
+        used.update(segments[i])
+    path = [waypoints[0]]
+    for segment in segments:
+        path += segment[1:]
+    return path
+
+
+def include_constrained_path(network, source, destination, nodes_list, max_candidates=MAX_CONSTRAINED_CANDIDATES):
+    """shortest loopless path from source to destination crossing the nodes of nodes_list in this order
+
+    The path is the chain of the shortest paths between consecutive include nodes. Only when these segments
+    cross each other, the k shortest paths are explored, up to max_candidates paths and up to the length of a
+    loopless chain of segments, which is returned if no shorter path matches the constraints.
+    The path is computed on the roadm graph of the network if it is available, and on the network otherwise.
+    Returns None if no path satisfies the constraints and raises NetworkXNoPath if destination can not be
+    reached from source.
+    """
+    graph = roadm_graph(network)
+    waypoints = graph.waypoints(nodes_list) if graph is not None else None
+    if waypoints is None:
+        return _include_constrained_path(network, source, destination, nodes_list, max_candidates)
+    path = _include_constrained_path(graph.graph, source, destination, waypoints, max_candidates)
+    if path is None:
+        return None
+    path = graph.expand(path)
+    if ispart(nodes_list, path):
+        return path
+    # an include element was reached without crossing its OMS
+    return _include_constrained_path(network, source, destination, nodes_list, max_candidates)
+
+
+def _include_constrained_path(network, source, destination, nodes_list, max_candidates):
+    waypoints = [source] + nodes_list + [destination]
+    try:
+        path = _chain_segments(network, waypoints)
+    except NetworkXNoPath:
+        # raises NetworkXNoPath if the failure is not due to the include nodes
+        _shortest_segment(network, source, destination)
+        return None
+    if len(set(path)) == len(path):
+        return path
+    # the lightest loopless chain of segments, built from the source or from the destination
+    fallback = None
+    max_weight = float('inf')
+    for backward in (False, True):
+        try:
+            chain = _chain_segments(network, waypoints, avoid_loops=True, backward=backward)
+        except NetworkXNoPath:
+            continue
+        if _path_weight(network, chain) < max_weight:
+            fallback, max_weight = chain, _path_weight(network, chain)
+    for candidate in islice(shortest_simple_paths(network, source, destination, weight='weight'), max_candidates):
+        if _path_weight(network, candidate) > max_weight:
+            break
+        if ispart(nodes_list, candidate):
+            return candidate
+    return fallback
+
+
 def compute_constrained_path(network, req):
     # nodes_list contains at least the destination
     if req.nodes_list[-1] != req.destination:
@@ -291,24 +489,21 @@ def compute_constrained_path(network, req):
                'be destination trx')
         raise ValueError()
 
-    trx = [n for n in network if isinstance(n, Transceiver)]
-    source = next(el for el in trx if el.uid == req.source)
-    destination = next(el for el in trx if el.uid == req.destination)
+    index = network_module.network_index(network)
+    source = index.transceivers[req.source]
+    destination = index.transceivers[req.destination]
 
-    nodes_list = []
-    for node in req.nodes_list[:-1]:
-        nodes_list.append(next(el for el in network if el.uid == node))
+    nodes_list = [index[node] for node in req.nodes_list[:-1]]
 
     try:
-        path_generator = shortest_simple_paths(network, source, destination, weight='weight')
-        total_path = next(path for path in path_generator if ispart(nodes_list, path))
+        total_path = include_constrained_path(network, source, destination, nodes_list)
     except NetworkXNoPath:
         msg = (f'Request {req.request_id} could not find a path from'
                f' {source.uid} to node: {destination.uid} in network topology')
         LOGGER.critical(msg)
         req.blocking_reason = 'NO_PATH'
         total_path = []
-    except StopIteration:
+    if total_path is None:
         # TODO: better account for individual loose and strict node
         # to ease: suppose that one strict makes the whole liste strict (except for the
         # last node which is the transceiver)
@@ -332,21 +527,229 @@ def compute_constrained_path(network, req):
     return total_path
 
 
-def propagate(path, req, equipment):
-    """propagates signals in each element according to initial spectrum set by user"""
+def _propagation_results(element):
+    """values of the attributes set by the last propagation through the element, see PROPAGATION_RESULTS"""
+    return {name: getattr(element, name) for name in element.PROPAGATION_RESULTS if hasattr(element, name)}
+
+
+def _set_results(element, results):
+    """sets the recorded attributes on the element"""
+    for name, value in results.items():
+        setattr(element, name, value)
+
+
+class _PropagationNode:
+    """Node of the PropagationCache trie: the spectral information and the results of the element after its
+    propagation"""
+    __slots__ = ('results', 'spectral_info', 'children')
+
+    def __init__(self, results=None, spectral_info=None):
+        self.results = results
+        self.spectral_info = spectral_info
+        self.children = {}
+
+
+class _LogRecords(Handler):
+    """Handler keeping a copy of the records it receives, with their message formatted so that they can be pickled"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(makeLogRecord(dict(vars(record), msg=record.getMessage(), args=None, exc_info=None)))
+
+
+@contextmanager
+def _recorded_logs():
+    """records the log records of gnpy while they are emitted as usual, yields the list of records"""
+    logger = getLogger('gnpy')
+    handler = _LogRecords()
+    logger.addHandler(handler)
+    try:
+        yield handler.records
+    finally:
+        logger.removeHandler(handler)
+
+
+def _design_results(element):
+    """values of the attributes set on the element by the design of the network, see DESIGN_RESULTS"""
+    return {name: _copy_dict(getattr(element, name)) for name in element.DESIGN_RESULTS if hasattr(element, name)}
+
+
+def _copy_dict(value):
+    """copy of the value if it is a dict that a later design may update in place"""
+    return dict(value) if isinstance(value, dict) else value
+
+
+class DesignCache:
+    """Designs of the network memoized by the signature of the reference channel that drives them (its power and
+    number of channels: the design does not depend on the other attributes of the channel).
+
+    The design of a signature is computed once: the values of the DESIGN_RESULTS of the elements and the log records
+    of the design are kept. When the signature is requested after another one, the recorded results are set again on
+    the elements; nothing is recomputed when the network is already designed for the signature. The log records are
+    emitted again on each request, as a new design would do.
+    """
+
+    def __init__(self, network, equipment):
+        self.network = network
+        self.equipment = equipment
+        self.hits = 0  # number of designs restored or kept instead of being computed
+        self.misses = 0
+        self._design = None
+        self._designs = {}
+
+    def design(self, reference_channel):
+        """Designs the network for the reference channel, returns the signature of the design"""
+        signature = (reference_channel.power, reference_channel.nb_channel)
+        if signature not in self._designs:
+            self.misses += 1
+            with _recorded_logs() as records:
+                network_module.design_network(reference_channel, self.network, self.equipment,
+                                              set_connector_losses=False, verbose=False)
+            self._designs[signature] = {element: _design_results(element) for element in self.network}, records
+        else:
+            self.hits += 1
+            results, records = self._designs[signature]
+            if signature != self._design:
+                for element, element_results in results.items():
+                    _set_results(element, {name: _copy_dict(value) for name, value in element_results.items()})
+            for record in records:
+                getLogger(record.name).handle(record)
+        self._design = signature
+        return signature
+
+
+class PropagationCache:
+    """Cache of propagations along paths organised as a trie of element sequences, so that a path sharing its first
+    elements with an already propagated path only propagates the divergent suffix.
+
+    The roots of the trie are indexed by the signature of the input spectrum (and of the spectra previously propagated
+    on the same path objects, whose elements may keep a state, e.g. a saturated amplifier gain), and the nodes by
+    element uid (and egress degree for a Roadm). Each node records the spectral information after the element and the
+    values of the attributes set by its propagation (its PROPAGATION_RESULTS). The cache is only valid for one design
+    of the network: it is emptied when the design signature changes. Once the recorded spectral information reach
+    max_size bytes, no node is added.
+    """
+
+    def __init__(self, max_size=100e6):
+        self.max_size = max_size
+        self.size = 0  # [bytes]
+        self.hits = 0  # number of element propagations replayed from the cache
+        self.misses = 0
+        self._design = None
+        self._roots = {}
+
+    def set_design(self, design):
+        """Empties the cache if the design signature of the network changed"""
+        if design != self._design:
+            self._roots.clear()
+            self.size = 0
+            self._design = design
+
+    @staticmethod
+    def _step(path, i):
+        el = path[i]
+        return (el.uid, path[i + 1].uid) if isinstance(el, Roadm) else el.uid
+
+    def restore(self, path, si, history=()):
+        """Sets the recorded propagation results on the elements of the longest cached prefix of the path.
+        Returns the length of the prefix, the spectral information at its end and the trie node to extend."""
+        key = (history, si.signature())
+        node = self._roots.get(key)
+        if node is None:
+            node = _PropagationNode()
+            self._roots[key] = node
+        depth = 0
+        while depth < len(path):
+            child = node.children.get(self._step(path, depth))
+            if child is None:
+                break
+            _set_results(path[depth], child.results)
+            node = child
+            depth += 1
+        self.hits += depth
+        self.misses += len(path) - depth
+        return depth, (node.spectral_info.copy() if depth else si), node
+
+    def record(self, node, path, i, si):
+        """Records the propagation of the i-th element of the path after the node, returns the new node"""
+        if node is None or self.size + si.nbytes > self.max_size:
+            return None
+        child = _PropagationNode(_propagation_results(path[i]), si.copy())
+        node.children[self._step(path, i)] = child
+        self.size += si.nbytes
+        return child
+
+
+def propagate(path, req, equipment, cache=None):
+    """propagates signals in each element according to initial spectrum set by user.
+    With a PropagationCache, the elements of the longest prefix of the path already propagated with the same spectrum
+    get their recorded results instead of being propagated again."""
     if req.initial_spectrum is not None:
         si = carriers_to_spectral_information(initial_spectrum=req.initial_spectrum, power=req.power)
     else:
         si = create_input_spectral_information(
             f_min=req.f_min, f_max=req.f_max, roll_off=req.roll_off, baud_rate=req.baud_rate,
             spacing=req.spacing, tx_osnr=req.tx_osnr, tx_power=req.tx_power, delta_pdb=req.offset_db)
+    return _propagate_spectral_information(path, req, si, cache)
+
+
+def propagate_batch(path, req, equipment, tx_powers):
+    """propagates at once, through the elements of the path as designed, the spectrum of the request launched with
+    each of the tx_powers (W per channel, with the carriers offsets of the initial spectrum if any).
+    Returns the batched spectral information with one row per tx_power; the Transceiver at the end of the path
+    records the SNR arrays with the same rows.
+    """
+    spectra = []
+    for tx_power in tx_powers:
+        if req.initial_spectrum is not None:
+            si = carriers_to_spectral_information(initial_spectrum=req.initial_spectrum, power=req.power)
+            si.signal *= tx_power / req.tx_power
+            si.tx_power = si.tx_power * tx_power / req.tx_power
+        else:
+            si = create_input_spectral_information(
+                f_min=req.f_min, f_max=req.f_max, roll_off=req.roll_off, baud_rate=req.baud_rate,
+                spacing=req.spacing, tx_osnr=req.tx_osnr, tx_power=tx_power, delta_pdb=req.offset_db)
+        spectra.append(si)
+    return _propagate_spectral_information(path, req, stack_spectral_information(spectra))
+
+
+def compile_propagation_plan(path, frequency):
+    """precomputes, for each element of the path as computed by compute_constrained_path, the coefficients that
+    depend on the channel frequencies (fiber attenuation, dispersion, nonlinear and Raman coefficients, amplifier
+    ripples and tilt) on the frequency grid: the later propagations of spectra on this grid along the path reuse them.
+    The elements recompute their coefficients when their parameters change, and on demand for any other grid.
+    """
+    for element in path:
+        compile_element = getattr(element, 'compile', None)
+        if compile_element is not None:
+            compile_element(frequency)
+
+
+def _propagate_path(path, si, cache=None, history=()):
+    """propagates the spectral information in each element of the path, or restores the elements of the cached
+    prefix. Returns the propagated spectral information and the osnr of the roadm paths"""
+    start, node = 0, None
+    if cache is not None:
+        start, si, node = cache.restore(path, si, history)
     roadm_osnr = []
     for i, el in enumerate(path):
         if isinstance(el, Roadm):
-            si = el(si, degree=path[i + 1].uid, from_degree=path[i - 1].uid)
+            if i >= start:
+                si = el(si, degree=path[i + 1].uid, from_degree=path[i - 1].uid)
             roadm_osnr.append(el.get_roadm_path(from_degree=path[i - 1].uid, to_degree=path[i + 1].uid).impairment.osnr)
-        else:
+        elif i >= start:
             si = el(si)
+        if i >= start and cache is not None:
+            node = cache.record(node, path, i, si)
+    return si, roadm_osnr
+
+
+def _propagate_spectral_information(path, req, si, cache=None):
+    """propagates the spectral information in each element of the path and updates the SNR of the Transceivers"""
+    si, roadm_osnr = _propagate_path(path, si, cache)
     path[0].update_snr(si.tx_osnr)
     path[0].calc_penalties(req.penalties)
     roadm_osnr.append(si.tx_osnr)
@@ -355,7 +758,9 @@ def propagate(path, req, equipment):
     return si
 
 
-def propagate_and_optimize_mode(path, req, equipment):
+def propagate_and_optimize_mode(path, req, equipment, cache=None):
+    """propagates the request along the path with the modes of its transceiver, returns the path and the mode with
+    the highest bit rate that passes."""
     # if mode is unknown : loops on the modes starting from the highest baudrate fiting in the
     # step 1: create an ordered list of modes based on baudrate and power offset
     # order higher baudrate with higher power offset first
@@ -364,6 +769,8 @@ def propagate_and_optimize_mode(path, req, equipment):
                                            if float(this_mode['min_spacing']) <= req.spacing]))
     # TODO be carefull on limits cases if spacing very close to req spacing eg 50.001 50.000
     baudrate_offset_to_explore = sorted(baudrate_offset_to_explore, reverse=True)
+    # signatures of the spectra already propagated on the path, see PropagationCache
+    history = ()
     if baudrate_offset_to_explore:
         # at least 1 baudrate can be tested wrt spacing
         for (this_br, this_offset) in baudrate_offset_to_explore:
@@ -385,13 +792,9 @@ def propagate_and_optimize_mode(path, req, equipment):
                                                          baud_rate=this_br, spacing=req.spacing,
                                                          delta_pdb=this_offset, tx_osnr=req.tx_osnr,
                                                          tx_power=req.tx_power)
-            roadm_osnr = []
-            for i, el in enumerate(path):
-                if isinstance(el, Roadm):
-                    spc_info = el(spc_info, degree=path[i + 1].uid, from_degree=path[i - 1].uid)
-                    roadm_osnr.append(el.get_roadm_path(from_degree=path[i - 1].uid, to_degree=path[i + 1].uid).impairment.osnr)
-                else:
-                    spc_info = el(spc_info)
+            signature = spc_info.signature()
+            spc_info, roadm_osnr = _propagate_path(path, spc_info, cache, history)
+            history += (signature,)
             for this_mode in modes_to_explore:
                 if path[-1].snr is not None:
                     path[0].update_snr(this_mode['tx_osnr'])
@@ -604,7 +1007,309 @@ def jsontocsv(json_data, equipment, fileout):
                            ))
 
 
-def compute_path_dsjctn(network, equipment, pathreqlist, disjunctions_list):
+def disjoint_shortest_paths(network, source, destination, k):
+    """k disjoint paths from roadm source to roadm destination with the minimum total weight
+
+    Two paths are disjoint if they do not share any OMS, in the same or in the reversed direction, consistently
+    with isdisjoint applied on both directions. The paths are computed with Bhandari's version of Suurballe's
+    algorithm on the roadm graph of the network, built by build_oms_list.
+    Returns the list of element paths sorted by weight, or None if there are no k disjoint paths or if the
+    roadm graph is not available.
+    """
+    graph = roadm_graph(network)
+    if graph is None:
+        return None
+    leaving = {roadm: [data['oms'] for _, _, data in graph.graph.out_edges(roadm, data=True) if data['oms'] is not None]
+               for roadm in graph.graph if isinstance(roadm, Roadm)}
+    weight = {data['oms']: data['weight'] for _, _, data in graph.graph.edges(data=True) if data['oms'] is not None}
+
+    used = set()
+    for _ in range(k):
+        # shortest path in the residual graph with Bellman-Ford since cancelling an OMS has a negative weight
+        dist = {source: 0}
+        pred = {}
+        for _ in range(len(leaving)):
+            changed = False
+            for roadm, oms_list in leaving.items():
+                if roadm not in dist:
+                    continue
+                for oms in oms_list:
+                    if oms in used:
+                        continue
+                    reversed_oms = getattr(oms, 'reversed_oms', None)
+                    cost = -weight[reversed_oms] if reversed_oms in used else weight[oms]
+                    if dist[roadm] + cost < dist.get(oms.el_list[-1], float('inf')):
+                        dist[oms.el_list[-1]] = dist[roadm] + cost
+                        pred[oms.el_list[-1]] = oms
+                        changed = True
+            if not changed:
+                break
+        else:
+            return None
+        if destination not in dist:
+            return None
+        node = destination
+        while node != source:
+            oms = pred[node]
+            reversed_oms = getattr(oms, 'reversed_oms', None)
+            if reversed_oms in used:
+                # the new path takes back this OMS in the reversed direction: both paths exchange their ends
+                used.remove(reversed_oms)
+            else:
+                used.add(oms)
+            node = oms.el_list[0]
+
+    paths = []
+    for _ in range(k):
+        path = [source]
+        while path[-1] != destination:
+            oms = next(o for o in leaving[path[-1]] if o in used)
+            used.remove(oms)
+            path.extend(oms.el_list[1:])
+        paths.append(path)
+    return sorted(paths, key=lambda p: _path_weight(network, p))
+
+
+def _disjoint_group_paths(network, pathreqs):
+    """computes the paths of a disjunction group with disjoint_shortest_paths
+
+    Returns {request: path}, or None if the group does not fit: all requests must connect the same two
+    transceivers, in either direction, through their roadms and must have no route constraint, and the
+    roadm graph must be available.
+    As with the enumeration of combinations, the lightest paths go to the last requests of the group.
+    Requests in the reversed direction use the reversed path. DisjunctionError is raised if there are not enough disjoint paths.
+    """
+    if any(req.nodes_list for req in pathreqs) or roadm_graph(network) is None:
+        return None
+    index = network_module.network_index(network)
+    source = index[pathreqs[0].source]
+    destination = index[pathreqs[0].destination]
+    if any({req.source, req.destination} != {source.uid, destination.uid} for req in pathreqs):
+        return None
+    source_roadms = list(network.successors(source))
+    destination_roadms = list(network.predecessors(destination))
+    if len(source_roadms) != 1 or len(destination_roadms) != 1:
+        return None
+    source_roadm, destination_roadm = source_roadms[0], destination_roadms[0]
+    if not isinstance(source_roadm, Roadm) or not isinstance(destination_roadm, Roadm) \
+            or source_roadm == destination_roadm:
+        return None
+    paths = disjoint_shortest_paths(network, source_roadm, destination_roadm, len(pathreqs))
+    if paths is None:
+        msg = 'No disjoint path found with added constraint\nComputation stopped.'
+        raise DisjunctionError(msg)
+    group_paths = {}
+    for req, path in zip(reversed(pathreqs), paths):
+        path = [source] + path + [destination]
+        group_paths[req] = path if req.source == source.uid else find_reversed_path(path)
+    return group_paths
+
+
+def _disjoint_combinations(candidate_lists, bitsets, both_bitsets):
+    """generates the combinations of one candidate path per request which are pairwise disjoint
+
+    candidate_lists contains the candidate short lists of each request. The path of each request is chosen
+    starting from the last request, and the paths of the previous requests must not cross the bitsets of
+    the chosen paths and of their reversed paths. A partial combination is dropped as soon as a previous
+    request has no remaining disjoint candidate.
+    """
+    def extend(i, crossed, chosen):
+        if i < 0:
+            yield chosen[::-1]
+            return
+        for pth in candidate_lists[i]:
+            if bitsets[id(pth)] & crossed:
+                continue
+            now_crossed = crossed | both_bitsets[id(pth)]
+            if any(all(bitsets[id(p)] & now_crossed for p in candidate_lists[j]) for j in range(i)):
+                continue
+            chosen.append(pth)
+            yield from extend(i - 1, now_crossed, chosen)
+            chosen.pop()
+
+    return extend(len(candidate_lists) - 1, 0, [])
+
+
+def _solve_disjoint_groups(network, disjunctions_list, pathreqlist_disjt, global_disjunctions_list):
+    """step 0 of compute_path_dsjctn: computes with _disjoint_group_paths the paths of the disjunction groups whose
+    requests do not belong to other groups
+
+    Returns the paths of the requests of these groups {request: path} and the list of the other disjunctions.
+    """
+    pathreslist_disjoint = {}
+    requests = {e.request_id: e for e in pathreqlist_disjt}
+    remaining_disjunctions = []
+    for dis in disjunctions_list:
+        group = [requests.get(r) for r in dis.disjunctions_req]
+        group_paths = None
+        if None not in group and all(global_disjunctions_list.count(r.request_id) == 1 for r in group):
+            group_paths = _disjoint_group_paths(network, group)
+        if group_paths is None:
+            remaining_disjunctions.append(dis)
+        else:
+            pathreslist_disjoint.update(group_paths)
+    return pathreslist_disjoint, remaining_disjunctions
+
+
+def _list_disjoint_combinations(disjunctions_list, simple_rqs, simple_rqs_reversed, max_solutions):
+    """step 2 of compute_path_dsjctn: lists the combinations of candidate short lists of each disjunction
+
+    simple_rqs and simple_rqs_reversed contain the short lists of the candidate paths of each request and of their
+    reversed paths. At most max_solutions combinations are listed for each disjunction (None for no limit).
+    Returns the combinations {disjunction_id: combinations} and the set of the ids of the disjunctions with more
+    combinations than listed.
+    """
+    # each OMS crossed by a candidate path, identified by a (roadm, first element) or (last element, roadm) edge
+    # of its short list, is a bit: two paths are disjoint if the bitsets of one path and of the other path and its
+    # reversed path have no common bit
+    edge_bits = {}
+
+    def bitset(short_list):
+        bits = 0
+        for edge in pairwise(short_list):
+            bits |= 1 << edge_bits.setdefault(edge, len(edge_bits))
+        return bits
+
+    bitsets = {}
+    both_bitsets = {}
+    for request_id in dict.fromkeys(r for dis in disjunctions_list for r in dis.disjunctions_req):
+        for short_list, reversed_short_list in zip(simple_rqs[request_id], simple_rqs_reversed[request_id]):
+            bitsets[id(short_list)] = bitset(short_list)
+            both_bitsets[id(short_list)] = bitsets[id(short_list)] | bitset(reversed_short_list)
+
+    listed = {}
+    truncated = set()
+    for dis in disjunctions_list:
+        # each combination has one path per request of the disjunction and satisfies disjunction
+        # for example, assume set of requests in the vector (disjunction_list) is  {rq1,rq2, rq3}
+        # rq1  p1: aefhg
+        #      p2: abfhg
+        #      p3: abcg
+        # rq2  p8: bf
+        # rq3  p4: abcgh
+        #      p6: aefh
+        #      p7: abfh
+        # the only combination is [p3 p8 p6] since
+        #        p2 and p8 are not disjoint
+        #        p1 and p4, p6, p7 are not disjoint
+        #        p3 and p4, p7 are not disjoint
+        # combinations are listed in the order of the paths of the last request, then of the previous
+        # requests, and at most max_solutions combinations are listed
+        combinations = _disjoint_combinations([simple_rqs[r] for r in dis.disjunctions_req], bitsets, both_bitsets)
+        listed[dis.disjunction_id] = list(islice(combinations, max_solutions))
+        if next(combinations, None) is not None:
+            truncated.add(dis.disjunction_id)
+    return listed, truncated
+
+
+def _apply_route_constraints(disjunctions_list, candidates, allpaths):
+    """step 4 of compute_path_dsjctn: updates in place the candidates {disjunction_id: combinations}"""
+    # step 4 apply route constraints: remove candidate path that do not satisfy
+    # the constraint only in  the case of disjounction: the simple path is processed in
+    # request.compute_constrained_path
+    # TODO: keep a version without the loose constraint
+    for this_d in disjunctions_list:
+        temp = []
+        alternatetemp = []
+        for j, sol in enumerate(candidates[this_d.disjunction_id]):
+            testispartok = True
+            testispartnokloose = True
+            for pth in sol:
+                # print(f'test {allpaths[id(pth)].req.request_id}')
+                # print(f'length of route {len(allpaths[id(pth)].req.nodes_list)}')
+                if allpaths[id(pth)].req.nodes_list:
+                    # if any pth from sol does not contain the ordered list node,
+                    # remove sol from the candidate, except if constraint was loose:
+                    # then keep sol as an alternate solution
+                    if not ispart(allpaths[id(pth)].req.nodes_list, pth):
+                        testispartok = False
+                        if 'STRICT' in allpaths[id(pth)].req.loose_list:
+                            LOGGER.debug(f'removing solution from candidate paths\n{pth}')
+                            testispartnokloose = False
+                            break
+            if testispartok:
+                temp.append(sol)
+            elif testispartnokloose:
+                LOGGER.debug(f'Adding solution as alternate solution not satisfying constraint\n{pth}')
+                alternatetemp.append(sol)
+        if temp:
+            candidates[this_d.disjunction_id] = temp
+        elif alternatetemp:
+            candidates[this_d.disjunction_id] = alternatetemp
+        else:
+            candidates[this_d.disjunction_id] = []
+
+
+def _select_disjoint_paths(disjunctions_list, listed, pathreqlist_disjt, simple_rqs, allpaths):
+    """steps 3 to 5 of compute_path_dsjctn: selects the path of each request among the combinations listed for each
+    disjunction, consistently between the disjunctions sharing requests and with the route constraints.
+
+    Returns the selected paths {request: path} and the first disjunction without remaining combination, if any.
+    """
+    candidates = {disjunction_id: list(combinations) for disjunction_id, combinations in listed.items()}
+    pathreqlist_disjt = list(pathreqlist_disjt)
+
+    # for i in disjunctions_list:
+    #     print(f'\n{candidates[i.disjunction_id]}')
+
+    # step 3
+    # now for each request, select the path that satisfies all disjunctions
+    # path must be in candidates[id] for all concerned ids
+    # for example, assume set of sync vectors (disjunction groups) is
+    #   s1 = {rq1 rq2}   s2 = {rq1 rq3}
+    #   candidate[s1] = [[p1 p8]
+    #                    [p3 p8]]
+    #   candidate[s2] = [[p3 p6]]
+    #   for rq1 p3 should be preferred
+
+    for pathreq in pathreqlist_disjt:
+        concerned_d_id = [d.disjunction_id for d in disjunctions_list
+                          if pathreq.request_id in d.disjunctions_req]
+        # for each set of solution, verify that the same path is used for the same request
+        candidate_paths = simple_rqs[pathreq.request_id]
+        # print('coucou')
+        # print(pathreq.request_id)
+        for pth in candidate_paths:
+            iscandidate = 0
+            for sol in concerned_d_id:
+                test = 1
+                # for each solution test if pth is part of the solution
+                # if yes, then pth can remain a candidate
+                for cndt in candidates[sol]:
+                    if pth in cndt:
+                        if allpaths[id(cndt[cndt.index(pth)])].req.request_id == pathreq.request_id:
+                            test = 0
+                            break
+                iscandidate += test
+            if iscandidate != 0:
+                for this_id in concerned_d_id:
+                    for cndt in candidates[this_id]:
+                        if pth in cndt:
+                            candidates[this_id].remove(cndt)
+
+    # for i in disjunctions_list:
+    #     print(i.disjunction_id)
+    #     print(f'\n{candidates[i.disjunction_id]}')
+
+    _apply_route_constraints(disjunctions_list, candidates, allpaths)
+
+    # step 5 select the first combination that works
+    selected = {}
+    for dis in disjunctions_list:
+        if not candidates[dis.disjunction_id]:
+            return selected, dis
+        for pth in candidates[dis.disjunction_id][0]:
+            if allpaths[id(pth)].req in pathreqlist_disjt:
+                # print(f'selected path:{pth} for req {allpaths[id(pth)].req.request_id}')
+                selected[allpaths[id(pth)].req] = allpaths[id(pth)].pth
+                # remove request from list of requests (in case of duplicate)
+                pathreqlist_disjt.remove(allpaths[id(pth)].req)
+                # remove duplicated candidates
+                candidates = remove_candidate(candidates, allpaths, allpaths[id(pth)].req, pth)
+    return selected, None
+
+
+def compute_path_dsjctn(network, equipment, pathreqlist, disjunctions_list, max_solutions=MAX_DISJOINT_SOLUTIONS):
     # pathreqlist is a list of PathRequest objects
     # disjunctions_list a list of Disjunction objects
 
@@ -621,6 +1326,8 @@ def compute_path_dsjctn(network, equipment, pathreqlist, disjunctions_list):
     # third select only the candidates that satisfy all synchronization vectors they belong to
     # fourth apply route constraints: remove candidate path that do not satisfy the constraint
     # fifth select the first candidate among the set of candidates.
+    # max_solutions limits the number of combinations listed for each synchronization vector (None for
+    # no limit). If the listed combinations of vectors sharing requests do not match, all are listed.
     # the example network used in comments has been added to the set of data tests files
 
     # define the list to be returned
@@ -650,6 +1357,14 @@ def compute_path_dsjctn(network, equipment, pathreqlist, disjunctions_list):
     pathreqlist_simple = [e for e in pathreqlist if e.request_id not in global_disjunctions_list]
     pathreqlist_disjt = [e for e in pathreqlist if e.request_id in global_disjunctions_list]
 
+    # step 0
+    # disjunction groups between the same transceivers, without route constraint and whose requests
+    # do not belong to other groups, directly get their minimum weight set of disjoint paths.
+    # The other groups are solved with the following steps.
+    pathreslist_disjoint, disjunctions_list = \
+        _solve_disjoint_groups(network, disjunctions_list, pathreqlist_disjt, global_disjunctions_list)
+    pathreqlist_disjt = [e for e in pathreqlist_disjt if e not in pathreslist_disjoint]
+
     # use a mirror class to record path and the corresponding requests
     class Pth:
         def __init__(self, req, pth, simplepth):
@@ -663,12 +1378,17 @@ def compute_path_dsjctn(network, equipment, pathreqlist, disjunctions_list):
     rqs = {}
     simple_rqs = {}
     simple_rqs_reversed = {}
+    index = network_module.network_index(network)
+    graph = roadm_graph(network)
     for pathreq in pathreqlist_disjt:
-        all_simp_pths = list(all_simple_paths(network,
-                                              source=next(el for el in network.nodes() if el.uid == pathreq.source),
-                                              target=next(el for el in network.nodes()
-                                                          if el.uid == pathreq.destination),
-                                              cutoff=80))
+        if graph is None:
+            all_simp_pths = list(all_simple_paths(network,
+                                                  source=index[pathreq.source],
+                                                  target=index[pathreq.destination],
+                                                  cutoff=80))
+        else:
+            # enumerate the paths on the roadm graph, with the cutoff on the number of elements
+            all_simp_pths = list(graph.simple_paths(index[pathreq.source], index[pathreq.destination], cutoff=80))
         # sort them in km length instead of hop
         # all_simp_pths = sorted(all_simp_pths, key=lambda path: len(path))
         all_simp_pths = sorted(all_simp_pths, key=lambda
@@ -699,158 +1419,23 @@ def compute_path_dsjctn(network, equipment, pathreqlist, disjunctions_list):
     # step 2
     # for each set of requests that need to be disjoint
     # select the disjoint path combination
-
-    candidates = {}
-    for dis in disjunctions_list:
-        dlist = dis.disjunctions_req.copy()
-        # each line of dpath is one combination of path that satisfies disjunction
-        dpath = []
-        for i, pth in enumerate(simple_rqs[dlist[0]]):
-            dpath.append([pth])
-        # in each loop, dpath is updated with a path for rq that satisfies
-        # disjunction with each path in dpath
-        # for example, assume set of requests in the vector (disjunction_list) is  {rq1,rq2, rq3}
-        # rq1  p1: aefhg
-        #      p2: abfhg
-        #      p3: abcg
-        # rq2  p8: bf
-        # rq3  p4: abcgh
-        #      p6: aefh
-        #      p7: abfh
-        # initiate with rq1
-        #  dpath = [[p1]
-        #           [p2]
-        #           [p3]]
-        #  after first loop:
-        #  dpath = [[p1 p8]
-        #           [p3 p8]]
-        #  since p2 and p8 are not disjoint
-        #  after second loop:
-        #  dpath = [ p3 p8 p6 ]
-        #  since p1 and p4 are not disjoint
-        #        p1 and p6 are not disjoint
-        #        p1 and p7 are not disjoint
-        #        p3 and p4 are not disjoint
-        #        p3 and p7 are not disjoint
-
-        for elem1 in dlist[1:]:
-            temp = []
-            for j, pth1 in enumerate(simple_rqs[elem1]):
-                # can use index j in simple_rqs_reversed because index
-                # of direct and reversed paths have been kept identical
-                pth1_reversed = simple_rqs_reversed[elem1][j]
-                # print(pth1_reversed)
-                # print('\n\n')
-                for cndt in dpath:
-                    # print(f' c: \t{c}')
-                    temp2 = cndt.copy()
-                    all_disjoint = 0
-                    for pth in cndt:
-                        all_disjoint += isdisjoint(pth1, pth) + isdisjoint(pth1_reversed, pth)
-                    if all_disjoint == 0:
-                        temp2.append(pth1)
-                        temp.append(temp2)
-                        # print(f' coucou {elem1}: \t{temp}')
-            dpath = temp
-        candidates[dis.disjunction_id] = dpath
-
-    # for i in disjunctions_list:
-    #     print(f'\n{candidates[i.disjunction_id]}')
-
-    # step 3
-    # now for each request, select the path that satisfies all disjunctions
-    # path must be in candidates[id] for all concerned ids
-    # for example, assume set of sync vectors (disjunction groups) is
-    #   s1 = {rq1 rq2}   s2 = {rq1 rq3}
-    #   candidate[s1] = [[p1 p8]
-    #                    [p3 p8]]
-    #   candidate[s2] = [[p3 p6]]
-    #   for rq1 p3 should be preferred
-
-    for pathreq in pathreqlist_disjt:
-        concerned_d_id = [d.disjunction_id for d in disjunctions_list
-                          if pathreq.request_id in d.disjunctions_req]
-        # for each set of solution, verify that the same path is used for the same request
-        candidate_paths = simple_rqs[pathreq.request_id]
-        # print('coucou')
-        # print(pathreq.request_id)
-        for pth in candidate_paths:
-            iscandidate = 0
-            for sol in concerned_d_id:
-                test = 1
-                # for each solution test if pth is part of the solution
-                # if yes, then pth can remain a candidate
-                for cndt in candidates[sol]:
-                    if pth in cndt:
-                        if allpaths[id(cndt[cndt.index(pth)])].req.request_id == pathreq.request_id:
-                            test = 0
-                            break
-                iscandidate += test
-            if iscandidate != 0:
-                for this_id in concerned_d_id:
-                    for cndt in candidates[this_id]:
-                        if pth in cndt:
-                            candidates[this_id].remove(cndt)
-
-    # for i in disjunctions_list:
-    #     print(i.disjunction_id)
-    #     print(f'\n{candidates[i.disjunction_id]}')
-
-    # step 4 apply route constraints: remove candidate path that do not satisfy
-    # the constraint only in  the case of disjounction: the simple path is processed in
-    # request.compute_constrained_path
-    # TODO: keep a version without the loose constraint
-    for this_d in disjunctions_list:
-        temp = []
-        alternatetemp = []
-        for j, sol in enumerate(candidates[this_d.disjunction_id]):
-            testispartok = True
-            testispartnokloose = True
-            for pth in sol:
-                # print(f'test {allpaths[id(pth)].req.request_id}')
-                # print(f'length of route {len(allpaths[id(pth)].req.nodes_list)}')
-                if allpaths[id(pth)].req.nodes_list:
-                    # if any pth from sol does not contain the ordered list node,
-                    # remove sol from the candidate, except if constraint was loose:
-                    # then keep sol as an alternate solution
-                    if not ispart(allpaths[id(pth)].req.nodes_list, pth):
-                        testispartok = False
-                        if 'STRICT' in allpaths[id(pth)].req.loose_list:
-                            LOGGER.debug(f'removing solution from candidate paths\n{pth}')
-                            testispartnokloose = False
-                            break
-            if testispartok:
-                temp.append(sol)
-            elif testispartnokloose:
-                LOGGER.debug(f'Adding solution as alternate solution not satisfying constraint\n{pth}')
-                alternatetemp.append(sol)
-        if temp:
-            candidates[this_d.disjunction_id] = temp
-        elif alternatetemp:
-            candidates[this_d.disjunction_id] = alternatetemp
-        else:
-            candidates[this_d.disjunction_id] = []
-
-    # step 5 select the first combination that works
-    pathreslist_disjoint = {}
-    for dis in disjunctions_list:
-        if candidates[dis.disjunction_id]:
-            for pth in candidates[dis.disjunction_id][0]:
-                if allpaths[id(pth)].req in pathreqlist_disjt:
-                    # print(f'selected path:{pth} for req {allpaths[id(pth)].req.request_id}')
-                    pathreslist_disjoint[allpaths[id(pth)].req] = allpaths[id(pth)].pth
-                    # remove request from list of requests (in case of duplicate)
-                    pathreqlist_disjt.remove(allpaths[id(pth)].req)
-                    # remove duplicated candidates
-                    candidates = remove_candidate(candidates, allpaths, allpaths[id(pth)].req, pth)
-        else:
+    listed, truncated = _list_disjoint_combinations(disjunctions_list, simple_rqs, simple_rqs_reversed, max_solutions)
+
+    selected, blocked = _select_disjoint_paths(disjunctions_list, listed, pathreqlist_disjt, simple_rqs, allpaths)
+    while blocked is not None:
+        # the combinations listed for the disjunctions sharing requests with the blocked one may not match: list all
+        # the combinations of these disjunctions, or of all the other truncated disjunctions
+        widened = [dis for dis in disjunctions_list if dis.disjunction_id in truncated
+                   and set(dis.disjunctions_req) & set(blocked.disjunctions_req)] \
+            or [dis for dis in disjunctions_list if dis.disjunction_id in truncated]
+        if not widened:
             msg = 'No disjoint path found with added constraint\nComputation stopped.'
             # TODO in this case: replay step 5  with the candidate without constraints
             raise DisjunctionError(msg)
-
-    # for i in disjunctions_list:
-    #     print(i.disjunction_id)
-    #     print(f'\n{candidates[i.disjunction_id]}')
+        listed.update(_list_disjoint_combinations(widened, simple_rqs, simple_rqs_reversed, None)[0])
+        truncated.difference_update(dis.disjunction_id for dis in widened)
+        selected, blocked = _select_disjoint_paths(disjunctions_list, listed, pathreqlist_disjt, simple_rqs, allpaths)
+    pathreslist_disjoint.update(selected)
 
     # list the results in the same order as initial pathreqlist
     for req in pathreqlist:
@@ -1018,8 +1603,9 @@ def correct_json_route_list(network, pathreqlist):
     This function only checks that list is correct, warns user if the name is incorrect and
     suppresses the constraint it it is loose or raises an error if it is strict
     """
-    all_uid = [n.uid for n in network.nodes()]
-    transponders = [n.uid for n in network.nodes() if isinstance(n, Transceiver)]
+    index = network_module.network_index(network)
+    all_uid = index.nodes
+    transponders = index.transceivers
     for pathreq in pathreqlist:
         if pathreq.source not in transponders:
             msg = f'Request: {pathreq.request_id}: could not find transponder' \
@@ -1071,74 +1657,67 @@ def deduplicate_disjunctions(disjn):
     return local_disjn
 
 
-def compute_path_with_disjunction(network, equipment, pathreqlist, pathlist):
-    """use a list but a dictionnary might be helpful to find path based on request_id
+def _propagation_copy(path):
+    """copies of the elements of the path for the propagation of a request.
 
-    TODO change all these req, dsjct, res lists into dict !
+    The propagation through an element only sets its PROPAGATION_RESULTS attributes, and never updates their values
+    in place: a shallow copy of the element records the results of the request and leaves the element of the network
+    unchanged. The copies share the parameters and the coefficients caches of the elements.
     """
-    path_res_list = []
-    reversed_path_res_list = []
-    propagated_reversed_path_res_list = []
-
-    for i, pathreq in enumerate(pathreqlist):
-
-        # use the power specified in requests but might be different from the one
-        # specified for design the power is an optional parameter for requests
-        # definition if optional, use the one defines in eqt_config.json
-        msg = f'\n\trequest {pathreq.request_id}\n' \
-              + f'\tComputing path from {pathreq.source} to {pathreq.destination}\n' \
-              + f'\twith path constraint: {[pathreq.source] + pathreq.nodes_list}'
-        # # adding first node to be clearer on the output
-
-        # pathlist[i] contains the whole path information for request i
-        # last element is a transciver and where the result of the propagation is
-        # recorded.
-        # Important Note: since transceivers attached to roadms are actually logical
-        # elements to simulate performance, several demands having the same destination
-        # may use the same transponder for the performance simulation. This is why
-        # we use deepcopy: to ensure that each propagation is recorded and not overwritten
-        network_module.design_network(pathreq, network, equipment, set_connector_losses=False, verbose=False)
-        total_path = deepcopy(pathlist[i])
-        msg = msg + f'\n\tComputed path (roadms):{[e.uid for e in total_path  if isinstance(e, Roadm)]}'
-        LOGGER.info(msg)
-        # for debug
-        # print(f'{pathreq.baud_rate}   {pathreq.power}   {pathreq.spacing}   {pathreq.nb_channel}')
-        if total_path:
-            if pathreq.baud_rate is not None:
-                # means that at this point the mode was entered/forced by user and thus a
-                # baud_rate was defined
-                propagate(total_path, pathreq, equipment)
-                snr01nm_with_penalty = total_path[-1].snr_01nm - total_path[-1].total_penalty
-                min_ind = argmin(snr01nm_with_penalty)
-                if round(snr01nm_with_penalty[min_ind], 2) < pathreq.OSNR + equipment['SI']['default'].sys_margins:
-                    msg = f'\tWarning! Request {pathreq.request_id} computed path from' \
-                          + f' {pathreq.source} to {pathreq.destination} does not pass with {pathreq.tsp_mode}' \
-                          + f'\n\tcomputed SNR in 0.1nm = {round(total_path[-1].snr_01nm[min_ind], 2)}'
-                    msg = _penalty_msg(total_path, msg, min_ind) \
-                        + f'\n\trequired osnr = {pathreq.OSNR}' \
-                        + f'\n\tsystem margin = {equipment["SI"]["default"].sys_margins}'
-                    LOGGER.warning(msg)
-                    pathreq.blocking_reason = 'MODE_NOT_FEASIBLE'
-            else:
-                total_path, mode = propagate_and_optimize_mode(total_path, pathreq, equipment)
-                # if no baudrate satisfies spacing, no mode is returned and the last explored mode
-                # a warning is shown in the propagate_and_optimize_mode
-                # propagate_and_optimize_mode function returns the mode with the highest bitrate
-                # that passes. if no mode passes, then a attribute blocking_reason is added on
-                # pathreq that contains the reason for blocking: 'NO_PATH', 'NO_FEASIBLE_MODE', ...
-                try:
-                    if pathreq.blocking_reason in BLOCKING_NOPATH:
-                        total_path = []
-                    elif pathreq.blocking_reason in BLOCKING_NOMODE:
-                        pathreq.baud_rate = mode['baud_rate']
-                        pathreq.tsp_mode = mode['format']
-                        pathreq.format = mode['format']
-                        pathreq.OSNR = mode['OSNR']
-                        pathreq.tx_osnr = mode['tx_osnr']
-                        pathreq.bit_rate = mode['bit_rate']
-                        pathreq.penalties = mode['penalties']
-                    # other blocking reason should not appear at this point
-                except AttributeError:
+    return [copy(el) for el in path]
+
+
+def _propagate_request(network, equipment, pathreq, path, designs, cache):
+    """designs the network for the request, propagates it along its path (and along the reversed path if bidir) and
+    selects its mode. Returns the propagated path, the reversed path and the propagated reversed path."""
+    # use the power specified in requests but might be different from the one
+    # specified for design the power is an optional parameter for requests
+    # definition if optional, use the one defines in eqt_config.json
+    msg = f'\n\trequest {pathreq.request_id}\n' \
+          + f'\tComputing path from {pathreq.source} to {pathreq.destination}\n' \
+          + f'\twith path constraint: {[pathreq.source] + pathreq.nodes_list}'
+    # # adding first node to be clearer on the output
+
+    # path contains the whole path information for the request
+    # last element is a transciver and where the result of the propagation is
+    # recorded.
+    # Important Note: since transceivers attached to roadms are actually logical
+    # elements to simulate performance, several demands having the same destination
+    # may use the same transponder for the performance simulation. This is why
+    # we propagate on copies of the elements: to ensure that each propagation is recorded and not overwritten
+    cache.set_design(designs.design(pathreq))
+    total_path = _propagation_copy(path)
+    msg = msg + f'\n\tComputed path (roadms):{[e.uid for e in total_path  if isinstance(e, Roadm)]}'
+    LOGGER.info(msg)
+    # for debug
+    # print(f'{pathreq.baud_rate}   {pathreq.power}   {pathreq.spacing}   {pathreq.nb_channel}')
+    if total_path:
+        if pathreq.baud_rate is not None:
+            # means that at this point the mode was entered/forced by user and thus a
+            # baud_rate was defined
+            propagate(total_path, pathreq, equipment, cache)
+            snr01nm_with_penalty = total_path[-1].snr_01nm - total_path[-1].total_penalty
+            min_ind = argmin(snr01nm_with_penalty)
+            if round(snr01nm_with_penalty[min_ind], 2) < pathreq.OSNR + equipment['SI']['default'].sys_margins:
+                msg = f'\tWarning! Request {pathreq.request_id} computed path from' \
+                      + f' {pathreq.source} to {pathreq.destination} does not pass with {pathreq.tsp_mode}' \
+                      + f'\n\tcomputed SNR in 0.1nm = {round(total_path[-1].snr_01nm[min_ind], 2)}'
+                msg = _penalty_msg(total_path, msg, min_ind) \
+                    + f'\n\trequired osnr = {pathreq.OSNR}' \
+                    + f'\n\tsystem margin = {equipment["SI"]["default"].sys_margins}'
+                LOGGER.warning(msg)
+                pathreq.blocking_reason = 'MODE_NOT_FEASIBLE'
+        else:
+            total_path, mode = propagate_and_optimize_mode(total_path, pathreq, equipment, cache)
+            # if no baudrate satisfies spacing, no mode is returned and the last explored mode
+            # a warning is shown in the propagate_and_optimize_mode
+            # propagate_and_optimize_mode function returns the mode with the highest bitrate
+            # that passes. if no mode passes, then a attribute blocking_reason is added on
+            # pathreq that contains the reason for blocking: 'NO_PATH', 'NO_FEASIBLE_MODE', ...
+            try:
+                if pathreq.blocking_reason in BLOCKING_NOPATH:
+                    total_path = []
+                elif pathreq.blocking_reason in BLOCKING_NOMODE:
                     pathreq.baud_rate = mode['baud_rate']
                     pathreq.tsp_mode = mode['format']
                     pathreq.format = mode['format']
@@ -1146,38 +1725,121 @@ def compute_path_with_disjunction(network, equipment, pathreqlist, pathlist):
                     pathreq.tx_osnr = mode['tx_osnr']
                     pathreq.bit_rate = mode['bit_rate']
                     pathreq.penalties = mode['penalties']
-
-            # reversed path is needed for correct spectrum assignment
-            reversed_path = find_reversed_path(pathlist[i])
-            if pathreq.bidir and pathreq.baud_rate is not None:
-                # Both directions requested, and a feasible mode was found
-                rev_p = deepcopy(reversed_path)
-                msg = f'\n\tPropagating Z to A direction {pathreq.destination} to {pathreq.source}\n' \
-                      + f'\tPath (roadms) {[r.uid for r in rev_p if isinstance(r,Roadm)]}\n'
-                LOGGER.info(msg)
-                propagate(rev_p, pathreq, equipment)
-                propagated_reversed_path = rev_p
-                snr01nm_with_penalty = rev_p[-1].snr_01nm - rev_p[-1].total_penalty
-                min_ind = argmin(snr01nm_with_penalty)
-                if round(snr01nm_with_penalty[min_ind], 2) < pathreq.OSNR + equipment['SI']['default'].sys_margins:
-                    msg = f'\tWarning! Request {pathreq.request_id} computed path from' \
-                          + f' {pathreq.destination} to {pathreq.source} does not pass with {pathreq.tsp_mode}' \
-                          + f'\n\tcomputed SNR in 0.1nm = {round(rev_p[-1].snr_01nm[min_ind], 2)}'
-                    msg = _penalty_msg(rev_p, msg, min_ind) \
-                        + f'\n\trequired osnr = {pathreq.OSNR}' \
-                        + f'\n\tsystem margin = {equipment["SI"]["default"].sys_margins}'
-                    LOGGER.warning(msg)
-                    # TODO selection of mode should also be on reversed direction !!
-                    if not hasattr(pathreq, 'blocking_reason'):
-                        pathreq.blocking_reason = 'MODE_NOT_FEASIBLE'
-            else:
-                propagated_reversed_path = []
+                # other blocking reason should not appear at this point
+            except AttributeError:
+                pathreq.baud_rate = mode['baud_rate']
+                pathreq.tsp_mode = mode['format']
+                pathreq.format = mode['format']
+                pathreq.OSNR = mode['OSNR']
+                pathreq.tx_osnr = mode['tx_osnr']
+                pathreq.bit_rate = mode['bit_rate']
+                pathreq.penalties = mode['penalties']
+
+        # reversed path is needed for correct spectrum assignment
+        reversed_path = find_reversed_path(path)
+        if pathreq.bidir and pathreq.baud_rate is not None:
+            # Both directions requested, and a feasible mode was found
+            msg = f'\n\tPropagating Z to A direction {pathreq.destination} to {pathreq.source}\n' \
+                  + f'\tPath (roadms) {[r.uid for r in reversed_path if isinstance(r,Roadm)]}\n'
+            LOGGER.info(msg)
+            rev_p = _propagation_copy(reversed_path)
+            propagate(rev_p, pathreq, equipment, cache)
+            propagated_reversed_path = rev_p
+            snr01nm_with_penalty = rev_p[-1].snr_01nm - rev_p[-1].total_penalty
+            min_ind = argmin(snr01nm_with_penalty)
+            if round(snr01nm_with_penalty[min_ind], 2) < pathreq.OSNR + equipment['SI']['default'].sys_margins:
+                msg = f'\tWarning! Request {pathreq.request_id} computed path from' \
+                      + f' {pathreq.destination} to {pathreq.source} does not pass with {pathreq.tsp_mode}' \
+                      + f'\n\tcomputed SNR in 0.1nm = {round(rev_p[-1].snr_01nm[min_ind], 2)}'
+                msg = _penalty_msg(rev_p, msg, min_ind) \
+                    + f'\n\trequired osnr = {pathreq.OSNR}' \
+                    + f'\n\tsystem margin = {equipment["SI"]["default"].sys_margins}'
+                LOGGER.warning(msg)
+                # TODO selection of mode should also be on reversed direction !!
+                if not hasattr(pathreq, 'blocking_reason'):
+                    pathreq.blocking_reason = 'MODE_NOT_FEASIBLE'
         else:
-            msg = f'Request {pathreq.request_id}: Total path is empty. No propagation'
-            LOGGER.warning(msg)
-            reversed_path = []
             propagated_reversed_path = []
+    else:
+        msg = f'Request {pathreq.request_id}: Total path is empty. No propagation'
+        LOGGER.warning(msg)
+        reversed_path = []
+        propagated_reversed_path = []
+
+    return total_path, reversed_path, propagated_reversed_path
+
+
+def _export_path(path):
+    """picklable results of the elements of a path propagated by a worker, see DESIGN_RESULTS and
+    PROPAGATION_RESULTS"""
+    return [{**_design_results(el), **_propagation_results(el)} for el in path]
+
+
+def _import_path(results, path):
+    """copies of the elements of the path with the results exported by a worker"""
+    if not results:
+        return []
+    propagated_path = _propagation_copy(path)
+    for el, el_results in zip(propagated_path, results):
+        _set_results(el, el_results)
+    return propagated_path
+
+
+# attributes of a request set by its propagation, see _propagate_request
+_REQUEST_RESULTS = ('baud_rate', 'tsp_mode', 'format', 'OSNR', 'tx_osnr', 'bit_rate', 'penalties', 'blocking_reason')
+
+_WORKER_JOB = None
+
+
+def _init_worker(network, equipment, pathreqlist, pathlist):
+    """keeps the data of the jobs in the worker, and records the gnpy log records of the worker instead of emitting
+    them: they are emitted by the main process"""
+    global _WORKER_JOB
+    logs = _LogRecords()
+    logger = getLogger('gnpy')
+    logger.handlers = [logs]
+    logger.propagate = False
+    _WORKER_JOB = network, equipment, pathreqlist, pathlist, DesignCache(network, equipment), PropagationCache(), \
+        logs.records
 
+
+def _propagate_request_job(i):
+    """propagates the i-th request in a worker process, returns the exported results, the attributes of the request
+    set by the propagation and the log records"""
+    network, equipment, pathreqlist, pathlist, designs, cache, records = _WORKER_JOB
+    records.clear()
+    pathreq = pathreqlist[i]
+    total_path, _, propagated_reversed_path = \
+        _propagate_request(network, equipment, pathreq, pathlist[i], designs, cache)
+    return _export_path(total_path), _export_path(propagated_reversed_path), \
+        {name: getattr(pathreq, name) for name in _REQUEST_RESULTS if hasattr(pathreq, name)}, list(records)
+
+
+def compute_path_with_disjunction(network, equipment, pathreqlist, pathlist, jobs=1):
+    """use a list but a dictionnary might be helpful to find path based on request_id
+
+    With jobs > 1, the requests are propagated in a pool of jobs processes (where fork is available): their results,
+    the updates of the requests and the log records are merged back in the order of the requests, so that the output
+    is the same as the sequential computation. The network is then left as designed before the call, while the
+    sequential computation leaves it designed for the last request.
+
+    TODO change all these req, dsjct, res lists into dict !
+    """
+    if jobs > 1 and len(pathreqlist) > 1:
+        if 'fork' in get_all_start_methods():
+            return _compute_path_with_disjunction_parallel(network, equipment, pathreqlist, pathlist, jobs)
+        LOGGER.warning('Parallel propagation requires the fork start method: requests are propagated sequentially')
+    path_res_list = []
+    reversed_path_res_list = []
+    propagated_reversed_path_res_list = []
+    # the network is only designed again when the reference channel of the request changes
+    designs = DesignCache(network, equipment)
+    # requests sharing the first elements of their paths reuse the propagation of this common prefix
+    cache = PropagationCache()
+
+    for pathreq, path in zip(pathreqlist, pathlist):
+        total_path, reversed_path, propagated_reversed_path = \
+            _propagate_request(network, equipment, pathreq, path, designs, cache)
         path_res_list.append(total_path)
         reversed_path_res_list.append(reversed_path)
         propagated_reversed_path_res_list.append(propagated_reversed_path)
@@ -1185,6 +1847,31 @@ def compute_path_with_disjunction(network, equipment, pathreqlist, pathlist):
     return path_res_list, reversed_path_res_list, propagated_reversed_path_res_list
 
 
+def _compute_path_with_disjunction_parallel(network, equipment, pathreqlist, pathlist, jobs):
+    """compute_path_with_disjunction in a pool of forked processes.
+
+    The design of the network for a request does not depend on the previous designs, so that each worker designs and
+    propagates contiguous chunks of requests on its own copy of the network.
+    """
+    path_res_list = []
+    reversed_path_res_list = []
+    propagated_reversed_path_res_list = []
+    chunksize = ceil(len(pathreqlist) / (4 * jobs))
+    with get_context('fork').Pool(jobs, initializer=_init_worker,
+                                  initargs=(network, equipment, pathreqlist, pathlist)) as pool:
+        results = pool.imap(_propagate_request_job, range(len(pathreqlist)), chunksize)
+        for pathreq, path, (total_path, propagated_reversed_path, request_results, records) \
+                in zip(pathreqlist, pathlist, results):
+            _set_results(pathreq, request_results)
+            for record in records:
+                getLogger(record.name).handle(record)
+            reversed_path = find_reversed_path(path) if path else []
+            path_res_list.append(_import_path(total_path, path))
+            reversed_path_res_list.append(reversed_path)
+            propagated_reversed_path_res_list.append(_import_path(propagated_reversed_path, reversed_path))
+    return path_res_list, reversed_path_res_list, propagated_reversed_path_res_list
+
+
 def compute_spectrum_slot_vs_bandwidth(bandwidth, spacing, bit_rate, slot_width=0.0125e12):
     """Compute the number of required wavelengths and the M value (number of consumed slots)
 
@@ -18,7 +18,7 @@ from logging import getLogger
 from gnpy.core.elements import Roadm, Transceiver
 from gnpy.core.exceptions import ServiceError, SpectrumError
 from gnpy.core.utils import order_slots, restore_order
-from gnpy.topology.request import compute_spectrum_slot_vs_bandwidth
+from gnpy.topology.request import compute_spectrum_slot_vs_bandwidth, RoadmGraph
 
 LOGGER = getLogger(__name__)
 
@@ -234,6 +234,7 @@ def build_oms_list(network, equipment):
     oms it belongs to.
     the function supports different spectrum width and supposes that the whole network
     works with the min range among OMSs
+    the roadm graph used for routing is built from the OMS list and recorded in the network
     """
     oms_id = 0
     oms_list = []
@@ -281,6 +282,7 @@ def build_oms_list(network, equipment):
                 oms_id += 1
     oms_list = align_grids(oms_list)
     reversed_oms(oms_list)
+    network.graph['roadm_graph'] = RoadmGraph(network, oms_list)
     return oms_list
 
 
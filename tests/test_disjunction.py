@@ -12,14 +12,19 @@ that include node constraints are correctly taken into account
 """
 
 from pathlib import Path
+from itertools import islice
+from time import perf_counter
+from copy import deepcopy
 import pytest
+from networkx import shortest_simple_paths, has_path, all_simple_paths, dijkstra_path, dijkstra_path_length
 from gnpy.core.equipment import trx_mode_params
-from gnpy.core.network import build_network
+from gnpy.core.network import build_network, add_missing_elements_in_network
 from gnpy.core.exceptions import ServiceError, DisjunctionError
 from gnpy.core.utils import automatic_nch, lin2db
-from gnpy.core.elements import Roadm
+from gnpy.core.elements import Roadm, Transceiver
 from gnpy.topology.request import (compute_path_dsjctn, isdisjoint, find_reversed_path, PathRequest,
-                                   correct_json_route_list, requests_aggregation, Disjunction)
+                                   correct_json_route_list, requests_aggregation, Disjunction,
+                                   include_constrained_path, ispart, disjoint_shortest_paths, roadm_graph)
 from gnpy.topology.spectrum_assignment import build_oms_list
 from gnpy.tools.json_io import requests_from_json, load_requests, load_network, load_equipment, disjunctions_from_json
 
@@ -84,6 +89,15 @@ def test_disjunction(serv):
     assert test
 
 
+@pytest.mark.parametrize('max_solutions', [1, 2, None])
+def test_disjunction_max_solutions(serv, max_solutions):
+    """check that listing fewer combinations of disjoint paths still leads to the same selected paths"""
+    network, equipment, rqs, dsjn = serv
+    pths = compute_path_dsjctn(network, equipment, deepcopy(rqs), dsjn)
+    capped_pths = compute_path_dsjctn(network, equipment, rqs, dsjn, max_solutions=max_solutions)
+    assert [[e.uid for e in p] for p in capped_pths] == [[e.uid for e in p] for p in pths]
+
+
 def test_does_not_loop_back(serv):
     """check that computed paths do not loop back ie each element appears only once"""
     network, equipment, rqs, dsjn = serv
@@ -181,6 +195,104 @@ def test_include_constraints(test_setup, srce, dest, result, pth, node_list, loo
             assert pth == 'no_path'
 
 
+def test_disjoint_shortest_paths(test_setup):
+    """check that the disjoint paths have the minimum total weight among all pairs of disjoint simple paths"""
+    network, _ = test_setup
+
+    def weight(path):
+        return sum(network[u][v]['weight'] for u, v in zip(path[:-1], path[1:]))
+
+    def short_list(path):
+        return [e.uid for i, e in enumerate(path[1:]) if isinstance(e, Roadm) | isinstance(path[i], Roadm)]
+
+    roadms = [n for n in network.nodes() if isinstance(n, Roadm)]
+    for source, destination in zip(roadms[:-1], roadms[1:]):
+        paths = disjoint_shortest_paths(network, source, destination, 2)
+        simple_paths = [(p, short_list(p), short_list(find_reversed_path(p)))
+                        for p in all_simple_paths(network, source, destination)]
+        disjoint_weights = [weight(p1) + weight(p2) for i, (p1, s1, r1) in enumerate(simple_paths)
+                            for p2, s2, _ in simple_paths[i + 1:] if not isdisjoint(s1, s2) + isdisjoint(r1, s2)]
+        if not disjoint_weights:
+            assert paths is None
+            continue
+        assert isdisjoint(short_list(paths[0]), short_list(paths[1])) == 0
+        assert isdisjoint(short_list(find_reversed_path(paths[0])), short_list(paths[1])) == 0
+        assert weight(paths[0]) <= weight(paths[1])
+        assert weight(paths[0]) + weight(paths[1]) == pytest.approx(min(disjoint_weights))
+
+
+def test_roadm_graph(test_setup):
+    """check that the roadm graph built with the OMS gives the shortest element paths"""
+    network, _ = test_setup
+    graph = roadm_graph(network)
+    assert graph is not None
+    assert all(isinstance(n, (Roadm, Transceiver)) for n in graph.graph)
+    transceivers = [n for n in network.nodes() if isinstance(n, Transceiver)]
+    for source in transceivers:
+        for destination in transceivers:
+            if source == destination or not has_path(network, source, destination):
+                continue
+            path = graph.expand(dijkstra_path(graph.graph, source, destination))
+            assert all(network.has_edge(u, v) for u, v in zip(path[:-1], path[1:]))
+            assert sum(network[u][v]['weight'] for u, v in zip(path[:-1], path[1:])) == \
+                pytest.approx(dijkstra_path_length(network, source, destination))
+
+
+def test_roadm_graph_simple_paths(test_setup):
+    """check that the simple paths enumerated on the roadm graph are the simple paths of the network"""
+    network, _ = test_setup
+    graph = roadm_graph(network)
+    transceivers = [n for n in network.nodes() if isinstance(n, Transceiver)]
+    for source in transceivers:
+        for destination in transceivers:
+            if source == destination:
+                continue
+            for cutoff in (10, 80):
+                expected = sorted([e.uid for e in p] for p in all_simple_paths(network, source, destination, cutoff))
+                paths = sorted([e.uid for e in p] for p in graph.simple_paths(source, destination, cutoff))
+                assert paths == expected
+
+
+def test_disjunction_coronet():
+    """check that the disjoint paths of requests with different destinations are quickly found on a large network"""
+    equipment = load_equipment(EQPT_LIBRARY_NAME)
+    network = load_network(Path(__file__).parent / 'data/CORONET_Global_Topology_expected.json', equipment)
+    add_missing_elements_in_network(network, equipment)
+    p_db = equipment['SI']['default'].power_dbm
+    p_total_db = p_db + lin2db(automatic_nch(equipment['SI']['default'].f_min,
+                                             equipment['SI']['default'].f_max, equipment['SI']['default'].spacing))
+    build_network(network, equipment, p_db, p_total_db)
+    build_oms_list(network, equipment)
+    rqs = create_rq(equipment, 'trx Abilene', 'trx Little_Rock', False, [], [], '0') \
+        + create_rq(equipment, 'trx Abilene', 'trx Dallas', False, [], [], '1')
+    dsjn = [Disjunction(disjunction_id='x', relaxable='false', link_diverse=True, node_diverse=True,
+                        disjunctions_req=['0', '1'])]
+    start = perf_counter()
+    pths = compute_path_dsjctn(network, equipment, rqs, dsjn)
+    assert perf_counter() - start < 10
+    assert [[e.uid for e in p if isinstance(e, Roadm)] for p in pths] == \
+        [['roadm Abilene', 'roadm El_Paso', 'roadm Albuquerque', 'roadm Dallas', 'roadm Little_Rock'],
+         ['roadm Abilene', 'roadm Dallas']]
+
+
+def test_include_constrained_path(test_setup):
+    """check that the chain of segments finds the same path as the enumeration of the shortest simple paths"""
+    network, _ = test_setup
+    transceivers = [n for n in network.nodes() if isinstance(n, Transceiver)]
+    roadms = [n for n in network.nodes() if isinstance(n, Roadm)]
+    for source, destination in zip(transceivers[:-1], transceivers[1:]):
+        if not has_path(network, source, destination):
+            continue
+        for nodes_list in [[]] + [[r] for r in roadms] + [[r1, r2] for r1, r2 in zip(roadms[:-1], roadms[1:])]:
+            expected = next((p for p in islice(shortest_simple_paths(network, source, destination, weight='weight'),
+                                               200) if ispart(nodes_list, p)), None)
+            path = include_constrained_path(network, source, destination, nodes_list)
+            if expected is not None:
+                assert path == expected
+            elif path is not None:
+                assert ispart(nodes_list, path) and len(set(path)) == len(path)
+
+
 @pytest.mark.parametrize('dis1, dis2, node_list1, loose_list1, result, expected_paths', [
     [['1', '2', '3'], ['2', '3'], [], [], 'pass',
      [['roadm a', 'roadm c', 'roadm d', 'roadm e', 'roadm g'],
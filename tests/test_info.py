@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from copy import copy, deepcopy
+from pickle import dumps, loads
 import pytest
 from numpy import array, zeros, ones
 from numpy.testing import assert_array_equal
@@ -54,3 +56,37 @@ def test_create_arbitrary_spectral_information():
                        match='Dimension mismatch in input fields.'):
         create_arbitrary_spectral_information(frequency=[193.25e12, 193.3e12, 193.35e12], signal=[1, 2], baud_rate=49e9,
                                               tx_osnr=40.0, tx_power=1)
+
+
+def test_spectral_information_buffer():
+    si = create_arbitrary_spectral_information(frequency=[193.35e12, 193.25e12, 193.3e12], baud_rate=32e9,
+                                               signal=[3, 1, 2], tx_osnr=40.0, tx_power=[3, 1, 2],
+                                               label=['c', 'a', 'b'])
+    assert si.df is si.df
+    assert_array_equal(si.label, array(['a', 'b', 'c']))
+    si.pdl = array([1, 2, 3])
+    si.apply_gain_lin(2)
+    assert_array_equal(si.pdl, array([1, 2, 3]))
+    assert_array_equal(si.signal, array([2, 4, 6]))
+
+    duplicate = si.copy()
+    duplicate.signal = zeros(3)
+    duplicate.pmd += 1
+    assert_array_equal(si.signal, array([2, 4, 6]))
+    assert_array_equal(si.pmd, zeros(3))
+    assert_array_equal(deepcopy(duplicate).pmd, ones(3))
+    restored = loads(dumps(si))
+    restored.latency = ones(3)
+    assert_array_equal(restored.signal, si.signal)
+    assert_array_equal(restored.latency, ones(3))
+    assert_array_equal(si.latency, zeros(3))
+
+    shallow = copy(si)
+    view = si.signal
+    si.signal = si.signal * 2
+    si.ase += 1
+    assert_array_equal(shallow.signal, array([2, 4, 6]))
+    assert_array_equal(shallow.ase, zeros(3))
+    assert_array_equal(si.signal, array([4, 8, 12]))
+    # the setters write into the buffer: the views stay bound to the fields
+    assert si.signal is view
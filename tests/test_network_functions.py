@@ -7,7 +7,8 @@
 from pathlib import Path
 import pytest
 from gnpy.core.exceptions import NetworkTopologyError
-from gnpy.core.network import span_loss, build_network
+from gnpy.core.network import span_loss, build_network, add_missing_elements_in_network, network_index, NetworkIndex, \
+    edfa_nf, nf_table, select_edfa
 from gnpy.tools.json_io import load_equipment, load_network, network_from_json
 from gnpy.core.utils import lin2db, automatic_nch
 from gnpy.core.elements import Fiber, Edfa
@@ -241,3 +242,51 @@ def test_design_non_amplified_link(elem1, elem2, expected_gain, expected_delta_p
         assert amp.delta_p == expected_delta_p
         # max power of std_low_gain is 21 dBm
         assert amp.effective_gain == expected_gain
+
+
+def test_network_index():
+    """Check that the uid index follows the elements added and removed by the autodesign"""
+    equipment = load_equipment(EQPT_FILENAME)
+    network = load_network(TEST_DIR / 'data/CORONET_Global_Topology_expected.json', equipment)
+    index = network_index(network)
+    add_missing_elements_in_network(network, equipment)
+    assert network_index(network) is index
+    assert list(index.nodes.values()) == list(network.nodes())
+    for name, cls in NetworkIndex.BUCKETS.items():
+        assert list(getattr(index, name).values()) == [n for n in network.nodes() if isinstance(n, cls)]
+    split_spans = [uid for uid in index.fibers if uid.endswith(')') and '/' in uid]
+    assert split_spans
+    assert index[split_spans[0]].uid == split_spans[0]
+    # a node found under a uid that it no longer has rebuilds the index
+    fiber = index[split_spans[0]]
+    fiber.uid = 'renamed ' + fiber.uid
+    assert split_spans[0] not in index
+    assert index[fiber.uid] is fiber
+    # a network modified without updating the index gets a new index
+    network.remove_node(fiber)
+    assert network_index(network) is not index
+    # with check, the nodes of the index are compared with the nodes of the network
+    index = network_index(network)
+    other_fiber = next(iter(index.fibers.values()))
+    other_fiber.uid = 'renamed ' + other_fiber.uid
+    assert network_index(network) is index
+    checked = network_index(network, check=True)
+    assert checked is not index
+    assert checked[other_fiber.uid] is other_fiber
+
+
+def test_nf_table():
+    """Check that the NF interpolated from the tables matches the exact NF, and so does the amplifier selection"""
+    equipment = load_equipment(EQPT_FILENAME)
+    for variety_type in ('std_medium_gain', 'CienaDB_medium_gain', 'test_fixed_gain'):
+        table = nf_table(variety_type, equipment)
+        assert table is nf_table(variety_type, equipment)
+        for gain_target in (0, 5.123, 15, 17.777, 21.5, 35, table.gain[-1] + 1):
+            assert table(gain_target, equipment) == pytest.approx(edfa_nf(gain_target, variety_type, equipment),
+                                                                  abs=1e-4)
+    selections = {}
+    for exact_nf in (None, True):
+        equipment['Span']['default'].exact_nf = exact_nf
+        selections[exact_nf] = [select_edfa(False, gain_target, power_target, equipment, 'amp', verbose=False)
+                                for gain_target in (8, 15, 20.05, 22, 28) for power_target in (10, 20, 25)]
+    assert selections[None] == selections[True]
@@ -5,17 +5,23 @@
 
 import pytest
 
+from copy import deepcopy
 from pathlib import Path
 from networkx import dijkstra_path
-from numpy import mean, sqrt, ones
+from numpy import mean, sqrt, ones, ndarray
+from numpy.testing import assert_allclose, assert_equal
 import re
 
 from gnpy.core.exceptions import SpectrumError
 from gnpy.core.elements import Transceiver, Fiber, Edfa, Roadm
-from gnpy.core.utils import db2lin
-from gnpy.core.info import create_input_spectral_information
-from gnpy.core.network import build_network
+from gnpy.core.utils import db2lin, dbm2watt, lin2db, automatic_nch
+from gnpy.core.info import create_input_spectral_information, stack_spectral_information
+from gnpy.core.network import build_network, design_network
+from gnpy.core.parameters import SimParams
+from gnpy.core.equipment import trx_mode_params
 from gnpy.tools.json_io import load_network, load_equipment, network_from_json
+from gnpy.topology.request import PathRequest, compute_constrained_path, propagate, propagate_batch, \
+    compile_propagation_plan, PropagationCache, DesignCache, _propagation_copy
 
 
 network_file_name = Path(__file__).parent.parent / 'tests/LinkforTest.json'
@@ -195,3 +201,213 @@ if __name__ == '__main__':
     for a in test:
         test_snr(a, 'trx F')
     print('\n')
+
+
+@pytest.mark.parametrize('sim_params', [
+    None,
+    {'raman_params': {'flag': True, 'solver': 'rk4', 'solver_spatial_resolution': 5e3},
+     'nli_params': {'method': 'isrs_gn_model_analytic'}}])
+@pytest.mark.usefixtures('set_sim_params')
+def test_propagate_batch(sim_params):
+    """Check that the scenarios of a batch propagated at once give the same results as propagated one by one"""
+    if sim_params is not None:
+        SimParams.set_params(sim_params)
+    equipment = load_equipment(eqpt_library_name)
+    network = load_network(Path(__file__).parent / 'data/testTopology_expected.json', equipment)
+    spectrum = equipment['SI']['default']
+    build_network(network, equipment, spectrum.power_dbm,
+                  spectrum.power_dbm + lin2db(automatic_nch(spectrum.f_min, spectrum.f_max, spectrum.spacing)))
+    params = {'request_id': 'batch', 'source': 'trx Brest_KLA', 'destination': 'trx Vannes_KBE', 'bidir': False,
+              'trx_type': 'Voyager', 'trx_mode': 'mode 1', 'format': 'mode 1', 'spacing': 50e9,
+              'nodes_list': ['trx Vannes_KBE'], 'loose_list': ['STRICT'], 'path_bandwidth': 100.0e9,
+              'effective_freq_slot': None, 'power': 1e-3, 'tx_power': 1e-3}
+    params.update(trx_mode_params(equipment, params['trx_type'], params['trx_mode'], True))
+    params['nb_channel'] = automatic_nch(params['f_min'], params['f_max'], params['spacing'])
+    req = PathRequest(**params)
+    path = compute_constrained_path(network, req)
+
+    tx_powers = [dbm2watt(p) for p in (-3, 0, 3)]
+    batch = propagate_batch(path, req, equipment, tx_powers)
+    assert batch.batch_size == 3
+    batch_snr = path[-1].snr
+    for i, tx_power in enumerate(tx_powers):
+        req.tx_power = tx_power
+        si = propagate(path, req, equipment)
+        assert_allclose(batch.signal[i], si.signal, rtol=1e-10)
+        assert_allclose(batch.nli[i], si.nli, rtol=1e-10)
+        assert_allclose(batch.ase[i], si.ase, rtol=1e-10)
+        assert_allclose(batch_snr[i], path[-1].snr, rtol=1e-10)
+
+    with pytest.raises(SpectrumError, match='channels differ'):
+        stack_spectral_information([si, create_input_spectral_information(
+            f_min=191.3e12, f_max=196.1e12, roll_off=0.15, baud_rate=32e9, spacing=75e9, tx_osnr=40, tx_power=1e-3)])
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_compile_propagation_plan():
+    """Check that the coefficients precomputed on the frequency grid are replayed without changing the results, and
+    recomputed when the fiber parameters change"""
+    equipment = load_equipment(eqpt_library_name)
+    network = load_network(Path(__file__).parent / 'data/testTopology_expected.json', equipment)
+    spectrum = equipment['SI']['default']
+    build_network(network, equipment, spectrum.power_dbm,
+                  spectrum.power_dbm + lin2db(automatic_nch(spectrum.f_min, spectrum.f_max, spectrum.spacing)))
+    params = {'request_id': 'plan', 'source': 'trx Brest_KLA', 'destination': 'trx Vannes_KBE', 'bidir': False,
+              'trx_type': 'Voyager', 'trx_mode': 'mode 1', 'format': 'mode 1', 'spacing': 50e9,
+              'nodes_list': ['trx Vannes_KBE'], 'loose_list': ['STRICT'], 'path_bandwidth': 100.0e9,
+              'effective_freq_slot': None, 'power': 1e-3, 'tx_power': 1e-3}
+    params.update(trx_mode_params(equipment, params['trx_type'], params['trx_mode'], True))
+    params['nb_channel'] = automatic_nch(params['f_min'], params['f_max'], params['spacing'])
+    req = PathRequest(**params)
+    path = compute_constrained_path(network, req)
+    fibers = [el for el in path if isinstance(el, Fiber)]
+    amplifiers = [el for el in path if isinstance(el, Edfa)]
+
+    reference = propagate(path, req, equipment)
+    reference_snr = path[-1].snr
+    for el in fibers + amplifiers:
+        el.coefficients_cache.clear()
+    compile_propagation_plan(path, reference.frequency)
+    assert all(el.coefficients_cache.stats['entries'] for el in fibers + amplifiers)
+    si = propagate(path, req, equipment)
+    assert all(el.coefficients_cache.stats['hits'] for el in fibers + amplifiers)
+    assert_allclose(si.signal, reference.signal, rtol=1e-12)
+    assert_allclose(si.nli, reference.nli, rtol=1e-12)
+    assert_allclose(si.chromatic_dispersion, reference.chromatic_dispersion, rtol=1e-12)
+    assert_allclose(path[-1].snr, reference_snr, rtol=1e-12)
+
+    fibers[0].params.length = 2 * fibers[0].params.length
+    assert not fibers[0].coefficients_cache.stats['entries'] and not fibers[0].srs_cache.stats['entries']
+    amplifiers[0].params.update_params({'pmd': amplifiers[0].params.pmd})
+    assert not amplifiers[0].coefficients_cache.stats['entries']
+    si = propagate(path, req, equipment)
+    assert_allclose(si.chromatic_dispersion - reference.chromatic_dispersion,
+                    fibers[0].chromatic_dispersion(si.frequency) / 2, rtol=1e-10)
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_propagation_cache():
+    """Check that a path sharing its first elements with an already propagated path gives the same results when its
+    prefix is restored from the cache"""
+    equipment = load_equipment(eqpt_library_name)
+    network = load_network(Path(__file__).parent / 'data/testTopology_expected.json', equipment)
+    spectrum = equipment['SI']['default']
+    build_network(network, equipment, spectrum.power_dbm,
+                  spectrum.power_dbm + lin2db(automatic_nch(spectrum.f_min, spectrum.f_max, spectrum.spacing)))
+    paths = {}
+    for destination in ('Vannes_KBE', 'Lorient_KMA'):
+        params = {'request_id': destination, 'source': 'trx Brest_KLA', 'destination': f'trx {destination}',
+                  'bidir': False, 'trx_type': 'Voyager', 'trx_mode': 'mode 1', 'format': 'mode 1', 'spacing': 50e9,
+                  'nodes_list': [f'trx {destination}'], 'loose_list': ['STRICT'], 'path_bandwidth': 100.0e9,
+                  'effective_freq_slot': None, 'power': 1e-3, 'tx_power': 1e-3}
+        params.update(trx_mode_params(equipment, params['trx_type'], params['trx_mode'], True))
+        params['nb_channel'] = automatic_nch(params['f_min'], params['f_max'], params['spacing'])
+        req = PathRequest(**params)
+        paths[destination] = compute_constrained_path(network, req)
+
+    reference_path = deepcopy(paths['Lorient_KMA'])
+    reference = propagate(reference_path, req, equipment)
+    cache = PropagationCache()
+    propagate(deepcopy(paths['Vannes_KBE']), req, equipment, cache)
+    path = deepcopy(paths['Lorient_KMA'])
+    si = propagate(path, req, equipment, cache)
+    # the elements up to the Lorient_KMA roadm are shared with the first path
+    assert cache.hits == 7
+    assert_allclose(si.signal, reference.signal, rtol=1e-12)
+    assert_allclose(si.ase, reference.ase, rtol=1e-12)
+    assert_allclose(path[-1].snr, reference_path[-1].snr, rtol=1e-12)
+    for element, reference_element in zip(path, reference_path):
+        assert str(element) == str(reference_element)
+        if isinstance(element, (Fiber, Edfa)):
+            assert_allclose(element.pch_out_dbm, reference_element.pch_out_dbm, rtol=1e-12)
+
+
+def test_design_cache(caplog):
+    """Check that a design restored from the cache is the one computed for the same reference channel"""
+    equipment = load_equipment(eqpt_library_name)
+    network = load_network(Path(__file__).parent / 'data/testTopology_expected.json', equipment)
+    spectrum = equipment['SI']['default']
+    nb_channel = automatic_nch(spectrum.f_min, spectrum.f_max, spectrum.spacing)
+    build_network(network, equipment, spectrum.power_dbm, spectrum.power_dbm + lin2db(nb_channel))
+    params = {'request_id': 'design', 'source': 'trx Brest_KLA', 'destination': 'trx Vannes_KBE', 'bidir': False,
+              'trx_type': 'Voyager', 'trx_mode': 'mode 1', 'format': 'mode 1', 'spacing': 50e9,
+              'nodes_list': [], 'loose_list': [], 'path_bandwidth': 100.0e9,
+              'effective_freq_slot': None, 'power': 1e-3, 'tx_power': 1e-3, 'nb_channel': nb_channel}
+    params.update(trx_mode_params(equipment, params['trx_type'], params['trx_mode'], True))
+    requests = [PathRequest(**params), PathRequest(**{**params, 'power': 2e-3}), PathRequest(**params)]
+    # a ROADM target that can not be met, so that the designs log warnings
+    roadm = next(el for el in network if isinstance(el, Roadm))
+    roadm.per_degree_pch_out_dbm = {degree: 10 for degree in roadm.per_degree_pch_out_dbm}
+
+    def design_state():
+        return {el.uid: (str(el), {name: deepcopy(getattr(el, name)) for name in el.DESIGN_RESULTS
+                                   if hasattr(el, name)}) for el in network}
+
+    designs = DesignCache(network, equipment)
+    states = []
+    messages = []
+    for req in requests:
+        caplog.clear()
+        designs.design(req)
+        states.append(design_state())
+        messages.append([record.getMessage() for record in caplog.records])
+    assert (designs.hits, designs.misses) == (1, 2)
+    assert states[0] != states[1]
+    assert states[2] == states[0]
+    assert messages[0] and messages[2] == messages[0]
+    caplog.clear()
+    design_network(requests[0], network, equipment, set_connector_losses=False, verbose=False)
+    assert design_state() == states[0]
+    assert [record.getMessage() for record in caplog.records] == messages[0]
+
+
+def _state(obj):
+    """attributes of obj (but its shared caches), with a copy of the content of the mutable ones"""
+    return {name: (value, value.copy() if isinstance(value, (ndarray, list, dict)) else None)
+            for name, value in getattr(obj, '__dict__', {}).items() if not name.endswith('_cache')}
+
+
+def _assert_unchanged(obj, state):
+    assert _state(obj).keys() == state.keys()
+    for name, (value, content) in state.items():
+        assert getattr(obj, name) is value
+        if content is not None:
+            assert_equal(value, content)
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_propagation_copy():
+    """Check that the propagation on copies of the elements records the same results as the propagation on deep
+    copies, only sets the PROPAGATION_RESULTS of the copies and leaves the elements unchanged"""
+    equipment = load_equipment(eqpt_library_name)
+    network = load_network(Path(__file__).parent / 'data/testTopology_expected.json', equipment)
+    spectrum = equipment['SI']['default']
+    build_network(network, equipment, spectrum.power_dbm,
+                  spectrum.power_dbm + lin2db(automatic_nch(spectrum.f_min, spectrum.f_max, spectrum.spacing)))
+    params = {'request_id': 'copy', 'source': 'trx Brest_KLA', 'destination': 'trx Vannes_KBE', 'bidir': False,
+              'trx_type': 'Voyager', 'trx_mode': 'mode 1', 'format': 'mode 1', 'spacing': 50e9,
+              'nodes_list': ['trx Vannes_KBE'], 'loose_list': ['STRICT'], 'path_bandwidth': 100.0e9,
+              'effective_freq_slot': None, 'power': 1e-3, 'tx_power': 1e-3}
+    params.update(trx_mode_params(equipment, params['trx_type'], params['trx_mode'], True))
+    params['nb_channel'] = automatic_nch(params['f_min'], params['f_max'], params['spacing'])
+    req = PathRequest(**params)
+    path = compute_constrained_path(network, req)
+    states = [(_state(el), _state(el.params)) for el in path]
+
+    reference_path = deepcopy(path)
+    reference = propagate(reference_path, req, equipment)
+    cache = PropagationCache()
+    for _ in range(2):
+        # the second propagation sets the results recorded in the cache on new copies
+        propagated_path = _propagation_copy(path)
+        si = propagate(propagated_path, req, equipment, cache)
+        assert_allclose(si.signal, reference.signal, rtol=1e-12)
+        assert_allclose(propagated_path[-1].snr, reference_path[-1].snr, rtol=1e-12)
+        for element, propagated, reference_element, (state, params_state) \
+                in zip(path, propagated_path, reference_path, states):
+            _assert_unchanged(element, state)
+            _assert_unchanged(element.params, params_state)
+            assert str(propagated) == str(reference_element)
+            changed = {name for name, value in vars(propagated).items()
+                       if name not in vars(element) or vars(element)[name] is not value}
+            assert changed <= set(element.PROPAGATION_RESULTS)
@@ -697,3 +697,6 @@ def test_impairment_initialization(path_type, type_variety, expected_pmd, expect
                                         to_degree='toto').impairment.osnr == roadm.params.add_drop_osnr + lin2db(2)
         else:
             assert roadm.get_roadm_path(from_degree='tata', to_degree='toto').impairment.osnr == expected_osnr
+    # setting the path again, as each design of the network does, keeps a single path
+    roadm.set_roadm_paths(from_degree='tata', to_degree='toto', path_type=path_type)
+    assert len(roadm.roadm_paths) == 1
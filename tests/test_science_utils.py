@@ -6,18 +6,21 @@ Checks that RamanFiber propagates properly the spectral information. In this way
 are tested.
 """
 
+import logging
 from pathlib import Path
+from time import perf_counter
 from pandas import read_csv
-from numpy.testing import assert_allclose
-from numpy import array
+from numpy.testing import assert_allclose, assert_array_equal
+from numpy import array, exp, sin, outer, linspace, newaxis, arange, ones, isfinite
 import pytest
 
 from gnpy.core.info import create_input_spectral_information, create_arbitrary_spectral_information
 from gnpy.core.elements import Fiber, RamanFiber
 from gnpy.core.parameters import SimParams
-from gnpy.tools.json_io import load_json
+from gnpy.tools.json_io import load_json, load_equipment, load_network
 from gnpy.core.exceptions import NetworkTopologyError
-from gnpy.core.science_utils import RamanSolver
+from gnpy.core.science_utils import RamanSolver, NliSolver, PsiTable, shutdown_worker_pools, _worker_pools
+from gnpy.core.utils import lin2db
 
 TEST_DIR = Path(__file__).parent
 
@@ -132,3 +135,342 @@ def test_fiber_lumped_losses_srs(set_sim_params):
     stimulated_raman_scattering = RamanSolver.calculate_attenuation_profile(spectral_info_input, fiber)
     power_profile = stimulated_raman_scattering.power_profile
     assert_allclose(power_profile, expected_power_profile, rtol=1e-3)
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_ggn_batched():
+    """Check that the batched ggn evaluation matches the channel by channel loop."""
+    frequency = 191e12 + array([0, 50e9, 150e9, 225e9, 275e9, 700e9])
+    slot_width = array([37.5e9, 50e9, 75e9, 50e9, 37.5e9, 50e9])
+    baud_rate = array([32e9, 42e9, 64e9, 42e9, 32e9, 32e9])
+    signal = 1e-3 + array([0, -1e-4, 3e-4, -2e-4, +2e-4, 0])
+    spectral_info = create_arbitrary_spectral_information(frequency=frequency, slot_width=slot_width, signal=signal,
+                                                          baud_rate=baud_rate, roll_off=0.15,
+                                                          delta_pdb_per_channel=[0] * 6, tx_osnr=40.0,
+                                                          tx_power=1e-3)
+    sim_params = load_json(TEST_DIR / 'data' / 'sim_params.json')
+    sim_params['nli_params']['computed_channels'] = [1, 3, 6]
+    SimParams.set_params(sim_params)
+    fiber = RamanFiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'))
+    srs = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber)
+    cut_indices = array([0, 2, 5])
+    eta = NliSolver._ggn_spectrally_separated(cut_indices, spectral_info, fiber, srs)
+
+    sim_params['nli_params']['batched'] = True
+    SimParams.set_params(sim_params)
+    eta_batched = NliSolver._ggn_spectrally_separated(cut_indices, spectral_info, fiber, srs)
+    assert_allclose(eta_batched, eta, rtol=1e-9)
+
+
+def test_generalized_rho_nli():
+    """Check the vectorized generalized rho against the segment by segment integration along z."""
+    z = array([0, 10e3, 20e3, 25e3, 35e3, 45e3, 50e3])
+    alpha = 4.6e-5
+    rho_pump = 1 + 0.1 * sin(z / 1e4)
+    delta_beta = outer(linspace(-1e-3, 1e-3, 4), linspace(-2e-3, 3e-3, 5))
+
+    w = 1j * delta_beta - alpha
+    expected = (rho_pump[-1]**2 * exp(w * z[-1]) - rho_pump[0]**2 * exp(w * z[0])) / w
+    for z_ind in range(0, len(z) - 1):
+        derivative_rho = (rho_pump[z_ind + 1]**2 - rho_pump[z_ind]**2) / (z[z_ind + 1] - z[z_ind])
+        expected -= derivative_rho * (exp(w * z[z_ind + 1]) - exp(w * z[z_ind])) / (w**2)
+    expected = abs(expected)**2
+
+    assert_allclose(NliSolver._generalized_rho_nli(delta_beta, rho_pump, z, alpha), expected, rtol=1e-10)
+    # one pump profile per row of delta_beta
+    rho_pumps = outer(array([1, 0.5, 2, 1]), rho_pump)[:, newaxis, :]
+    scaling = array([1, 0.5, 2, 1])[:, newaxis] ** 4
+    assert_allclose(NliSolver._generalized_rho_nli(delta_beta, rho_pumps, z, alpha), expected * scaling, rtol=1e-10)
+
+
+@pytest.mark.parametrize('batched', [False, True])
+@pytest.mark.usefixtures('set_sim_params')
+def test_ggn_workers(batched):
+    """Check that splitting the CUTs across worker processes gives the same eta as the serial computation."""
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=192.3e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    sim_params = load_json(TEST_DIR / 'data' / 'sim_params.json')
+    sim_params['nli_params']['batched'] = batched
+    SimParams.set_params(sim_params)
+    fiber = RamanFiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'))
+    srs = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber)
+    cut_indices = array([0, 7, 13, 19])
+    eta = NliSolver._ggn_spectrally_separated(cut_indices, spectral_info, fiber, srs)
+
+    sim_params['nli_params']['workers'] = 2
+    SimParams.set_params(sim_params)
+    eta_parallel = NliSolver._ggn_spectrally_separated(cut_indices, spectral_info, fiber, srs)
+    assert_array_equal(eta_parallel, eta)
+    assert list(_worker_pools) == [2]
+    shutdown_worker_pools()
+    assert not _worker_pools
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_gn_eta_cache():
+    """Check that the GN-model eta matrix is reused for the same fiber and spectrum, within the memory cap."""
+    NliSolver.eta_cache.clear()
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=196.1e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    fiber = Fiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'))
+    eta = NliSolver._gn_analytic(spectral_info, fiber)
+    assert (NliSolver.eta_cache.hits, NliSolver.eta_cache.misses) == (0, 1)
+    assert NliSolver._gn_analytic(spectral_info, fiber) is eta
+    assert (NliSolver.eta_cache.hits, NliSolver.eta_cache.misses) == (1, 1)
+    assert NliSolver.eta_cache.size == eta.nbytes
+
+    fiber_dict = load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json')
+    fiber_dict['params']['length'] = 60
+    NliSolver._gn_analytic(spectral_info, Fiber(**fiber_dict))
+    assert (NliSolver.eta_cache.hits, NliSolver.eta_cache.misses) == (1, 2)
+    assert len(NliSolver.eta_cache) == 2
+
+    # the cap is exceeded: the least recently used matrices are evicted
+    SimParams.set_params({'nli_params': {'eta_cache_size': 1.5 * eta.nbytes / 1e6}})
+    fiber_dict['params']['length'] = 50
+    NliSolver._gn_analytic(spectral_info, Fiber(**fiber_dict))
+    assert len(NliSolver.eta_cache) == 1
+    new_eta = NliSolver._gn_analytic(spectral_info, fiber)
+    assert new_eta is not eta
+    assert_array_equal(new_eta, eta)
+    assert (NliSolver.eta_cache.hits, NliSolver.eta_cache.misses) == (1, 4)
+    NliSolver.eta_cache.clear()
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_srs_cache():
+    """Check that the Raman profile of a fiber is reused for the same input spectrum and solver parameters."""
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=196.1e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    SimParams.set_params({'raman_params': {'flag': True, 'solver': 'rk4', 'solver_spatial_resolution': 2e3}})
+    fiber = RamanFiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'))
+    fiber.ref_pch_in_dbm = 0.0
+    srs = RamanSolver.cached_stimulated_raman_scattering(spectral_info, fiber)
+    assert RamanSolver.cached_stimulated_raman_scattering(spectral_info, fiber) is srs
+    assert fiber.srs_cache.stats == {'hits': 1, 'misses': 1, 'entries': 1, 'size': srs.nbytes}
+    assert not srs.loss_profile.flags.writeable
+    assert_array_equal(srs.loss_profile,
+                       RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber).loss_profile)
+
+    # a different input power or different solver parameters are new entries
+    spectral_info.apply_attenuation_db(1)
+    RamanSolver.cached_stimulated_raman_scattering(spectral_info, fiber)
+    SimParams.set_params({'raman_params': {'flag': True, 'solver': 'rk4', 'solver_spatial_resolution': 1e3}})
+    RamanSolver.cached_stimulated_raman_scattering(spectral_info, fiber)
+    assert fiber.srs_cache.stats['misses'] == 3
+    assert len(fiber.srs_cache) == 3
+
+    # propagations through the fiber reuse the cache, with the same results
+    outputs = [fiber(create_input_spectral_information(f_min=191.3e12, f_max=196.1e12, roll_off=0.15, baud_rate=32e9,
+                                                       spacing=50e9, tx_osnr=40.0, tx_power=1e-3)) for _ in range(2)]
+    assert fiber.srs_cache.stats['hits'] == 2
+    assert_array_equal(outputs[0].signal, outputs[1].signal)
+    assert_array_equal(outputs[0].nli, outputs[1].nli)
+    assert_array_equal(outputs[0].ase, outputs[1].ase)
+
+    fiber.invalidate_srs_cache()
+    assert fiber.srs_cache.stats == {'hits': 0, 'misses': 0, 'entries': 0, 'size': 0}
+
+
+@pytest.mark.parametrize('xpm_cutoff, tolerance', [(250e9, 0.01), (500e9, 0.01), (20e12, 1e-9)])
+@pytest.mark.usefixtures('set_sim_params')
+def test_gn_banded(xpm_cutoff, tolerance):
+    """Check the banded GN model against the dense one on a C+L spectrum"""
+    spectral_info = create_input_spectral_information(f_min=186e12, f_max=196.1e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    fiber = Fiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'))
+    srs = RamanSolver.calculate_attenuation_profile(spectral_info, fiber)
+    nli = NliSolver.compute_nli(spectral_info, srs, fiber)
+    SimParams.set_params({'nli_params': {'xpm_cutoff': xpm_cutoff}})
+    nli_banded = NliSolver.compute_nli(spectral_info, srs, fiber)
+    assert_allclose(lin2db(nli_banded), lin2db(nli), atol=tolerance, rtol=0)
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_ggn_adaptive_cuts():
+    """Check that the adaptive selection of the CUTs keeps the NLI close to the one computed on all channels"""
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=191.85e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    sim_params = {'nli_params': {'method': 'ggn_spectrally_separated', 'batched': True}}
+    SimParams.set_params(sim_params)
+    fiber = Fiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'))
+    srs = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber)
+    nli = NliSolver.compute_nli(spectral_info, srs, fiber)
+
+    sim_params['nli_params']['adaptive_tolerance'] = 0.1
+    SimParams.set_params(sim_params)
+    cut_indices, _ = NliSolver._adaptive_ggn_g_nli(spectral_info, fiber, srs)
+    assert 2 < cut_indices.size < spectral_info.number_of_channels
+    nli_adaptive = NliSolver.compute_nli(spectral_info, srs, fiber)
+    assert_allclose(lin2db(nli_adaptive), lin2db(nli), atol=0.1, rtol=0)
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_ggn_psi_table(tmp_path, caplog):
+    """Check the tabulated ggn model against the numerical one and its fallback without table"""
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=191.65e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    sim_params = {'nli_params': {'method': 'ggn_spectrally_separated', 'batched': True}}
+    SimParams.set_params(sim_params)
+    fiber = Fiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'), type_variety='SSMF')
+    srs = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber)
+    nli = NliSolver.compute_nli(spectral_info, srs, fiber)
+
+    sim_params['nli_params'].update({'method': 'ggn_spectrally_separated_table',
+                                     'psi_table_dir': tmp_path / 'missing'})
+    SimParams.set_params(sim_params)
+    assert_array_equal(NliSolver.compute_nli(spectral_info, srs, fiber), nli)
+    assert_array_equal(NliSolver.compute_nli(spectral_info, srs, fiber), nli)
+    # the missing table is reported once
+    assert sum('No psi table for fiber type SSMF' in record.message for record in caplog.records) == 1
+
+    PsiTable.compute(fiber, [70e3, 90e3], [32e9], [0.15], arange(-400e9, 401e9, 25e9), 50e9, 5).save(
+        tmp_path / 'SSMF.npz')
+    assert PsiTable.load(tmp_path / 'SSMF.npz').coefficients.shape == (2, 1, 1, 33, 5, 5)
+    sim_params['nli_params']['psi_table_dir'] = tmp_path
+    SimParams.set_params(sim_params)
+    assert_allclose(lin2db(NliSolver.compute_nli(spectral_info, srs, fiber)), lin2db(nli), atol=0.05, rtol=0)
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_isrs_gn_model():
+    """Check the closed-form ISRS GN model against the ggn model on the RamanFiber of the Raman example network"""
+    example_dir = TEST_DIR.parent / 'gnpy' / 'example-data'
+    equipment = load_equipment(example_dir / 'eqpt_config.json')
+    network = load_network(example_dir / 'raman_edfa_example_network.json', equipment)
+    raman_fiber = next(node for node in network if isinstance(node, RamanFiber))
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=196.1e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    cut_indices = array([0, 17, 36, 55, 74, 95])
+    sim_params = load_json(example_dir / 'sim_params.json')
+    sim_params['nli_params'] = {'method': 'ggn_spectrally_separated', 'computed_channels': list(cut_indices + 1),
+                                'batched': True}
+    SimParams.set_params(sim_params)
+    srs = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, raman_fiber)
+    start = perf_counter()
+    ggn_nli = NliSolver.compute_nli(spectral_info, srs, raman_fiber)[cut_indices]
+    ggn_time = perf_counter() - start
+
+    sim_params['nli_params'] = {'method': 'gn_model_analytic'}
+    SimParams.set_params(sim_params)
+    gn_error = abs(lin2db(NliSolver.compute_nli(spectral_info, srs, raman_fiber)[cut_indices] / ggn_nli))
+    sim_params['nli_params'] = {'method': 'isrs_gn_model_analytic'}
+    SimParams.set_params(sim_params)
+    start = perf_counter()
+    isrs_nli = NliSolver.compute_nli(spectral_info, srs, raman_fiber)
+    isrs_time = perf_counter() - start
+    isrs_error = abs(lin2db(isrs_nli[cut_indices] / ggn_nli))
+    assert isrs_error.max() < gn_error.max()
+    assert isrs_error.max() < 0.6
+    # the closed form computes all the channels about a thousand times faster than the ggn model computes 6 CUTs
+    assert isrs_time < ggn_time / 20
+
+    # without Raman pumps, ISRS only
+    fiber = Fiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'))
+    srs = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber)
+    sim_params['nli_params'] = {'method': 'ggn_spectrally_separated', 'computed_channels': list(cut_indices + 1),
+                                'batched': True}
+    SimParams.set_params(sim_params)
+    ggn_nli = NliSolver.compute_nli(spectral_info, srs, fiber)[cut_indices]
+    sim_params['nli_params'] = {'method': 'isrs_gn_model_analytic'}
+    SimParams.set_params(sim_params)
+    assert_allclose(lin2db(NliSolver.compute_nli(spectral_info, srs, fiber)[cut_indices]), lin2db(ggn_nli),
+                    atol=0.1, rtol=0)
+
+    # without SRS, the GN model is recovered
+    srs = RamanSolver.calculate_attenuation_profile(spectral_info, fiber)
+    isrs_nli = NliSolver.compute_nli(spectral_info, srs, fiber)
+    sim_params['nli_params'] = {'method': 'gn_model_analytic'}
+    SimParams.set_params(sim_params)
+    assert_allclose(isrs_nli, NliSolver.compute_nli(spectral_info, srs, fiber), rtol=1e-9)
+
+
+@pytest.mark.parametrize('solver, solver_spatial_resolution', [('rk4', 2e3), ('rk45', 1e3)])
+@pytest.mark.parametrize('fiber_config', ['test_science_utils_fiber_config.json',
+                                          'test_lumped_losses_raman_fiber_config.json'])
+@pytest.mark.usefixtures('set_sim_params')
+def test_raman_solver(solver, solver_spatial_resolution, fiber_config):
+    """Check the log-domain Raman solvers with km steps against fine references, with and without lumped losses"""
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=196.1e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    fiber = RamanFiber(**load_json(TEST_DIR / 'data' / fiber_config))
+    SimParams.set_params({'raman_params': {'flag': True, 'solver': 'euler', 'solver_spatial_resolution': 50}})
+    euler = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber).power_profile
+    SimParams.set_params({'raman_params': {'flag': True, 'solver': 'rk4', 'solver_spatial_resolution': 250}})
+    reference = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber).power_profile
+    assert_allclose(lin2db(euler), lin2db(reference), atol=0.05, rtol=0)
+
+    SimParams.set_params({'raman_params': {'flag': True, 'solver': solver,
+                                           'solver_spatial_resolution': solver_spatial_resolution}})
+    power_profile = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber).power_profile
+    assert_allclose(lin2db(power_profile), lin2db(reference), atol=0.01, rtol=0)
+
+
+@pytest.mark.parametrize('solver', ['rk4', 'rk45'])
+@pytest.mark.usefixtures('set_sim_params')
+def test_raman_solver_zero_power(solver):
+    """Check that a zero power channel, such as a switched off pump, does not break the log-domain solvers"""
+    fiber = RamanFiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'))
+    frequency = array([191.3e12, 193e12, 206e12])
+    z = linspace(0, fiber.params.length, 41)
+    power = RamanSolver.first_order_derivative_solution(array([1e-3, 1e-3, 0]), fiber.alpha(frequency),
+                                                        fiber.cr(frequency), z, ones(z.size), solver=solver)
+    assert isfinite(power).all()
+    assert_allclose(power[2], 0, atol=1e-300)
+    expected = RamanSolver.first_order_derivative_solution(array([1e-3, 1e-3]), fiber.alpha(frequency[:2]),
+                                                           fiber.cr(frequency[:2]), z, ones(z.size), solver=solver)
+    assert_allclose(power[:2], expected, rtol=1e-6)
+
+    # co- and counter-propagating pumps, the counter-propagating one being switched off
+    config = load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json')
+    config['operational']['raman_pumps'][0]['propagation_direction'] = 'coprop'
+    config['operational']['raman_pumps'][1]['power'] = 0
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=196.1e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    SimParams.set_params({'raman_params': {'flag': True, 'solver': solver, 'solver_spatial_resolution': 2e3}})
+    srs = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, RamanFiber(**config))
+    assert isfinite(srs.power_profile).all()
+
+
+@pytest.mark.usefixtures('set_sim_params')
+def test_raman_iterative_algorithm(caplog, monkeypatch):
+    """Check that the accelerated iterative algorithm converges to the plain fixed point in fewer iterations"""
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=196.1e12, roll_off=0.15,
+                                                      baud_rate=32e9, spacing=50e9, tx_osnr=40.0, tx_power=1e-3)
+    SimParams.set_params({'raman_params': {'flag': True, 'solver_spatial_resolution': 200}})
+    fiber = RamanFiber(**load_json(TEST_DIR / 'data' / 'test_science_utils_fiber_config.json'))
+    with caplog.at_level(logging.INFO, logger='gnpy.core.science_utils'):
+        power_profile = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber).power_profile
+    iterations = int(caplog.records[-1].getMessage().split(': ')[1].split()[0])
+
+    caplog.clear()
+    monkeypatch.setattr(RamanSolver, 'ANDERSON_DEPTH', 0)
+    monkeypatch.setattr(RamanSolver, 'WARM_START_STEP', 200)
+    with caplog.at_level(logging.INFO, logger='gnpy.core.science_utils'):
+        plain_power_profile = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber).power_profile
+    plain_iterations = int(caplog.records[-1].getMessage().split(': ')[1].split()[0])
+    assert iterations < plain_iterations
+    assert_allclose(power_profile, plain_power_profile, rtol=1e-5)
+
+
+@pytest.mark.parametrize('fiber_config', ['test_science_utils_fiber_config.json',
+                                          'test_lumped_losses_raman_fiber_config.json'])
+@pytest.mark.usefixtures('set_sim_params')
+def test_raman_spectral_slicing(fiber_config):
+    """Check that the Raman profile solved on spectral slices is close to the one solved on every channel"""
+    spectral_info = create_input_spectral_information(f_min=191.3e12, f_max=196.1e12, roll_off=0.15,
+                                                      baud_rate=10e9, spacing=12.5e9, tx_osnr=40.0, tx_power=1e-3)
+    slice_frequency, slice_power = RamanSolver._spectral_slices(spectral_info.frequency, spectral_info.signal, 200e9)
+    assert slice_frequency.size == 24
+    assert_allclose(slice_power.sum(), spectral_info.signal.sum(), rtol=1e-12)
+
+    fiber = RamanFiber(**load_json(TEST_DIR / 'data' / fiber_config))
+    SimParams.set_params({'raman_params': {'flag': True, 'solver': 'rk4', 'solver_spatial_resolution': 2e3}})
+    reference = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber)
+    SimParams.set_params({'raman_params': {'flag': True, 'solver': 'rk4', 'solver_spatial_resolution': 2e3,
+                                           'slice_width': 200e9}})
+    srs = RamanSolver.calculate_stimulated_raman_scattering(spectral_info, fiber)
+    assert_allclose(srs.frequency, reference.frequency, rtol=0)
+    assert_allclose(srs.z, reference.z, rtol=0)
+    assert_allclose(lin2db(srs.loss_profile), lin2db(reference.loss_profile), atol=0.03, rtol=0)
+    assert_allclose(lin2db(srs.power_profile), lin2db(reference.power_profile), atol=0.03, rtol=0)